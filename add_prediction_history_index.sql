@@ -0,0 +1,3 @@
+-- Composite index behind keyset pagination of prediction history:
+--   WHERE user_id = ? AND predict_id < ? ORDER BY predict_id DESC LIMIT ?
+CREATE INDEX ix_predictions_user_predict ON predictions (user_id, predict_id);
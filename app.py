@@ -1,7 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import List
 from routes import user_routes, predict_routes, info_routes, allergy_routes, document_routes
-from config.database import engine
+from config.database import engine, get_async_db
+from utils.executor import shutdown_predict_executor
+from utils.json_response import OrjsonResponse
+from utils.http_cache import static_content, conditional_response, public_cache_control
+from services.inference_server import close_inference_client
+from services.predict_service import model_holder, prediction_cache
+from services.prediction_writer import prediction_writer
+from services.history_cache import history_cache
+from services.disease_service import disease_catalog, get_disease_document
+import os
+import logging
 from models import user_model, prediction_model, disease_model, document_model
 
 # Create database tables if they don't exist
@@ -18,7 +31,9 @@ try:
 except Exception as e:
     print(f"⚠️ Warning: Could not populate diseases: {e}")
 
-app = FastAPI(title="IPHC Backend API", version="1.0.0")
+# orjson for every response; hot routes hand it their payload directly
+app = FastAPI(title="IPHC Backend API", version="1.0.0", default_response_class=OrjsonResponse)
+logger = logging.getLogger(__name__)
 
 # CORS configuration
 app.add_middleware(
@@ -29,6 +44,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def startup_event():
+    # Load the model before the first request instead of on it
+    if os.getenv("MODEL_WARMUP", "1") == "1":
+        model_holder.warm()
+    if prediction_writer.enabled:
+        prediction_writer.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    shutdown_predict_executor()
+    # After the pool, so predictions that were still running get queued and flushed
+    prediction_writer.stop()
+    close_inference_client()
+
 # Include routers
 app.include_router(user_routes.router, prefix="/users", tags=["User"])  # Fixed: Changed from "/user" to "/users"
 app.include_router(predict_routes.router, prefix="/predict", tags=["Predict"])
@@ -36,34 +66,68 @@ app.include_router(info_routes.router, prefix="/info", tags=["Info"])
 app.include_router(allergy_routes.router, prefix="/allergies", tags=["Allergies"])
 app.include_router(document_routes.router, prefix="/documents", tags=["Documents"])
 
+MAX_DISEASE_BATCH_SIZE = 50
+
+class DiseaseBatchRequest(BaseModel):
+    names: List[str]
+
+# Details for several diseases (e.g. a prediction's top_results) in one round trip
+@app.post("/api/disease/batch")
+async def get_disease_details_batch(request: DiseaseBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Disease details in request order; unknown names get the same default record as the single lookup"""
+    if not request.names:
+        raise HTTPException(status_code=400, detail="No disease names provided")
+    if len(request.names) > MAX_DISEASE_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_DISEASE_BATCH_SIZE} names)")
+    from services.disease_service import get_diseases_by_names
+
+    diseases = await get_diseases_by_names(request.names, db=db)
+    return OrjsonResponse({"success": True, "diseases": diseases})
+
+async def _disease_details_content(decoded_name, db):
+    from services.disease_service import get_disease_by_name
+
+    disease_info = await get_disease_by_name(decoded_name, db=db)
+    if disease_info:
+        return {"success": True, "disease": disease_info}
+    else:
+        # fallback (should rarely happen)
+        return {
+            "success": True,
+            "disease": {
+                "name": decoded_name,
+                "overview": f"{decoded_name} is a medical condition that requires proper medical evaluation. Please consult with a healthcare professional for accurate diagnosis and treatment recommendations.",
+                "causes": "Various factors may contribute to this condition. A healthcare provider can help identify specific causes in your case.",
+                "symptoms": "Symptoms can vary between individuals. Please discuss your specific symptoms with a medical professional.",
+                "treatments": "Treatment options should be discussed with a qualified healthcare provider who can assess your individual situation.",
+                "prevention": "Prevention strategies may be available. Consult with a healthcare professional for personalized advice.",
+                "when_to_see_doctor": "Consult a healthcare provider for proper evaluation and treatment recommendations.",
+                "how_common": "Frequency information varies. Please consult a healthcare professional for more details."
+            }
+        }
+
 # Add the disease info route directly to app root for /api/disease/ endpoint
 @app.get("/api/disease/{disease_name}")
-async def get_disease_details_root(disease_name: str):
+async def get_disease_details_root(disease_name: str, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        from services.disease_service import get_disease_by_name
         import urllib.parse
 
         decoded_name = urllib.parse.unquote(disease_name)
-        disease_info = get_disease_by_name(decoded_name)
-        if disease_info:
-            return {"success": True, "disease": disease_info}
-        else:
-            # fallback (should rarely happen)
-            return {
-                "success": True,
-                "disease": {
-                    "name": decoded_name,
-                    "overview": f"{decoded_name} is a medical condition that requires proper medical evaluation. Please consult with a healthcare professional for accurate diagnosis and treatment recommendations.",
-                    "causes": "Various factors may contribute to this condition. A healthcare provider can help identify specific causes in your case.",
-                    "symptoms": "Symptoms can vary between individuals. Please discuss your specific symptoms with a medical professional.",
-                    "treatments": "Treatment options should be discussed with a qualified healthcare provider who can assess your individual situation.",
-                    "prevention": "Prevention strategies may be available. Consult with a healthcare professional for personalized advice.",
-                    "when_to_see_doctor": "Consult a healthcare provider for proper evaluation and treatment recommendations.",
-                    "how_common": "Frequency information varies. Please consult a healthcare professional for more details."
-                }
-            }
-    except Exception as e:
-        print(f"DEBUG: Exception in disease info endpoint: {e}")
+        # Exact/alias hits: body and ETag were rendered when the catalog loaded
+        document = await get_disease_document(decoded_name, "api", db=db)
+        if document is not None:
+            return conditional_response(request, *document, public_cache_control())
+        # Fuzzy hits (with their match_score) and placeholders are encoded once per name and catalog version
+        version = disease_catalog.version
+        key = ("disease", decoded_name)
+        cached = static_content.get(key, version)
+        if cached is None:
+            cached = static_content.put(key, version, await _disease_details_content(decoded_name, db))
+        # Without a catalog the answer is a placeholder: don't let anyone keep it
+        cache_control = public_cache_control() if disease_catalog.loaded else "no-cache"
+        return conditional_response(request, *cached, cache_control)
+    except Exception:
+        logger.exception("Disease info lookup failed for %r", disease_name)
         return {
             "success": True,
             "disease": {
@@ -93,7 +157,16 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "IPHC Backend API is operational"}
+    return {
+        "status": "healthy",
+        "message": "IPHC Backend API is operational",
+        "model": model_holder.status(),
+        "prediction_cache": prediction_cache.stats(),
+        "prediction_writer": prediction_writer.stats(),
+        "history_cache": history_cache.stats(),
+        "disease_catalog": disease_catalog.stats(),
+        "static_content": static_content.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
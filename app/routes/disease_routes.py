@@ -7,7 +7,7 @@ router = APIRouter()
 async def get_disease_details(disease_name: str):
     """Get detailed information about a specific disease"""
     try:
-        disease_info = get_disease_by_name(disease_name)
+        disease_info = await get_disease_by_name(disease_name)
         return {
             "success": True,
             "disease": disease_info
@@ -0,0 +1,57 @@
+import os
+import timeit
+import joblib
+import numpy as np
+import pandas as pd
+from services.symptom_encoder import SymptomEncoder
+
+# Same values as services.predict_service (not imported to avoid a DB connection)
+duration_values = ["1-3 days", "4-7 days", "More than a week"]
+severity_values = ["Mild", "Moderate", "Severe"]
+
+def legacy_encode_input(symptom_columns, symptoms, duration, severity):
+    """Previous encode_input: list.index scans plus a one-row DataFrame"""
+    vector = [0] * len(symptom_columns)
+    for symptom in symptoms:
+        s = symptom.lower()
+        if s == "fever":
+            if severity == "Mild" and "mild_fever" in symptom_columns:
+                vector[symptom_columns.index("mild_fever")] = 1
+            elif severity in ["Moderate", "Severe"] and "high_fever" in symptom_columns:
+                vector[symptom_columns.index("high_fever")] = 1
+        elif s in symptom_columns:
+            vector[symptom_columns.index(s)] = 1
+    df = pd.DataFrame([vector], columns=symptom_columns)
+    for val in duration_values:
+        df[f"duration_{val}"] = 1 if duration == val else 0
+    for val in severity_values:
+        df[f"severity_{val}"] = 1 if severity == val else 0
+    return df
+
+def run_benchmark(number=2000):
+    symptom_columns = joblib.load(os.path.join("dataset", "symptom_columns.pkl"))
+    encoder = SymptomEncoder(symptom_columns, duration_values, severity_values)
+    symptoms = ["fever", "headache", "vomiting", "yellow_crust_ooze", "unknown_symptom"]
+    duration, severity = "4-7 days", "Moderate"
+
+    # Both encoders must agree before timing them
+    legacy = legacy_encode_input(symptom_columns, symptoms, duration, severity)
+    new = encoder.encode(symptoms, duration, severity)
+    assert np.array_equal(legacy[encoder.columns].to_numpy(dtype=np.float32), new)
+
+    legacy_time = timeit.timeit(lambda: legacy_encode_input(symptom_columns, symptoms, duration, severity), number=number)
+    new_time = timeit.timeit(lambda: encoder.encode(symptoms, duration, severity), number=number)
+
+    print(f"Features: {encoder.n_features}, iterations: {number}")
+    print(f"Legacy DataFrame encoder: {legacy_time / number * 1e6:9.2f} us/call")
+    print(f"Array encoder:            {new_time / number * 1e6:9.2f} us/call")
+    print(f"Speedup:                  {legacy_time / new_time:9.1f}x")
+
+    model_path = os.path.join("dataset", "trained_model.pkl")
+    if os.path.exists(model_path):
+        model = joblib.load(model_path)
+        predict_time = timeit.timeit(lambda: model.predict_proba(new), number=50)
+        print(f"Forest predict_proba:     {predict_time / 50 * 1e6:9.2f} us/call (for reference)")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,34 @@
+import os
+import timeit
+import warnings
+import joblib
+import numpy as np
+from services.forest_bundle import FlatForest, MODEL_PATH, BUNDLE_DIR
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+def _time_ms(func, number):
+    return timeit.timeit(func, number=number) / number * 1000
+
+def run_benchmark():
+    """Compare sklearn predict_proba with the flat forest engine (in-memory and memory-mapped)"""
+    model = joblib.load(MODEL_PATH)
+    engines = {"sklearn": model, "flat": FlatForest.from_model(model)}
+    if os.path.exists(os.path.join(BUNDLE_DIR, "meta.json")):
+        engines["flat (mmap bundle)"] = FlatForest.load(BUNDLE_DIR)
+
+    rng = np.random.default_rng(42)
+    X_1k = (rng.random((1000, model.n_features_in_)) > 0.93).astype(np.float32)
+    X_1 = X_1k[:1]
+
+    reference = model.predict_proba(X_1k)
+    print(f"Forest: {model.n_estimators} trees, {sum(e.tree_.node_count for e in model.estimators_)} nodes")
+    print(f"{'engine':<20}{'1 row (ms)':>12}{'1k rows (ms)':>14}{'max |diff|':>12}")
+    for name, engine in engines.items():
+        diff = np.abs(engine.predict_proba(X_1k) - reference).max()
+        single = _time_ms(lambda: engine.predict_proba(X_1), 200)
+        batch = _time_ms(lambda: engine.predict_proba(X_1k), 10)
+        print(f"{name:<20}{single:>12.3f}{batch:>14.2f}{diff:>12.1e}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,124 @@
+import json
+import timeit
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from services.prediction_format import format_stored_prediction
+from utils.json_response import OrjsonResponse
+
+def make_rows(n):
+    """Canonical Prediction rows as the ORM hands them over (JSON columns already parsed)"""
+    start = datetime(2025, 1, 1)
+    return [
+        SimpleNamespace(
+            predict_id=i,
+            user_id=1,
+            main_symptom="fever",
+            other_symptoms="cough, headache, fatigue",
+            duration="4-7 days",
+            severity="Moderate",
+            top_results=[
+                {"disease": "Viral Infection", "probability": 85.0},
+                {"disease": "Influenza", "probability": 75.0},
+                {"disease": "Common Cold", "probability": 64.31}
+            ],
+            dynamic_answers=[
+                {"question": f"Question {q}?", "answer": "Yes", "category": "general", "timestamp": "2025-01-01T10:00:00"}
+                for q in range(4)
+            ],
+            user_journey={"age": "34", "gender": "female", "triggers": "cold weather"},
+            assessment_summary="Primary symptoms: fever, cough, headache | Duration: 4-7 days, Severity: Moderate",
+            total_symptoms_count=4,
+            assessment_timestamp=start + timedelta(hours=i)
+        )
+        for i in range(n, 0, -1)
+    ]
+
+def legacy_format_row(p):
+    """Previous get_predictions_by_user: per-field parsing and casts on every read"""
+    dynamic_answers = p.dynamic_answers
+    if isinstance(dynamic_answers, str):
+        dynamic_answers = json.loads(dynamic_answers)
+    formatted_answers = [{
+        "question": str(a.get("question", "")),
+        "answer": str(a.get("answer", "")),
+        "category": str(a.get("category", "general")),
+        "timestamp": str(a.get("timestamp", ""))
+    } for a in dynamic_answers or []]
+    user_journey = p.user_journey
+    if isinstance(user_journey, str):
+        user_journey = json.loads(user_journey)
+    formatted_journey = {str(k): str(v) if v is not None else "" for k, v in (user_journey or {}).items()}
+    top_results = p.top_results
+    if isinstance(top_results, str):
+        top_results = json.loads(top_results)
+    formatted_results = [{
+        "disease": str(r.get("disease", "Unknown")),
+        "probability": float(r.get("probability", 0.0))
+    } for r in top_results or []]
+    return {
+        "predict_id": int(p.predict_id),
+        "timestamp": str(p.assessment_timestamp or p.predict_id),
+        "input": {
+            "main_symptom": str(p.main_symptom or ""),
+            "other_symptoms": [s.strip() for s in p.other_symptoms.split(", ") if s.strip()],
+            "duration": str(p.duration or ""),
+            "severity": str(p.severity or ""),
+            "dynamic_answers": formatted_answers,
+            "user_journey": formatted_journey,
+            "total_symptoms": int(p.total_symptoms_count)
+        },
+        "top_results": formatted_results,
+        "assessment_summary": str(p.assessment_summary)
+    }
+
+def legacy_route_format(prediction):
+    """Previous get_user_history: the same coercion a second time"""
+    data = prediction.get("input", {})
+    return {
+        "predict_id": int(prediction.get("predict_id", 0)),
+        "timestamp": str(prediction.get("timestamp", "")),
+        "input": {
+            "main_symptom": str(data.get("main_symptom", "")),
+            "other_symptoms": data.get("other_symptoms", []),
+            "duration": str(data.get("duration", "")),
+            "severity": str(data.get("severity", "")),
+            "dynamic_answers": data.get("dynamic_answers", []),
+            "user_journey": data.get("user_journey", {}),
+            "total_symptoms": int(data.get("total_symptoms", 0))
+        },
+        "top_results": prediction.get("top_results", []),
+        "assessment_summary": str(prediction.get("assessment_summary"))
+    }
+
+def legacy_response(rows):
+    predictions = [legacy_route_format(legacy_format_row(p)) for p in rows]
+    # What FastAPI does with a returned dict: jsonable_encoder, then json.dumps
+    return JSONResponse(jsonable_encoder({"success": True, "predictions": predictions})).body
+
+def new_response(rows):
+    predictions = [format_stored_prediction(p) for p in rows]
+    return OrjsonResponse({"success": True, "predictions": predictions}).body
+
+def run_benchmark(n_rows=1000, number=50):
+    rows = make_rows(n_rows)
+
+    # Same document before timing
+    assert json.loads(legacy_response(rows)) == json.loads(new_response(rows))
+
+    stages = [
+        ("Legacy (2x reshaping + jsonable_encoder + json)", lambda: legacy_response(rows)),
+        ("Row formatting only, legacy", lambda: [legacy_route_format(legacy_format_row(p)) for p in rows]),
+        ("Row formatting only, canonical", lambda: [format_stored_prediction(p) for p in rows]),
+        ("New (canonical rows + orjson)", lambda: new_response(rows))
+    ]
+    print(f"History response with {n_rows} rows, {len(new_response(rows)) / 1024:.0f} KiB, {number} iterations")
+    timings = {}
+    for name, fn in stages:
+        timings[name] = timeit.timeit(fn, number=number) / number
+        print(f"{name:50s} {timings[name] * 1e3:8.2f} ms")
+    print(f"{'Speedup':50s} {timings[stages[0][0]] / timings[stages[-1][0]]:8.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,50 @@
+import multiprocessing as mp
+import os
+import sys
+import numpy as np
+
+def _memory_kb():
+    """RSS, PSS and private memory of this process in KiB (Linux only)"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0].endswith(":"):
+                fields[parts[0][:-1]] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), private
+
+def _worker(model_format, barrier, results):
+    import warnings
+    warnings.filterwarnings("ignore")
+    import joblib
+    import sklearn.ensemble  # imported up front so only the model itself is measured
+    from services.forest_bundle import FlatForest, MODEL_PATH, BUNDLE_DIR
+    before = _memory_kb()
+    model = FlatForest.load(BUNDLE_DIR) if model_format == "bundle" else joblib.load(MODEL_PATH)
+    # Touch every tree so all node pages are resident
+    X = (np.random.default_rng(0).random((256, model.n_features_in_)) > 0.9).astype(np.float32)
+    model.predict_proba(X)
+    barrier.wait()  # measure while every worker holds its model
+    after = _memory_kb()
+    results.put((model_format, [a - b for a, b in zip(after, before)]))
+    barrier.wait()
+
+def run_benchmark(n_workers=8):
+    """Report per-worker memory for the pickle vs memory-mapped bundle formats"""
+    ctx = mp.get_context("spawn")
+    for model_format in ("pickle", "bundle"):
+        barrier = ctx.Barrier(n_workers)
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_worker, args=(model_format, barrier, results)) for _ in range(n_workers)]
+        for w in workers:
+            w.start()
+        rows = [results.get()[1] for _ in range(n_workers)]
+        for w in workers:
+            w.join()
+        rss, pss, private = (sum(col) / len(rows) / 1024 for col in zip(*rows))
+        print(f"{model_format:>7}: {n_workers} workers, model cost per worker "
+              f"RSS {rss:6.1f} MiB | PSS {pss:6.1f} MiB | private {private:6.1f} MiB")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
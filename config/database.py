@@ -1,9 +1,11 @@
-from sqlalchemy import create_engine, text, pool
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 import sqlalchemy
+from functools import wraps
 
 load_dotenv()
 
@@ -12,27 +14,63 @@ DB_PORT = int(os.getenv("DB_PORT", 3306))
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASS = os.getenv("DB_PASS")
+# mysql (default) or sqlite: a local file database for development and tests, no MySQL needed
+DB_DRIVER = os.getenv("DB_DRIVER", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "iphc_local.db")
+# Connections of the async engine (request-path queries), on top of the sync pool below
+# (10 + 20 overflow). Per API worker: at most 30 + ASYNC_DB_POOL_SIZE + ASYNC_DB_MAX_OVERFLOW
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 5))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 5))
 
 # 1. Deklarasi Base di awal
 Base = declarative_base()
 
 # 2. URL DB
 TEMP_DB_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}"
-REAL_DB_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-# Add connection pooling and reconnection settings
-engine = create_engine(
-    REAL_DB_URL,
-    poolclass=pool.QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,  # Validates connections before use
-    pool_recycle=3600,   # Recycle connections every hour
-    echo=False
-)
+if DB_DRIVER == "sqlite":
+    REAL_DB_URL = f"sqlite:///{SQLITE_PATH}"
+    ASYNC_DB_URL = f"sqlite+aiosqlite:///{SQLITE_PATH}"
+    POOL_SETTINGS = {}
+    ASYNC_POOL_SETTINGS = {}
+else:
+    REAL_DB_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    ASYNC_DB_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # Add connection pooling and reconnection settings
+    POOL_SETTINGS = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_pre_ping": True,  # Validates connections before use
+        "pool_recycle": 3600    # Recycle connections every hour
+    }
+    # Its own, smaller pool: sharing POOL_SETTINGS would double each worker's connection limit
+    ASYNC_POOL_SETTINGS = {
+        **POOL_SETTINGS,
+        "pool_size": ASYNC_DB_POOL_SIZE,
+        "max_overflow": ASYNC_DB_MAX_OVERFLOW
+    }
+
+engine = create_engine(REAL_DB_URL, echo=False, **POOL_SETTINGS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the request-path services: a waiting query parks a
+# coroutine instead of a thread. Sync engine stays for the prediction pool,
+# startup seeding and the run_*.py scripts.
+async_engine = create_async_engine(ASYNC_DB_URL, echo=False, **ASYNC_POOL_SETTINGS)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if DB_DRIVER == "sqlite":
+    # SQLite ignores foreign keys unless each connection turns them on; the
+    # predictions.user_id FK is what rejects unknown users on insert
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, "connect", _enable_sqlite_foreign_keys)
+
 def ensure_database():
     try:
         test_engine = create_engine(REAL_DB_URL)
@@ -52,15 +90,53 @@ def ensure_database():
             exit()
 
 # 3. Jalankan pengecekan dan inisialisasi koneksi
-ensure_database()
+if DB_DRIVER != "sqlite":
+    ensure_database()
 
 def get_db():
+    """Request-scoped session: one pooled connection per request, checked out on first use"""
     db = SessionLocal()
     try:
         yield db
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
+def with_session(func):
+    """Pass ``db`` through when the caller has one (a request's get_db session);
+    otherwise open a short-lived session for the call, e.g. from scripts"""
+    @wraps(func)
+    def wrapper(*args, db=None, **kwargs):
+        if db is not None:
+            return func(*args, db=db, **kwargs)
+        own_db = SessionLocal()
+        try:
+            return func(*args, db=own_db, **kwargs)
+        finally:
+            own_db.close()
+    return wrapper
+
+async def get_async_db():
+    """Request-scoped async session"""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+def with_async_session(func):
+    """Async counterpart of with_session for coroutine services"""
+    @wraps(func)
+    async def wrapper(*args, db=None, **kwargs):
+        if db is not None:
+            return await func(*args, db=db, **kwargs)
+        async with AsyncSessionLocal() as own_db:
+            return await func(*args, db=own_db, **kwargs)
+    return wrapper
+
 def init_db():
     """Inisialisasi database dan buat semua tabel"""
     # Import all models to ensure they're registered with Base
@@ -1,8 +1,8 @@
-from services.predict_service import predict_result, get_predictions_by_user, delete_prediction_by_id
+from services.predict_service import predict_result, get_prediction_page, delete_prediction_by_id
 
-def handle_predict(data: dict):
+def handle_predict(data: dict, db=None):
     try:
-        result = predict_result(data)
+        result = predict_result(data, db=db)
         return {
             "success": True,
             "message": "Prediction successful",
@@ -19,22 +19,25 @@ def handle_predict(data: dict):
             "data": None
         }
 
-def handle_get_predictions(user_id: int):
+async def handle_get_predictions(user_id: int, db=None, **page):
     try:
-        predictions = get_predictions_by_user(user_id)
+        result = await get_prediction_page(user_id, db=db, **page)
+        predictions = result["predictions"]
         return {
             "success": True,
             "message": f"Menemukan {len(predictions)} prediksi",
-            "data": predictions
+            "data": predictions,
+            "next_cursor": result["next_cursor"],
+            "has_more": result["has_more"]
         }
     except ValueError as e:
         return {"success": False, "message": str(e), "data": None}
     except Exception as e:
         return {"success": False, "message": f"Gagal mengambil data: {str(e)}", "data": None}
 
-def handle_delete_prediction(predict_id: int):
+async def handle_delete_prediction(predict_id: int, db=None):
     try:
-        delete_prediction_by_id(predict_id)
+        await delete_prediction_by_id(predict_id, db=db)
         return {"success": True, "message": "Prediksi berhasil dihapus", "data": None}
     except ValueError as e:
         return {"success": False, "message": str(e), "data": None}
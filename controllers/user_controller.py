@@ -18,7 +18,7 @@ def format_date(date_obj):
     # Fallback - convert to string
     return str(date_obj)
 
-async def update_user_controller(user_id: int, data: dict):
+async def update_user_controller(user_id: int, data: dict, db=None):
     """Update user with better error handling and validation"""
     try:
         print(f"DEBUG: Updating user {user_id} with data: {list(data.keys())}")
@@ -32,7 +32,7 @@ async def update_user_controller(user_id: int, data: dict):
             data['profile_photo'] = data.pop('photo')
         
         # Call service layer
-        result = await update_user_service(user_id, data)
+        result = await update_user_service(user_id, data, db=db)
         
         if result.get("success"):
             print(f"DEBUG: User {user_id} updated successfully")
@@ -54,9 +54,9 @@ async def update_user_controller(user_id: int, data: dict):
         traceback.print_exc()
         return {"success": False, "message": f"Controller error: {str(e)}"}
 
-async def get_user_controller(user_id: int):
+async def get_user_controller(user_id: int, db=None):
     try:
-        result = get_user_by_id(user_id)
+        result = await get_user_by_id(user_id, db=db)
         
         if result:
             # FIXED: Ensure all values are never None
@@ -79,13 +79,13 @@ async def get_user_controller(user_id: int):
         print(f"DEBUG: Error in get_user_controller: {e}")
         return {"success": False, "message": str(e)}
 
-def authenticate_user(email: str, password: str):
+async def authenticate_user(email: str, password: str, db=None):
     """Authenticate user with email and password"""
     try:
         print(f"DEBUG: Authenticating user with email: {email}")
         
         # Call the service layer
-        user = find_user_by_email(email)
+        user = await find_user_by_email(email, db=db)
         
         if not user:
             print(f"DEBUG: No user found with email: {email}")
@@ -107,10 +107,10 @@ def authenticate_user(email: str, password: str):
         traceback.print_exc()
         return None
 
-def get_users(request):
+async def get_users(request, db=None):
     """Get all users"""
     try:
-        users = get_all_users()
+        users = await get_all_users(db=db)
         users_data = []
         for user in users:
             user_data = {
@@ -132,10 +132,10 @@ def get_users(request):
         print(f"DEBUG: Error getting users: {e}")
         return {"success": False, "message": str(e)}
 
-def get_user(user_id: int, request):
+async def get_user(user_id: int, request, db=None):
     """Get single user by ID"""
     try:
-        user = get_user_by_id(user_id)
+        user = await get_user_by_id(user_id, db=db)
         
         if not user:
             return {"success": False, "message": "User not found"}
@@ -158,19 +158,19 @@ def get_user(user_id: int, request):
         print(f"DEBUG: Error getting user: {e}")
         return {"success": False, "message": str(e)}
 
-def register_user(user_data: dict, request=None):
+async def register_user(user_data: dict, request=None, db=None):
     """Register new user"""
     try:
         print(f"DEBUG: Registering user with email: {user_data.get('email')}")
         
         # Check if user already exists
-        existing_user = find_user_by_email(user_data.get('email'))
+        existing_user = await find_user_by_email(user_data.get('email'), db=db)
         if existing_user:
             return {"success": False, "message": "Email already registered"}
         
         # Create new user directly using service function
         from services.user_service import create_user as create_user_service
-        new_user = create_user_service(user_data)
+        new_user = await create_user_service(user_data, db=db)
         
         print(f"DEBUG: Created user result: {new_user}")
         print(f"DEBUG: Created user type: {type(new_user)}")
@@ -223,15 +223,15 @@ def register_user(user_data: dict, request=None):
 # Alias for backward compatibility
 register = register_user
 
-def create_user_controller(user_data: dict, request=None):
+async def create_user_controller(user_data: dict, request=None, db=None):
     """Create user controller - calls register_user but avoid recursion"""
-    return register_user(user_data, request)
+    return await register_user(user_data, request, db)
 
 # Fix the circular reference issue
-def create_user(user_data: dict, request=None):
+async def create_user(user_data: dict, request=None, db=None):
     """Create user controller - directly call service to avoid recursion"""
     from services.user_service import create_user as create_user_service
-    return create_user_service(user_data)
+    return await create_user_service(user_data, db=db)
 
 def delete_user(user_id: int):
     """Delete user"""
@@ -294,11 +294,11 @@ class UserController:
     def __init__(self):
         pass
 
-    def register(self, user_data: dict, request=None):
+    async def register(self, user_data: dict, request=None, db=None):
         """Register new user (controller method for route)"""
-        return register_user(user_data, request)
+        return await register_user(user_data, request, db)
 
-    def login(self, user_data: dict, request=None):
+    async def login(self, user_data: dict, request=None, db=None):
         """Login user with email and password"""
         try:
             email = user_data.get('email')
@@ -310,7 +310,7 @@ class UserController:
             print(f"DEBUG: Login attempt for email: {email}")
             
             # Use the existing authenticate_user function
-            user = authenticate_user(email, password)
+            user = await authenticate_user(email, password, db=db)
             
             if user:
                 print(f"DEBUG: Login successful for user: {email}")
@@ -344,7 +344,7 @@ class UserController:
             traceback.print_exc()
             return {"success": False, "message": f"Login failed: {str(e)}"}
 
-    def request_password_reset(self, request_data: dict):
+    async def request_password_reset(self, request_data: dict, db=None):
         """Request password reset OTP"""
         try:
             email = request_data.get('email')
@@ -354,13 +354,13 @@ class UserController:
             print(f"DEBUG: Requesting password reset for email: {email}")
             
             # Check if user exists first
-            user = find_user_by_email(email)
+            user = await find_user_by_email(email, db=db)
             if not user:
                 return {"success": False, "message": "Email not found"}
             
             # Send OTP
             from services.user_service import request_password_reset
-            success = request_password_reset(email)
+            success = await request_password_reset(email, db=db)
             
             if success:
                 return {"success": True, "message": "OTP sent to your email"}
@@ -371,7 +371,7 @@ class UserController:
             print(f"DEBUG: Error in request_password_reset: {e}")
             return {"success": False, "message": f"Error sending OTP: {str(e)}"}
 
-    def verify_password_reset_otp(self, request_data: dict):
+    async def verify_password_reset_otp(self, request_data: dict, db=None):
         """Verify password reset OTP"""
         try:
             email = request_data.get('email')
@@ -383,14 +383,14 @@ class UserController:
             print(f"DEBUG: Verifying OTP for email: {email}, code: {otp_code}")
             
             from services.user_service import verify_password_reset_otp
-            result = verify_password_reset_otp(email, otp_code)
+            result = await verify_password_reset_otp(email, otp_code, db=db)
             return result
             
         except Exception as e:
             print(f"DEBUG: Error in verify_password_reset_otp: {e}")
             return {"success": False, "message": f"Error verifying OTP: {str(e)}"}
 
-    def reset_password(self, request_data: dict):
+    async def reset_password(self, request_data: dict, db=None):
         """Reset password"""
         try:
             email = request_data.get('email')
@@ -402,31 +402,31 @@ class UserController:
             print(f"DEBUG: Resetting password for email: {email}")
             
             from services.user_service import reset_password
-            result = reset_password(email, new_password)
+            result = await reset_password(email, new_password, db=db)
             return result
             
         except Exception as e:
             print(f"DEBUG: Error in reset_password: {e}")
             return {"success": False, "message": f"Error resetting password: {str(e)}"}
 
-    def get_users(self, request):
+    async def get_users(self, request, db=None):
         """Get all users"""
-        return get_users(request)
+        return await get_users(request, db)
 
-    def get_user(self, user_id: int, request):
+    async def get_user(self, user_id: int, request, db=None):
         """Get single user by ID"""
-        return get_user(user_id, request)
+        return await get_user(user_id, request, db)
 
-    def create_user(self, user_data: dict, request=None):
+    async def create_user(self, user_data: dict, request=None, db=None):
         """Create user controller"""
-        return create_user_controller(user_data, request)
+        return await create_user_controller(user_data, request, db)
 
-    def update_user(self, user_id, data):
+    async def update_user(self, user_id, data, db=None):
         """Update user information"""
         try:
             print(f"DEBUG: Updating user {user_id} with data: {data}")
             from services.user_service import update_user as update_user_service
-            result = update_user_service(user_id, data)
+            result = await update_user_service(user_id, data, db=db)
             
             if result:
                 # Convert result to dict if it's an object
@@ -453,11 +453,11 @@ class UserController:
             print(f"DEBUG: Error updating user: {e}")
             return {"success": False, "message": f"Error updating user: {str(e)}"}
 
-    def delete_user(self, user_id: int):
+    async def delete_user(self, user_id: int, db=None):
         """Delete user"""
         try:
             from services.user_service import delete_user as delete_user_service
-            result = delete_user_service(user_id)
+            result = await delete_user_service(user_id, db=db)
             if result:
                 return {"success": True, "message": "User deleted successfully"}
             else:
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config.database import Base
@@ -19,4 +20,42 @@ class Prediction(Base):
     total_symptoms_count = Column(Integer, nullable=True)
     assessment_timestamp = Column(DateTime, nullable=True)
     
-    user = relationship("User", back_populates="predictions")
\ No newline at end of file
+    user = relationship("User", back_populates="predictions")
+
+    # Keyset pagination of a user's history: WHERE user_id = ? AND predict_id < ? ORDER BY predict_id DESC
+    __table_args__ = (
+        Index("ix_predictions_user_predict", "user_id", "predict_id"),
+    )
+
+class PredictionIdSequence(Base):
+    """Single-row counter that hands out blocks of predict_id values to write-behind writers"""
+    __tablename__ = "prediction_id_sequence"
+
+    id = Column(Integer, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+class PredictionWriterLease(Base):
+    """Single-row lease of the one process allowed to run write-behind (its id blocks break predict_id order otherwise)"""
+    __tablename__ = "prediction_writer_lease"
+
+    id = Column(Integer, primary_key=True)
+    owner = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class PredictionChange(Base):
+    """One entry per prediction insert or delete, written in the same transaction; read by history delta sync"""
+    __tablename__ = "prediction_changes"
+
+    # Numbered when the change is written, not when the predict_id was handed out,
+    # so rows that land late (write-behind, journal replay) still follow the cursor
+    change_id = Column(Integer, primary_key=True, autoincrement=True)
+    predict_id = Column(Integer, nullable=False)
+    # No foreign key: entries outlive the rows they describe
+    user_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    # Application clock, compared with datetime.now() by the sync endpoint
+    changed_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        Index("ix_prediction_changes_user_change", "user_id", "change_id"),
+    )
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from services.disease_service import get_disease_by_name, populate_sample_diseases
+from config.database import get_async_db
 
 router = APIRouter()
 
 @router.get("/disease/{disease_name}")
-async def get_disease_details(disease_name: str):
+async def get_disease_details(disease_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get detailed information about a specific disease"""
     try:
-        disease_info = get_disease_by_name(disease_name)
+        disease_info = await get_disease_by_name(disease_name, db=db)
         return {
             "success": True,
             "disease": disease_info
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from services.document_service import save_document, get_user_documents, get_document_by_id, delete_document
+from config.database import get_async_db
 
 router = APIRouter()
 
 @router.post("/upload")
-async def upload_document(request: dict = Body(...)):
+async def upload_document(request: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     """Upload and save a document"""
     try:
         user_id = request.get('user_id')
@@ -15,7 +17,7 @@ async def upload_document(request: dict = Body(...)):
         if not all([user_id, filename, file_content, file_type]):
             raise HTTPException(status_code=400, detail="Missing required fields")
         
-        result = save_document(user_id, filename, file_content, file_type)
+        result = await save_document(user_id, filename, file_content, file_type, db=db)
         
         if result['success']:
             return result
@@ -27,20 +29,20 @@ async def upload_document(request: dict = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/user/{user_id}")
-async def get_user_documents_endpoint(user_id: int):
+async def get_user_documents_endpoint(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all documents for a user"""
     try:
-        documents = get_user_documents(user_id)
+        documents = await get_user_documents(user_id, db=db)
         return documents
     except Exception as e:
         print(f"DEBUG: Error getting user documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{document_id}")
-async def get_document_endpoint(document_id: int):
+async def get_document_endpoint(document_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific document"""
     try:
-        document = get_document_by_id(document_id)
+        document = await get_document_by_id(document_id, db=db)
         if document:
             return document
         else:
@@ -50,14 +52,14 @@ async def get_document_endpoint(document_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{document_id}")
-async def delete_document_endpoint(document_id: int, request: dict = Body(...)):
+async def delete_document_endpoint(document_id: int, request: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     """Delete a document"""
     try:
         user_id = request.get('user_id')
         if not user_id:
             raise HTTPException(status_code=400, detail="User ID required")
         
-        result = delete_document(document_id, user_id)
+        result = await delete_document(document_id, user_id, db=db)
         
         if result['success']:
             return result
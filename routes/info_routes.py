@@ -1,31 +1,44 @@
-from fastapi import APIRouter, Path, Body
+import logging
+from fastapi import APIRouter, Path, Body, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from controllers.info_controller import get_info, get_batch_info
 from models.disease_model import Disease
-from config.database import SessionLocal
+from config.database import get_async_db
+from utils.http_cache import static_content, conditional_response, public_cache_control
+from utils.json_response import dumps as json_dumps
 
 router = APIRouter(tags=["Info"])
+logger = logging.getLogger(__name__)
+
+# disease_knowledge.json is read once at import, so its responses never change in-process
+KNOWLEDGE_VERSION = 0
 
 @router.get("/{disease_name}")
-def info(disease_name: str = Path(...)):
-    return get_info(disease_name)
+def info(request: Request, disease_name: str = Path(...)):
+    return static_content.respond(request, ("info", disease_name), KNOWLEDGE_VERSION, lambda: get_info(disease_name))
 
 @router.post("/batch")
-def batch_info(payload: dict = Body(...)):
+def batch_info(request: Request, payload: dict = Body(...)):
     diseases = payload.get("diseases", [])
-    return get_batch_info(diseases)
+    key = ("info:batch", json_dumps(diseases))
+    return static_content.respond(request, key, KNOWLEDGE_VERSION, lambda: get_batch_info(diseases))
 
 @router.get("/api/disease/{disease_name}")
-async def get_disease_details(disease_name: str):
+async def get_disease_details(disease_name: str, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get disease information from database - always returns detailed data"""
     try:
         import urllib.parse
-        from services.disease_service import get_disease_by_name
+        from services.disease_service import get_disease_by_name, get_disease_document
         
         decoded_name = urllib.parse.unquote(disease_name)
-        print(f"DEBUG: API route looking for disease info: {decoded_name}")
+        
+        # Exact/alias hits are served from the document rendered at load time
+        document = await get_disease_document(decoded_name, "info", db=db)
+        if document is not None:
+            return conditional_response(request, *document, public_cache_control())
         
         # Use the disease service to get detailed information
-        disease_info = get_disease_by_name(decoded_name)
+        disease_info = await get_disease_by_name(decoded_name, db=db)
         
         return {
             "success": True,
@@ -37,12 +50,13 @@ async def get_disease_details(disease_name: str):
                 "treatments": disease_info.get("treatments", ""),
                 "when_to_see_doctor": disease_info.get("when_to_see_doctor", ""),
                 "prevention": disease_info.get("prevention", ""),
-                "how_common": disease_info.get("how_common", "")
+                "how_common": disease_info.get("how_common", ""),
+                "match_score": disease_info.get("match_score", 0.0)
             }
         }
         
-    except Exception as e:
-        print(f"DEBUG: Exception in disease info endpoint: {e}")
+    except Exception:
+        logger.exception("Disease info lookup failed for %r", disease_name)
         return {
             "success": True,
             "disease": {
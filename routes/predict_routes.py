@@ -1,76 +1,217 @@
-from fastapi import APIRouter, HTTPException
+import os
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional, Literal, Union
 from controllers.predict_controller import handle_get_predictions, handle_delete_prediction
-from services.predict_service import predict_result, test_all_medical_patterns, quick_test_symptoms, get_predictions_by_user
+from services.predict_service import model_holder, predict_result, predict_batch, test_all_medical_patterns, quick_test_symptoms, get_prediction_page, get_prediction_changes, get_prediction_by_id, get_history_version
+from utils.executor import run_in_predict_pool
+from utils.json_response import OrjsonResponse, dumps as json_dumps
+from utils.http_cache import conditional_response, static_content, make_etag
+from services.history_cache import history_cache
+from services.prediction_export import export_predictions, EXPORT_MEDIA_TYPES
+from services.disease_service import get_diseases_by_names
+from services.user_service import get_user_by_id
+from config.database import get_db, get_async_db
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = 1000
+# History endpoints return one keyset page; follow next_cursor for older rows
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 50))
+HISTORY_MAX_PAGE_SIZE = 200
+
 class PredictRequest(BaseModel):
     symptoms: List[str]
     duration: str = "1-3 days"
     severity: str = "Mild"
     user_id: int
 
+class PredictBatchRequest(BaseModel):
+    items: List[PredictRequest]
+
 class TestSymptomsRequest(BaseModel):
     symptoms: List[str]
 
+# Response shapes. Stored rows and scored results already have exactly these
+# shapes, so the routes hand their payload to OrjsonResponse as is; the models
+# document the contract in OpenAPI without a validation/copy pass per request.
+class DiseaseDetails(BaseModel):
+    disease_id: Optional[int]
+    name: str
+    overview: str
+    causes: str
+    symptoms: str
+    when_to_see_doctor: str
+    treatments: str
+    prevention: str
+    how_common: str
+    prevalence: str
+    urgency_level: Optional[str] = None
+    not_found: bool = False
+    match_score: Optional[float] = None
+
+class TopResult(BaseModel):
+    disease: str
+    probability: float
+    details: Optional[DiseaseDetails] = None  # POST /predict?include=details only
+
+class DynamicAnswer(BaseModel):
+    question: str
+    answer: str
+    category: str
+    timestamp: str
+
+class PredictionInput(BaseModel):
+    main_symptom: Optional[str]
+    other_symptoms: List[str]
+    duration: str
+    severity: str
+    dynamic_answers: List[DynamicAnswer]
+    user_journey: Dict[str, str]
+    total_symptoms: int
+
+class PredictionResult(BaseModel):
+    predict_id: int
+    input: PredictionInput
+    top_results: List[TopResult]
+    assessment_summary: str
+
+class PredictionRecord(PredictionResult):
+    timestamp: str
+
+class PredictionSummary(BaseModel):
+    predict_id: int
+    timestamp: str
+    main_symptom: str
+    severity: str
+    top_disease: Optional[TopResult]
+
+class PredictResponse(BaseModel):
+    success: bool
+    data: PredictionResult
+
+class BatchEntry(BaseModel):
+    index: int
+    success: bool
+    data: Optional[PredictionResult]
+    error: Optional[str]
+
+class PredictBatchResponse(BaseModel):
+    success: bool
+    total: int
+    succeeded: int
+    results: List[BatchEntry]
+
+class PredictionItemResponse(BaseModel):
+    success: bool
+    data: PredictionRecord
+
+class PredictionListResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    data: List[Union[PredictionRecord, PredictionSummary]]
+    next_cursor: Optional[int]
+    has_more: bool
+
+class HistoryResponse(BaseModel):
+    success: bool
+    error: Optional[str] = None
+    predictions: List[Union[PredictionRecord, PredictionSummary]]
+    next_cursor: Optional[int] = None
+    has_more: bool = False
+
+class HistoryChangesResponse(BaseModel):
+    success: bool
+    created: List[PredictionRecord]
+    deleted: List[int]
+    next_cursor: str
+    has_more: bool
+
+def history_page(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    date_from: Optional[datetime] = Query(None, description="Earliest assessment_timestamp (inclusive); legacy rows without one are excluded"),
+    date_to: Optional[datetime] = Query(None, description="Latest assessment_timestamp (inclusive); legacy rows without one are excluded"),
+    view: Literal["full", "summary"] = Query("full", description="summary: predict_id, timestamp, main_symptom, severity and top disease only")
+):
+    """Shared pagination/filter query parameters of the history endpoints"""
+    return {"limit": limit, "cursor": cursor, "date_from": date_from, "date_to": date_to, "view": view}
+
+IncludeOption = Optional[Literal["details"]]
+INCLUDE_QUERY = Query(None, description="details: embed each top result's disease details (saves one /api/disease call per result)")
+
+async def _with_disease_details(result):
+    """Copy of a prediction result whose top_results carry their disease details"""
+    # A copy: the result may also sit in the prediction cache
+    details = await get_diseases_by_names([r["disease"] for r in result["top_results"]])
+    return {**result, "top_results": [{**r, "details": d} for r, d in zip(result["top_results"], details)]}
+
 # MAIN PREDICTION ENDPOINT - Fix the route
-@router.post("")
-async def predict_endpoint(request: PredictRequest):
+@router.post("", response_model=PredictResponse)
+async def predict_endpoint(request: PredictRequest, include: IncludeOption = INCLUDE_QUERY, db: Session = Depends(get_db)):
     """Main prediction endpoint - ML-driven with enhanced medical logic"""
     try:
         data = request.dict()
-        result = predict_result(data)
-        return {
+        # Inference and the DB write run on the bounded prediction pool, on this request's session
+        result = await run_in_predict_pool(predict_result, data, db=db)
+        if include == "details":
+            result = await _with_disease_details(result)
+        return OrjsonResponse({
             "success": True,
             "data": result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
-@router.post("/")
-async def predict_with_slash(request: PredictRequest):
+@router.post("/", response_model=PredictResponse)
+async def predict_with_slash(request: PredictRequest, include: IncludeOption = INCLUDE_QUERY, db: Session = Depends(get_db)):
     """Same endpoint with trailing slash"""
-    return await predict_endpoint(request)
+    return await predict_endpoint(request, include, db)
 
-@router.post("/predict")
-async def predict_no_slash(request: PredictRequest):
+@router.post("/predict", response_model=PredictResponse)
+async def predict_no_slash(request: PredictRequest, include: IncludeOption = INCLUDE_QUERY, db: Session = Depends(get_db)):
     """Same endpoint without slash"""
-    return await predict_endpoint(request)
+    return await predict_endpoint(request, include, db)
 
-@router.post("/predict/") 
-async def predict_with_slash(request: PredictRequest):
+@router.post("/predict/", response_model=PredictResponse)
+async def predict_with_slash(request: PredictRequest, include: IncludeOption = INCLUDE_QUERY, db: Session = Depends(get_db)):
     """Same endpoint with trailing slash"""
-    return await predict_endpoint(request)
+    return await predict_endpoint(request, include, db)
 
-@router.get("/{user_id}")
-async def get_user_predictions(user_id: int):
-    """Get user's prediction history"""
+@router.post("/batch", response_model=PredictBatchResponse)
+async def predict_batch_endpoint(request: PredictBatchRequest, db: Session = Depends(get_db)):
+    """Score many questionnaires in one vectorized call; results keep input order"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_BATCH_SIZE} items)")
     try:
-        result = handle_get_predictions(user_id)
-        if result["success"]:
-            return result
-        else:
-            raise HTTPException(status_code=404, detail=result["message"])
+        results = await run_in_predict_pool(predict_batch, [item.dict() for item in request.items], db=db)
+        return OrjsonResponse({
+            "success": True,
+            "total": len(results),
+            "succeeded": sum(1 for r in results if r["success"]),
+            "results": results
+        })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get predictions: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
-@router.delete("/{predict_id}")
-async def delete_prediction(predict_id: int):
-    """Delete a specific prediction"""
+@router.get("/item/{predict_id}", response_model=PredictionItemResponse)
+async def get_prediction_item(predict_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Full record of one prediction (answers, journey, all top results)"""
     try:
-        print(f"DEBUG: Attempting to delete prediction {predict_id}")
-        result = handle_delete_prediction(predict_id)
-        print(f"DEBUG: Delete result: {result}")
-        if result["success"]:
-            return result
-        else:
-            raise HTTPException(status_code=404, detail=result["message"])
+        prediction = await get_prediction_by_id(predict_id, db=db)
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=str(ve))
     except Exception as e:
-        print(f"DEBUG: Delete prediction error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to delete prediction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get prediction: {str(e)}")
+    return OrjsonResponse({"success": True, "data": prediction})
 
+# Fixed paths before "/{user_id}", which would otherwise capture them
 @router.get("/test-logic")
 async def test_medical_logic():
     """Test all medical logic patterns for debugging"""
@@ -103,10 +244,18 @@ async def test_specific_symptoms(request: TestSymptomsRequest):
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
 @router.get("/symptoms")
-async def get_available_symptoms():
+async def get_available_symptoms(request: Request):
     """Get list of all available symptoms"""
-    from services.predict_service import symptom_columns
-    
+    model_holder.ensure_loaded()
+    if not model_holder.ready:
+        # Without a model the list is empty: don't cache it here or let anyone keep it
+        body = json_dumps(_available_symptoms())
+        return conditional_response(request, body, make_etag(body), "no-cache")
+    # Encoded once per model version; clients revalidate with If-None-Match
+    return static_content.respond(request, "predict:symptoms", model_holder.version, _available_symptoms)
+
+def _available_symptoms():
+    symptom_columns = model_holder.symptom_columns or []
     return {
         "success": True,
         "total_symptoms": len(symptom_columns),
@@ -124,80 +273,133 @@ async def get_available_symptoms():
         }
     }
 
-# Add history endpoint for fetching user's predictions
-@router.get("/history/{user_id}")
-def get_user_history(user_id: int):
+@router.get("/{user_id}", response_model=PredictionListResponse)
+async def get_user_predictions(user_id: int, page: dict = Depends(history_page), db: AsyncSession = Depends(get_async_db)):
+    """Get user's prediction history"""
     try:
-        print(f"DEBUG: Getting history for user_id: {user_id}")
-        predictions = get_predictions_by_user(user_id)
-        print(f"DEBUG: Found {len(predictions)} predictions for user {user_id}")
-        
-        # Ensure consistent data structure and handle None values
-        formatted_predictions = []
-        for prediction in predictions:
-            # Handle None assessment_summary from older predictions
-            assessment_summary = prediction.get("assessment_summary")
-            if assessment_summary is None or assessment_summary == "None":
-                input_data = prediction.get("input", {})
-                main_symptom = input_data.get("main_symptom", "")
-                duration = input_data.get("duration", "")
-                severity = input_data.get("severity", "")
-                assessment_summary = f"{main_symptom} - {duration} - {severity}"
+        result = await handle_get_predictions(user_id, db, **page)
+        if result["success"]:
+            return OrjsonResponse(result)
+        else:
+            raise HTTPException(status_code=404, detail=result["message"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get predictions: {str(e)}")
+
+@router.delete("/{predict_id}")
+async def delete_prediction(predict_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a specific prediction"""
+    try:
+        print(f"DEBUG: Attempting to delete prediction {predict_id}")
+        result = await handle_delete_prediction(predict_id, db)
+        print(f"DEBUG: Delete result: {result}")
+        if result["success"]:
+            return result
+        else:
+            raise HTTPException(status_code=404, detail=result["message"])
+    except Exception as e:
+        print(f"DEBUG: Delete prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to delete prediction: {str(e)}")
+
+# Add history endpoint for fetching user's predictions
+@router.get("/history/{user_id}", response_model=HistoryResponse)
+async def get_user_history(user_id: int, request: Request, page: dict = Depends(history_page), db: AsyncSession = Depends(get_async_db)):
+    # Serialized pages are cached per user and parameters; one indexed query
+    # tells whether any worker has written to this history since
+    cache_key = (user_id, tuple(page.items()))
+    cached = None
+    version = None
+    if history_cache.enabled:
+        try:
+            version = await get_history_version(user_id, db=db)
+            cached = history_cache.get(cache_key, version)
+        except Exception as e:
+            print(f"DEBUG: History version check failed, rebuilding page: {e}")
+    if cached is not None:
+        print(f"DEBUG: History cache hit for user_id: {user_id}")
+        body, etag = cached
+    else:
+        try:
+            print(f"DEBUG: Getting history for user_id: {user_id}")
+            generation = history_cache.generation(user_id)
+            result = await get_prediction_page(user_id, db=db, **page)
+            predictions = result["predictions"]
+            print(f"DEBUG: Found {len(predictions)} predictions for user {user_id}")
+            
+            # Rows are stored in the canonical shape, so the page is encoded as is
+            body = json_dumps({
+                "success": True,
+                "predictions": predictions,
+                "next_cursor": result["next_cursor"],
+                "has_more": result["has_more"]
+            })
+            etag = history_cache.put(cache_key, generation, version, body) if version is not None else make_etag(body)
             
-            # Double-check data types for Flutter compatibility
-            formatted_prediction = {
-                "predict_id": int(prediction.get("predict_id", 0)),
-                "timestamp": str(prediction.get("timestamp", "")),
-                "input": {
-                    "main_symptom": str(prediction.get("input", {}).get("main_symptom", "")),
-                    "other_symptoms": prediction.get("input", {}).get("other_symptoms", []),
-                    "duration": str(prediction.get("input", {}).get("duration", "")),
-                    "severity": str(prediction.get("input", {}).get("severity", "")),
-                    "dynamic_answers": prediction.get("input", {}).get("dynamic_answers", []),
-                    "user_journey": prediction.get("input", {}).get("user_journey", {}),
-                    "total_symptoms": int(prediction.get("input", {}).get("total_symptoms", 0))
-                },
-                "top_results": prediction.get("top_results", []),
-                "assessment_summary": str(assessment_summary)
+        except ValueError as ve:
+            print(f"DEBUG: ValueError in get_user_history: {ve}")
+            return {
+                "success": False,
+                "error": str(ve),
+                "predictions": []
             }
-            formatted_predictions.append(formatted_prediction)
-        
-        response = {
-            "success": True,
-            "predictions": formatted_predictions
-        }
-        
-        print(f"DEBUG: Returning {len(formatted_predictions)} formatted predictions")
-        return response
-        
+        except Exception as e:
+            print(f"DEBUG: Exception in get_user_history: {e}")
+            import traceback
+            traceback.print_exc()
+            return {
+                "success": False,
+                "error": "Failed to retrieve prediction history",
+                "predictions": []
+            }
+    
+    # Clients revalidate on every open; an unchanged page costs a 304 and no body
+    return conditional_response(request, body, etag, "private, no-cache")
+
+@router.get("/history/{user_id}/export")
+async def export_user_history(
+    user_id: int,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson: one JSON record per line; csv: flattened columns"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Full prediction history as a streamed download, oldest first"""
+    if not await get_user_by_id(user_id, db=db):
+        raise HTTPException(status_code=404, detail="User tidak ditemukan")
+    return StreamingResponse(
+        export_predictions(user_id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="predictions_user_{user_id}.{format}"'}
+    )
+
+@router.get("/history/{user_id}/changes", response_model=HistoryChangesResponse)
+async def get_user_history_changes(
+    user_id: int,
+    since: Optional[str] = Query(None, description="next_cursor from the previous sync; omit for a full sync"),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delta sync: predictions created and deleted since the cursor (recent changes repeat; upsert by predict_id)"""
+    try:
+        changes = await get_prediction_changes(user_id, since=since, limit=limit, db=db)
+        return OrjsonResponse({"success": True, **changes})
     except ValueError as ve:
-        print(f"DEBUG: ValueError in get_user_history: {ve}")
-        return {
-            "success": False,
-            "error": str(ve),
-            "predictions": []
-        }
+        print(f"DEBUG: ValueError in get_user_history_changes: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
-        print(f"DEBUG: Exception in get_user_history: {e}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "success": False,
-            "error": "Failed to retrieve prediction history",
-            "predictions": []
-        }
+        print(f"DEBUG: Exception in get_user_history_changes: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve prediction changes")
 
 # Alternative route for user predictions
-@router.get("/user/{user_id}")
-async def get_predictions_for_user(user_id: int):
+@router.get("/user/{user_id}", response_model=PredictionListResponse)
+async def get_predictions_for_user(user_id: int, page: dict = Depends(history_page), db: AsyncSession = Depends(get_async_db)):
     """Alternative endpoint for user predictions"""
     try:
-        result = handle_get_predictions(user_id)
+        result = await handle_get_predictions(user_id, db, **page)
         if result["success"]:
-            return {
+            return OrjsonResponse({
                 "success": True,
-                "data": result["data"]
-            }
+                "data": result["data"],
+                "next_cursor": result["next_cursor"],
+                "has_more": result["has_more"]
+            })
         else:
             raise HTTPException(status_code=404, detail=result["message"])
     except Exception as e:
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Request, Body
+from fastapi import APIRouter, HTTPException, Request, Body, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from controllers.user_controller import UserController
+from config.database import get_async_db
 
 router = APIRouter()
 user_router = router
@@ -22,55 +24,55 @@ def test_endpoint():
     }
 
 @router.post("/login")
-def login_user(user: dict, request: Request):
+async def login_user(user: dict, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        return controller.login(user, request)
+        return await controller.login(user, request, db)
     except Exception as e:
         print(f"DEBUG: Login error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/register")  
-def register_user(user: dict = Body(...), request: Request = None):
-    return controller.register(user, request)
+async def register_user(user: dict = Body(...), request: Request = None, db: AsyncSession = Depends(get_async_db)):
+    return await controller.register(user, request, db)
 
 @router.post("/forgot-password")
-def forgot_password(request_data: dict = Body(...)):
+async def forgot_password(request_data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     """Request password reset OTP"""
     try:
-        return controller.request_password_reset(request_data)
+        return await controller.request_password_reset(request_data, db)
     except Exception as e:
         print(f"DEBUG: Forgot password error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/verify-otp")
-def verify_password_otp(request_data: dict = Body(...)):
+async def verify_password_otp(request_data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     """Verify OTP code"""
     try:
-        return controller.verify_password_reset_otp(request_data)
+        return await controller.verify_password_reset_otp(request_data, db)
     except Exception as e:
         print(f"DEBUG: Verify OTP error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/reset-password")
-def reset_password(request_data: dict = Body(...)):
+async def reset_password(request_data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     """Reset password with OTP verification"""
     try:
-        return controller.reset_password(request_data)
+        return await controller.reset_password(request_data, db)
     except Exception as e:
         print(f"DEBUG: Reset password error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # General CRUD endpoints (parameter routes - put LAST)
 @router.get("/")
-def get_users(request: Request):
-    return controller.get_users(request)
+async def get_users(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await controller.get_users(request, db)
 
 @router.post("/")
-def create_user(user: dict = Body(...), request: Request = None):
-    return controller.create_user(user, request)
+async def create_user(user: dict = Body(...), request: Request = None, db: AsyncSession = Depends(get_async_db)):
+    return await controller.create_user(user, request, db)
 
 @router.put("/{user_id}")
-async def update_user(user_id: int, request: Request):
+async def update_user(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Update user profile - simplified for existing database schema"""
     try:
         # Parse JSON data
@@ -87,7 +89,7 @@ async def update_user(user_id: int, request: Request):
             print("DEBUG: Removed 'profile_photo' field - not supported in current database schema")
         
         # Call the controller
-        result = controller.update_user(user_id, data)
+        result = await controller.update_user(user_id, data, db)
         print(f"DEBUG: Controller result: {result}")
         return result
         
@@ -98,9 +100,9 @@ async def update_user(user_id: int, request: Request):
         return {"success": False, "message": f"Server error: {str(e)}"}
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int):
-    return controller.delete_user(user_id)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await controller.delete_user(user_id, db)
 
 @router.get("/{user_id}")  # This MUST be last to avoid catching other routes
-def get_user(user_id: int, request: Request):
-    return controller.get_user(user_id, request)
\ No newline at end of file
+async def get_user(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await controller.get_user(user_id, request, db)
\ No newline at end of file
@@ -0,0 +1,38 @@
+from datetime import datetime
+from config.database import SessionLocal, engine
+from models.prediction_model import Prediction, PredictionChange
+from sqlalchemy import select, insert, literal, exists, func
+
+def add_prediction_changes():
+    """Create prediction_changes and log every existing prediction as created.
+
+    Safe to re-run and to run while the API serves: rows that already have an
+    entry (e.g. written by the new code meanwhile) are skipped.
+    """
+    PredictionChange.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        missing = select(
+            Prediction.predict_id, Prediction.user_id, literal(False), literal(datetime.now())
+        ).where(
+            ~exists().where(PredictionChange.predict_id == Prediction.predict_id)
+        ).order_by(Prediction.predict_id)
+        result = db.execute(
+            insert(PredictionChange).from_select(["predict_id", "user_id", "deleted", "changed_at"], missing)
+        )
+        db.commit()
+        print(f"Logged {result.rowcount} existing predictions")
+        
+        # Verify
+        total = db.execute(select(func.count(PredictionChange.change_id))).scalar()
+        print(f"prediction_changes now has {total} entries")
+        print("Clients holding a '<predict_id>-<deletion_id>' cursor get 400 and resync; prediction_deletions can be dropped")
+            
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_prediction_changes()
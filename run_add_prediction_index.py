@@ -0,0 +1,42 @@
+from config.database import SessionLocal, engine
+from sqlalchemy import text, inspect
+
+def add_prediction_history_index():
+    """Create the (user_id, predict_id) index on existing predictions tables"""
+    db = SessionLocal()
+    try:
+        # Read and execute SQL file
+        with open('add_prediction_history_index.sql', 'r', encoding='utf-8') as file:
+            sql_content = file.read()
+        
+        # Drop comment lines, then split statements
+        sql_content = "\n".join(line for line in sql_content.splitlines() if not line.strip().startswith("--"))
+        statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
+        
+        for statement in statements:
+            print(f"Executing: {statement[:60]}...")
+            try:
+                db.execute(text(statement))
+                db.commit()
+            except Exception as e:
+                # Tables created by init_db after this change already have the index
+                db.rollback()
+                if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
+                    print("Index already exists, skipping")
+                else:
+                    raise
+        
+        # Verify
+        indexes = inspect(engine).get_indexes("predictions")
+        print("\nIndexes on predictions:")
+        for index in indexes:
+            print(f"- {index['name']}: {index['column_names']}")
+            
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_prediction_history_index()
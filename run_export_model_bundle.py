@@ -0,0 +1,18 @@
+import joblib
+from services.forest_bundle import export_forest_bundle, FlatForest, MODEL_PATH, BUNDLE_DIR
+import numpy as np
+
+def export_model_bundle():
+    """Convert the existing trained_model.pkl into a memory-mappable bundle without retraining"""
+    model = joblib.load(MODEL_PATH)
+    meta = export_forest_bundle(model, BUNDLE_DIR)
+    print(f"Bundle written to {BUNDLE_DIR}: {meta['n_trees']} trees, {meta['n_nodes']} nodes")
+
+    # Sanity check against the sklearn forest
+    bundle = FlatForest.load(BUNDLE_DIR)
+    X = (np.random.default_rng(0).random((200, meta["n_features"])) > 0.9).astype(np.float32)
+    diff = np.abs(bundle.predict_proba(X) - model.predict_proba(X)).max()
+    print(f"Max probability difference vs sklearn: {diff:.2e}")
+
+if __name__ == "__main__":
+    export_model_bundle()
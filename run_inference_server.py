@@ -0,0 +1,30 @@
+import os
+import signal
+import threading
+from services.inference_server import InferenceServer, parse_address, shared_server_authkey
+
+def run_inference_server():
+    """Run a shared inference server for all HTTP workers on this node.
+
+    Point the API at it with INFERENCE_SERVER_ADDRESS=host:port.
+    """
+    address = parse_address(os.getenv("INFERENCE_SERVER_ADDRESS", "127.0.0.1:8765"))
+    n_workers = int(os.getenv("INFERENCE_SERVER_WORKERS", 2))
+
+    # Refuses to start without INFERENCE_SERVER_AUTHKEY
+    server = InferenceServer(address=address, authkey=shared_server_authkey(address), n_workers=n_workers).start()
+    server.wait_ready()
+    print("✅ Model workers ready")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print("Inference server stopped")
+
+if __name__ == "__main__":
+    run_inference_server()
@@ -0,0 +1,53 @@
+import os
+from sqlalchemy import select, update
+from config.database import SessionLocal
+from models.prediction_model import Prediction
+from services.prediction_format import normalized_columns
+
+# Rows read and rewritten per transaction
+NORMALIZE_BATCH_SIZE = int(os.getenv("NORMALIZE_BATCH_SIZE", 500))
+
+def normalize_predictions(batch_size=NORMALIZE_BATCH_SIZE):
+    """Rewrite legacy prediction rows into the canonical JSON shape, one chunk per commit.
+
+    Walks the table by predict_id, so it can be stopped and re-run at any
+    time; rows that are already canonical are not written again.
+    """
+    db = SessionLocal()
+    last_id = 0
+    scanned = 0
+    updated = 0
+    try:
+        while True:
+            rows = db.execute(
+                select(Prediction).where(Prediction.predict_id > last_id).order_by(Prediction.predict_id).limit(batch_size)
+            ).scalars().all()
+            if not rows:
+                break
+
+            last_id = rows[-1].predict_id
+            changes = []
+            for p in rows:
+                columns = normalized_columns(p)
+                if any(getattr(p, name) != value for name, value in columns.items()):
+                    changes.append({"predict_id": p.predict_id, **columns})
+            if changes:
+                # Bulk UPDATE ... WHERE predict_id = ? for the changed rows of this chunk
+                db.execute(update(Prediction), changes)
+            db.commit()
+            # Do not keep a whole table of rows in the identity map
+            db.expunge_all()
+
+            scanned += len(rows)
+            updated += len(changes)
+            print(f"Scanned {scanned} predictions, normalized {updated} (up to predict_id {last_id})")
+
+        print(f"Done: {updated} of {scanned} predictions normalized")
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    normalize_predictions()
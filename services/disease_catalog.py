@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict, namedtuple
+from sqlalchemy import select
+from models.disease_model import Disease
+from utils.trigram_index import TrigramIndex, similarity
+from utils.http_cache import make_etag
+from utils.json_response import dumps
+
+# The diseases table is a few dozen rows that change only through the
+# populate/run_* scripts: keep it in memory and re-read it every TTL seconds
+# (or right away after invalidate(), e.g. when this process populated it).
+DISEASE_CATALOG_TTL = float(os.getenv("DISEASE_CATALOG_TTL", 600))
+# Resolved free-text names (fuzzy matches and misses) remembered per catalog version
+DISEASE_LOOKUP_CACHE_SIZE = int(os.getenv("DISEASE_LOOKUP_CACHE_SIZE", 4096))
+# Minimum trigram similarity (0..1) of a fuzzy match, for the whole name and for
+# each distinctive word; catches typos ('migrane', 'tension headach'), not look-alikes
+DISEASE_MATCH_THRESHOLD = float(os.getenv("DISEASE_MATCH_THRESHOLD", 0.5))
+
+# Words that describe a kind of condition rather than which one. A fuzzy match
+# needs the same set of these on both sides, so they never decide it alone:
+# 'Fungal infection' must not become 'Viral Infection', nor 'Drug Reaction'
+# 'Allergic Reaction'.
+GENERIC_TERMS = frozenset({
+    "acute", "bacterial", "chronic", "disease", "disorder", "dysfunction", "fungal", "general",
+    "illness", "infection", "inflammatory", "malaise", "mild", "minor", "reaction",
+    "related", "response", "symptom", "syndrome", "viral"
+})
+
+# Extra lookup keys for catalog names. None: a known condition without a
+# catalog page, answered as not found instead of being fuzzy-matched.
+DISEASE_ALIASES = {
+    'flu': 'Influenza',
+    'common cold': 'Common Cold',
+    'gastroenteritis': 'Gastroenteritis',
+    'food poisoning': 'Food Poisoning',
+    'viral gastritis': 'Viral Gastritis',
+    'upper respiratory infection': 'Upper Respiratory Infection',
+    'viral pharyngitis': 'Viral Pharyngitis',
+    'allergic rhinitis': 'Allergic Rhinitis',
+    'throat irritation': 'Throat Irritation',
+    'tension headache': 'Tension Headache',
+    'migraine': 'Migraine',
+    'viral infection': 'Viral Infection',
+    'influenza': 'Influenza',
+    'contact dermatitis': 'Contact Dermatitis',
+    'allergic reaction': 'Allergic Reaction',
+    'eczema': 'Eczema',
+    'vertigo': 'Vertigo',
+    # Prognosis classes of the trained model (dataset/Training.csv) that are not
+    # a catalog name themselves; only the same condition may stand in for one
+    '(vertigo) paroymsal positional vertigo': 'Vertigo',
+    'aids': None,
+    'acne': None,
+    'alcoholic hepatitis': None,
+    'allergy': None,
+    'arthritis': None,
+    'bronchial asthma': None,
+    'cervical spondylosis': None,
+    'chicken pox': None,
+    'chronic cholestasis': None,
+    'dengue': None,
+    'diabetes': None,
+    'dimorphic hemmorhoids(piles)': None,
+    'drug reaction': None,
+    'fungal infection': None,
+    'gerd': None,
+    'heart attack': None,
+    'hepatitis a': None,
+    'hepatitis b': None,
+    'hepatitis c': None,
+    'hepatitis d': None,
+    'hepatitis e': None,
+    'hypertension': None,
+    'hyperthyroidism': None,
+    'hypoglycemia': None,
+    'hypothyroidism': None,
+    'impetigo': None,
+    'jaundice': None,
+    'malaria': None,
+    'osteoarthristis': None,
+    'paralysis (brain hemorrhage)': None,
+    'peptic ulcer diseae': None,
+    'pneumonia': None,
+    'psoriasis': None,
+    'tuberculosis': None,
+    'typhoid': None,
+    'urinary tract infection': None,
+    'varicose veins': None,
+}
+
+_MISS = (None, 0.0)
+# A formatted record and its pre-serialized response documents: {kind: (body, etag)}
+_Entry = namedtuple("_Entry", ["record", "documents"])
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+_WORD = re.compile(r"[a-z0-9]+")
+
+def catalog_key(name):
+    """Lookup key: case, underscores and extra whitespace do not matter ('Viral_Infection' == 'viral infection')"""
+    return " ".join(str(name).lower().replace("_", " ").split())
+
+def base_key(name):
+    """catalog_key without parenthesized qualifiers: 'Eczema (atopic)' -> 'eczema'"""
+    return catalog_key(_PARENTHETICAL.sub(" ", str(name)))
+
+def _generic(word):
+    """The GENERIC_TERMS entry a word stands for ('infections' -> 'infection'), or None"""
+    for term in (word, word.removesuffix("s")):
+        if term in GENERIC_TERMS:
+            return term
+    return None
+
+def same_condition_terms(query, candidate, threshold=DISEASE_MATCH_THRESHOLD):
+    """Guard for a fuzzy match between two keys.
+
+    The generic words (GENERIC_TERMS) must be the same set on both sides, and
+    the remaining words must pair up one to one, each pair at least
+    ``threshold`` similar. So a typo in the distinctive word or a plural
+    passes, a shared 'infection' or 'tension' alone does not.
+    """
+    query_words, candidate_words = _WORD.findall(query), _WORD.findall(candidate)
+    if {_generic(w) for w in query_words} - {None} != {_generic(w) for w in candidate_words} - {None}:
+        return False
+    distinctive = [w for w in query_words if _generic(w) is None]
+    remaining = [w for w in candidate_words if _generic(w) is None]
+    if len(distinctive) != len(remaining):
+        return False
+    for word in distinctive:
+        best = max(remaining, key=lambda w: similarity(word, w))
+        if similarity(word, best) < threshold:
+            return False
+        remaining.remove(best)
+    return True
+
+class DiseaseCatalog:
+    """In-memory index of the diseases table.
+
+    Every disease is indexed under its normalized name, the name without
+    parenthesized qualifiers and its aliases, so an exact lookup is one dict
+    access (score 1.0). Aliases without a catalog disease are not found.
+    Other names resolve to the most trigram-similar key scoring at least
+    ``match_threshold`` that also passes same_condition_terms; the score
+    tells such a fuzzy hit apart from an exact one. That answer, or the miss,
+    is remembered until the catalog changes. ``version`` increases whenever a
+    reload finds different contents.
+
+    ``renderers`` ({kind: record -> response document}) are applied once per
+    load; ``document(name, kind)`` then hands out the encoded body and ETag of
+    an exact hit without any per-request formatting or serialization.
+    """
+
+    def __init__(self, formatter, aliases=DISEASE_ALIASES, ttl_seconds=DISEASE_CATALOG_TTL,
+                 lookup_cache_size=DISEASE_LOOKUP_CACHE_SIZE, match_threshold=DISEASE_MATCH_THRESHOLD,
+                 renderers=None):
+        self._formatter = formatter
+        self._aliases = aliases
+        self._renderers = renderers or {}
+        self.match_threshold = match_threshold
+        self.ttl_seconds = ttl_seconds
+        self.lookup_cache_size = lookup_cache_size
+        self._by_key = None
+        self._blocked = frozenset()
+        self._trigrams = None
+        self._diseases = 0
+        self._resolved = OrderedDict()
+        self._fingerprint = None
+        self._loaded_at = None
+        self._stale = False
+        self._lock = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.error = None
+
+    @property
+    def loaded(self):
+        return self._by_key is not None
+
+    def _needs_refresh(self):
+        return not self.loaded or self._stale or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def ensure_loaded(self, db):
+        """Load or refresh the catalog when due; a failed refresh keeps the previous one. Returns loaded"""
+        if not self._needs_refresh():
+            return True
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._needs_refresh():
+                try:
+                    diseases = (await db.execute(select(Disease).order_by(Disease.name))).scalars().all()
+                    self._build(diseases)
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"⚠️ Could not load disease catalog: {e}")
+                    if self.loaded:
+                        # Retry after another TTL rather than on every request
+                        self._loaded_at = time.monotonic()
+                        self._stale = False
+        return self.loaded
+
+    def _build(self, diseases):
+        records = [(d.name, self._formatter(d)) for d in diseases]
+        fingerprint = hashlib.blake2b(repr(records).encode("utf-8"), digest_size=16).hexdigest()
+        entries = [(name, self._entry(record)) for name, record in records]
+        by_key = {}
+        for name, entry in entries:
+            by_key.setdefault(catalog_key(name), entry)
+        # Full names win over qualifier-less and alias keys
+        for name, entry in entries:
+            by_key.setdefault(base_key(name), entry)
+        unmatched = set()
+        for alias, name in self._aliases.items():
+            entry = by_key.get(catalog_key(name)) if name is not None else None
+            if entry is not None:
+                by_key.setdefault(catalog_key(alias), entry)
+            else:
+                unmatched.add(catalog_key(alias))
+        # A catalog disease of that name still wins over a None alias
+        blocked = frozenset(unmatched - by_key.keys())
+
+        if fingerprint != self._fingerprint:
+            self.version += 1
+            self._fingerprint = fingerprint
+            self._resolved = OrderedDict()
+        self._by_key = by_key
+        self._blocked = blocked
+        # Blocked keys are indexed too: a typo of one is not found rather than some other disease
+        self._trigrams = TrigramIndex(list(by_key.items()) + [(key, None) for key in sorted(blocked)])
+        self._diseases = len(records)
+        self._loaded_at = time.monotonic()
+        self._stale = False
+        self.error = None
+        self.reloads += 1
+        print(f"✅ Disease catalog loaded: {len(records)} diseases, version {self.version}")
+
+    def _entry(self, record):
+        documents = {}
+        for kind, render in self._renderers.items():
+            body = dumps(render(record))
+            documents[kind] = (body, make_etag(body))
+        return _Entry(record, documents)
+
+    def _fuzzy_match(self, key):
+        for score, text, entry in self._trigrams.search(key, self.match_threshold, limit=10):
+            if same_condition_terms(key, text, self.match_threshold):
+                return (entry, score) if entry is not None else _MISS
+        return _MISS
+
+    def _resolve_entry(self, name):
+        key = catalog_key(name)
+        if not key or not self.loaded:
+            return _MISS
+        entry = self._by_key.get(key)
+        if entry is None and key not in self._blocked:
+            entry = self._by_key.get(base_key(name))
+        if entry is not None:
+            self.hits += 1
+            return entry, 1.0
+        if key in self._blocked:
+            self.misses += 1
+            return _MISS
+        match = self._resolved.get(key)
+        if match is None:
+            match = self._fuzzy_match(key)
+            self._resolved[key] = match
+            if len(self._resolved) > self.lookup_cache_size:
+                self._resolved.popitem(last=False)
+        else:
+            self._resolved.move_to_end(key)
+        if match[0] is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return match
+
+    def resolve(self, name):
+        """(formatted record, similarity score) for a disease name; (None, 0.0) when nothing matches"""
+        entry, score = self._resolve_entry(name)
+        return (entry.record, score) if entry is not None else _MISS
+
+    def document(self, name, kind):
+        """(body, etag) of the pre-rendered ``kind`` document for an exact/alias hit, or None"""
+        entry, score = self._resolve_entry(name)
+        return entry.documents[kind] if entry is not None and score == 1.0 else None
+
+    def lookup(self, name):
+        """Formatted record for a disease name, or None when no disease matches"""
+        return self.resolve(name)[0]
+
+    def invalidate(self):
+        """Re-read the table on the next lookup"""
+        self._stale = True
+
+    def stats(self):
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "diseases": self._diseases,
+            "keys": len(self._by_key) if self.loaded else 0,
+            "resolved_names": len(self._resolved),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "ttl_seconds": self.ttl_seconds,
+            "match_threshold": self.match_threshold,
+            "error": self.error
+        }
@@ -1,118 +1,91 @@
 from models.disease_model import Disease
-from config.database import SessionLocal
+from config.database import SessionLocal, with_async_session
+from services.disease_catalog import DiseaseCatalog
 
-def get_disease_by_name(disease_name: str):
-    """Get detailed disease information by name"""
-    db = SessionLocal()
-    try:
-        # Normalize disease name for lookup
-        normalized_name = disease_name.lower().strip()
-        print(f"DEBUG: Looking for disease: '{normalized_name}'")
-        
-        # Try multiple query strategies to find the disease
-        disease = None
-        
-        # 1. Exact match (case insensitive)
-        disease = db.query(Disease).filter(Disease.name.ilike(normalized_name)).first()
-        
-        # 2. If not found, try partial match
-        if not disease:
-            disease = db.query(Disease).filter(Disease.name.ilike(f"%{normalized_name}%")).first()
-        
-        # 3. If still not found, try reverse partial match
-        if not disease:
-            disease = db.query(Disease).filter(Disease.name.ilike(f"{normalized_name}%")).first()
-        
-        # 4. Try common variations
-        if not disease:
-            variations = {
-                'common cold': 'Common Cold',
-                'gastroenteritis': 'Gastroenteritis', 
-                'food poisoning': 'Food Poisoning',
-                'viral gastritis': 'Viral Gastritis',
-                'upper respiratory infection': 'Upper Respiratory Infection',
-                'viral pharyngitis': 'Viral Pharyngitis',
-                'allergic rhinitis': 'Allergic Rhinitis',
-                'throat irritation': 'Throat Irritation',
-                'tension headache': 'Tension Headache',
-                'migraine': 'Migraine',
-                'viral infection': 'Viral Infection',
-                'influenza': 'Influenza',
-                'contact dermatitis': 'Contact Dermatitis',
-                'allergic reaction': 'Allergic Reaction',
-                'eczema': 'Eczema',
-                'vertigo': 'Vertigo',
-            }
-            
-            standard_name = variations.get(normalized_name)
-            if standard_name:
-                disease = db.query(Disease).filter(Disease.name == standard_name).first()
-        
-        # 5. Try "title case" match if still not found
-        if not disease:
-            disease = db.query(Disease).filter(Disease.name == disease_name.title()).first()
-        
-        # 6. Try "capitalize" match if still not found
-        if not disease:
-            disease = db.query(Disease).filter(Disease.name == disease_name.capitalize()).first()
-        
-        # 7. Try "replace underscores" (for API queries like 'viral_infection')
-        if not disease and "_" in normalized_name:
-            alt_name = normalized_name.replace("_", " ").title()
-            disease = db.query(Disease).filter(Disease.name == alt_name).first()
-        
-        if disease:
-            print(f"DEBUG: Found disease info for '{disease.name}'")
-            # Format symptoms properly and ensure how_common is included
-            formatted_symptoms = _format_symptoms(disease.symptoms) if disease.symptoms else "Symptoms may vary - consult healthcare provider."
-            
-            return {
-                "disease_id": getattr(disease, 'disease_id', None),
-                "name": disease.name,
-                "overview": disease.overview or f"{disease.name} information is available in our database.",
-                "causes": disease.causes or "Causes information available - consult healthcare provider.",
-                "symptoms": formatted_symptoms,
-                "urgency_level": getattr(disease, 'urgency_level', 'Medium'),
-                "when_to_see_doctor": disease.when_to_see_doctor or "Consult healthcare provider if symptoms persist.",
-                "treatments": disease.treatments or "Treatment options available - consult healthcare provider.",
-                "prevention": disease.prevention or "Prevention strategies available - consult healthcare provider.",
-                "how_common": disease.how_common or _get_commonality_info(disease.name),
-                "prevalence": disease.how_common or _get_commonality_info(disease.name)  # Add both fields for compatibility
-            }
-        else:
-            print(f"DEBUG: No database record found for '{normalized_name}', returning default")
-            # Always return a "not found" marker for debugging
-            return {
-                "disease_id": None,
-                "name": disease_name,
-                "overview": f"{disease_name} is a medical condition that requires professional evaluation for proper diagnosis and treatment.",
-                "causes": "Causes can vary and should be discussed with a healthcare provider.",
-                "symptoms": "Symptoms may include the ones you've reported. Additional symptoms may be present.",
-                "when_to_see_doctor": "Consult a healthcare provider if symptoms persist or worsen.",
-                "treatments": "Treatment options are available. Please consult with a healthcare professional for appropriate treatment.",
-                "prevention": "Prevention strategies should be discussed with your healthcare provider.",
-                "how_common": "Frequency information varies. Please consult a healthcare professional for more details.",
-                "prevalence": "Frequency information varies. Please consult a healthcare professional for more details.",
-                "not_found": True
-            }
-            
-    except Exception as e:
-        print(f"DEBUG: Database error: {e}")
-        return {
-            "disease_id": None,
-            "name": disease_name,
-            "overview": f"{disease_name} is a medical condition that requires professional evaluation for proper diagnosis and treatment.",
-            "causes": "Causes can vary and should be discussed with a healthcare provider.",
-            "symptoms": "Symptoms may include the ones you've reported. Additional symptoms may be present.",
-            "when_to_see_doctor": "Consult a healthcare provider if symptoms persist or worsen.",
-            "treatments": "Treatment options are available. Please consult with a healthcare professional for appropriate treatment.",
-            "prevention": "Prevention strategies should be discussed with your healthcare provider.",
-            "how_common": "Frequency information varies. Please consult a healthcare professional for more details.",
-            "prevalence": "Frequency information varies. Please consult a healthcare professional for more details.",
-            "not_found": True
-        }
-    finally:
-        db.close()
+def _format_disease(disease):
+    """API record of a diseases row; computed once per catalog load"""
+    # Format symptoms properly and ensure how_common is included
+    formatted_symptoms = _format_symptoms(disease.symptoms) if disease.symptoms else "Symptoms may vary - consult healthcare provider."
+    
+    return {
+        "disease_id": getattr(disease, 'disease_id', None),
+        "name": disease.name,
+        "overview": disease.overview or f"{disease.name} information is available in our database.",
+        "causes": disease.causes or "Causes information available - consult healthcare provider.",
+        "symptoms": formatted_symptoms,
+        "urgency_level": getattr(disease, 'urgency_level', 'Medium'),
+        "when_to_see_doctor": disease.when_to_see_doctor or "Consult healthcare provider if symptoms persist.",
+        "treatments": disease.treatments or "Treatment options available - consult healthcare provider.",
+        "prevention": disease.prevention or "Prevention strategies available - consult healthcare provider.",
+        "how_common": disease.how_common or _get_commonality_info(disease.name),
+        "prevalence": disease.how_common or _get_commonality_info(disease.name)  # Add both fields for compatibility
+    }
+
+def _api_document(disease):
+    """GET /api/disease/{name} body for an exact/alias hit"""
+    return {"success": True, "disease": {**disease, "match_score": 1.0}}
+
+def _info_document(disease):
+    """GET /info/api/disease/{name} body: the same record minus ids and urgency"""
+    return {
+        "success": True,
+        "disease": {
+            field: disease.get(field, "")
+            for field in ("name", "overview", "symptoms", "causes", "treatments", "when_to_see_doctor", "prevention", "how_common")
+        } | {"match_score": 1.0}
+    }
+
+# Whole diseases table in memory: lookups are dict accesses, the DB is read once per TTL.
+# Response documents are rendered and encoded at load, so a hit does no formatting at all.
+disease_catalog = DiseaseCatalog(_format_disease, renderers={"api": _api_document, "info": _info_document})
+
+def _not_found_disease(disease_name: str):
+    return {
+        "disease_id": None,
+        "name": disease_name,
+        "overview": f"{disease_name} is a medical condition that requires professional evaluation for proper diagnosis and treatment.",
+        "causes": "Causes can vary and should be discussed with a healthcare provider.",
+        "symptoms": "Symptoms may include the ones you've reported. Additional symptoms may be present.",
+        "when_to_see_doctor": "Consult a healthcare provider if symptoms persist or worsen.",
+        "treatments": "Treatment options are available. Please consult with a healthcare professional for appropriate treatment.",
+        "prevention": "Prevention strategies should be discussed with your healthcare provider.",
+        "how_common": "Frequency information varies. Please consult a healthcare professional for more details.",
+        "prevalence": "Frequency information varies. Please consult a healthcare professional for more details.",
+        "not_found": True,
+        "match_score": 0.0
+    }
+
+@with_async_session
+async def get_disease_by_name(disease_name: str, db=None):
+    """Get detailed disease information by name (exact/alias match, else the closest catalog name).
+
+    ``match_score`` is 1.0 for an exact/alias hit and the trigram similarity for a fuzzy one.
+    """
+    # Only touches the DB when the catalog is cold or due for a refresh
+    await disease_catalog.ensure_loaded(db)
+    disease, score = disease_catalog.resolve(disease_name)
+    if disease:
+        return {**disease, "match_score": round(score, 3)}
+    # Always return a "not found" marker for debugging
+    return _not_found_disease(disease_name)
+
+@with_async_session
+async def get_disease_document(disease_name: str, kind="api", db=None):
+    """(body, etag) of a pre-rendered disease document, or None unless the name is an exact/alias hit"""
+    await disease_catalog.ensure_loaded(db)
+    return disease_catalog.document(disease_name, kind)
+
+@with_async_session
+async def get_diseases_by_names(disease_names, db=None):
+    """Detailed information for several names in request order; one catalog check for all of them"""
+    await disease_catalog.ensure_loaded(db)
+    resolved = {}
+    for name in disease_names:
+        if name not in resolved:
+            disease, score = disease_catalog.resolve(name)
+            resolved[name] = {**disease, "match_score": round(score, 3)} if disease else _not_found_disease(name)
+    # Separate copies, so a caller editing one entry cannot touch the catalog or a duplicate
+    return [dict(resolved[name]) for name in disease_names]
 
 def _format_symptoms(symptoms_text):
     """Convert bullet points to proper list format"""
@@ -135,23 +108,23 @@ def _format_symptoms(symptoms_text):
     
     return '\n'.join(result) if result else "Symptoms may vary - consult healthcare provider."
 
+DISEASE_COMMONALITY = {
+    "Common Cold": "Very common - Adults get 2-3 colds per year, children get more frequently",
+    "Viral Infection": "Very common - Most people get 2-4 viral infections per year",
+    "Gastroenteritis": "Common - Millions of cases annually, especially during winter months", 
+    "Food Poisoning": "Common - About 48 million cases per year in the US alone",
+    "Upper Respiratory Infection": "Very common - One of the most frequent reasons for doctor visits",
+    "Influenza": "Common - Seasonal outbreaks affect 5-20% of the population annually",
+    "Migraine": "Common - Affects about 12% of the population, more common in women",
+    "Tension Headache": "Very common - Most common type of headache experienced by adults",
+    "Contact Dermatitis": "Common - Affects about 15-20% of people at some point",
+    "Allergic Reaction": "Common - Food allergies affect 4-6% of children and 4% of adults",
+    "Eczema": "Common - Affects about 10-20% of children and 1-3% of adults"
+}
+
 def _get_commonality_info(disease_name: str):
     """Get commonality information for diseases"""
-    commonality_map = {
-        "Common Cold": "Very common - Adults get 2-3 colds per year, children get more frequently",
-        "Viral Infection": "Very common - Most people get 2-4 viral infections per year",
-        "Gastroenteritis": "Common - Millions of cases annually, especially during winter months", 
-        "Food Poisoning": "Common - About 48 million cases per year in the US alone",
-        "Upper Respiratory Infection": "Very common - One of the most frequent reasons for doctor visits",
-        "Influenza": "Common - Seasonal outbreaks affect 5-20% of the population annually",
-        "Migraine": "Common - Affects about 12% of the population, more common in women",
-        "Tension Headache": "Very common - Most common type of headache experienced by adults",
-        "Contact Dermatitis": "Common - Affects about 15-20% of people at some point",
-        "Allergic Reaction": "Common - Food allergies affect 4-6% of children and 4% of adults",
-        "Eczema": "Common - Affects about 10-20% of children and 1-3% of adults"
-    }
-    
-    return commonality_map.get(disease_name, "Commonality varies - consult healthcare provider for specific information")
+    return DISEASE_COMMONALITY.get(disease_name, "Commonality varies - consult healthcare provider for specific information")
 
 def populate_sample_diseases():
     """Populate database with sample disease information - ENHANCED"""
@@ -225,6 +198,7 @@ def populate_sample_diseases():
                 print(f"DEBUG: Added disease: {disease_data['name']}")
         
         db.commit()
+        disease_catalog.invalidate()
         
         final_count = db.query(Disease).count()
         print(f"DEBUG: Database now contains {final_count} diseases")
@@ -1,16 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from models.document_model import Document
-from config.database import SessionLocal
+from config.database import with_async_session
 from typing import List, Optional
 import os
 import base64
 from datetime import datetime
 
-def save_document(user_id: int, filename: str, file_content: str, file_type: str) -> dict:
+@with_async_session
+async def save_document(user_id: int, filename: str, file_content: str, file_type: str, db=None) -> dict:
     """Save document to database with extracted content"""
     try:
-        db = SessionLocal()
-        
         # Calculate file size (rough estimate from base64 if applicable)
         file_size = len(file_content.encode('utf-8'))
         
@@ -25,8 +24,7 @@ def save_document(user_id: int, filename: str, file_content: str, file_type: str
         )
         
         db.add(document)
-        db.commit()
-        db.refresh(document)
+        await db.commit()
         
         return {
             "success": True,
@@ -36,21 +34,19 @@ def save_document(user_id: int, filename: str, file_content: str, file_type: str
         
     except Exception as e:
         print(f"DEBUG: Error saving document: {e}")
-        if 'db' in locals():
-            db.rollback()
+        await db.rollback()
         return {
             "success": False,
             "message": f"Failed to save document: {str(e)}"
         }
-    finally:
-        if 'db' in locals():
-            db.close()
 
-def get_user_documents(user_id: int) -> List[dict]:
+@with_async_session
+async def get_user_documents(user_id: int, db=None) -> List[dict]:
     """Get all documents for a user"""
     try:
-        db = SessionLocal()
-        documents = db.query(Document).filter(Document.user_id == user_id).order_by(Document.upload_date.desc()).all()
+        documents = (await db.execute(
+            select(Document).where(Document.user_id == user_id).order_by(Document.upload_date.desc())
+        )).scalars().all()
         
         result = []
         for doc in documents:
@@ -68,15 +64,12 @@ def get_user_documents(user_id: int) -> List[dict]:
     except Exception as e:
         print(f"DEBUG: Error getting documents: {e}")
         return []
-    finally:
-        if 'db' in locals():
-            db.close()
 
-def get_document_by_id(document_id: int) -> Optional[dict]:
+@with_async_session
+async def get_document_by_id(document_id: int, db=None) -> Optional[dict]:
     """Get a specific document by ID"""
     try:
-        db = SessionLocal()
-        document = db.query(Document).filter(Document.document_id == document_id).first()
+        document = await db.get(Document, document_id)
         
         if document:
             return {
@@ -94,22 +87,19 @@ def get_document_by_id(document_id: int) -> Optional[dict]:
     except Exception as e:
         print(f"DEBUG: Error getting document: {e}")
         return None
-    finally:
-        if 'db' in locals():
-            db.close()
 
-def delete_document(document_id: int, user_id: int) -> dict:
+@with_async_session
+async def delete_document(document_id: int, user_id: int, db=None) -> dict:
     """Delete a document"""
     try:
-        db = SessionLocal()
-        document = db.query(Document).filter(
+        document = (await db.execute(select(Document).where(
             Document.document_id == document_id,
             Document.user_id == user_id
-        ).first()
+        ))).scalars().first()
         
         if document:
-            db.delete(document)
-            db.commit()
+            await db.delete(document)
+            await db.commit()
             return {
                 "success": True,
                 "message": "Document deleted successfully"
@@ -122,12 +112,8 @@ def delete_document(document_id: int, user_id: int) -> dict:
             
     except Exception as e:
         print(f"DEBUG: Error deleting document: {e}")
-        if 'db' in locals():
-            db.rollback()
+        await db.rollback()
         return {
             "success": False,
             "message": f"Failed to delete document: {str(e)}"
         }
-    finally:
-        if 'db' in locals():
-            db.close()
@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import numpy as np
+import joblib
+from scipy import sparse
+
+MODEL_PATH = os.path.join("dataset", "trained_model.pkl")
+BUNDLE_DIR = os.path.join("dataset", "model_bundle")
+# pickle: one private unpickled copy per process
+# bundle: flattened .npy arrays memory-mapped read-only, shared through the page cache
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "pickle").lower()
+# sklearn: RandomForestClassifier.predict_proba
+# flat: compile the forest to arrays and evaluate every tree in lockstep (bundles are always flat)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn").lower()
+BUNDLE_FORMAT_VERSION = 2
+BUNDLE_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+# Rows evaluated together, to bound the per-walk temporaries
+ROW_CHUNK = 1024
+COMPACT_EVERY = 4
+
+def flatten_forest(model):
+    """Flatten a fitted RandomForestClassifier into contiguous node arrays.
+
+    Nodes of all trees are concatenated. ``children[n] = (left, right)`` with
+    global indices, and leaves point at themselves so every tree can be walked
+    in lockstep. ``value`` holds each node's class probabilities.
+    """
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count, dtype=np.intp) + offset
+        is_leaf = tree.children_left == -1
+        left = np.where(is_leaf, node_ids, tree.children_left + offset)
+        right = np.where(is_leaf, node_ids, tree.children_right + offset)
+        value = tree.value[:, 0, :].astype(np.float64)
+        value = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12)
+
+        # Index arrays are stored as intp so traversal never converts them
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        children.append(np.stack([left, right], axis=1).astype(np.intp))
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+
+    arrays = {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "children": np.ascontiguousarray(np.concatenate(children)),
+        "value": np.ascontiguousarray(np.concatenate(values)),
+        "roots": np.array(roots, dtype=np.intp)
+    }
+    meta = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "n_trees": len(model.estimators_),
+        "n_nodes": int(offset),
+        "n_features": int(model.n_features_in_),
+        "n_classes": int(len(model.classes_)),
+        "max_depth": int(max(e.tree_.max_depth for e in model.estimators_))
+    }
+    return arrays, np.asarray(model.classes_).astype(str), meta
+
+def export_forest_bundle(model, directory=BUNDLE_DIR):
+    """Write the flattened forest as .npy files that API workers can memory-map"""
+    arrays, classes, meta = flatten_forest(model)
+
+    # Write next to the target and swap in, so readers never see a half-written bundle
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    np.save(os.path.join(tmp_dir, "classes.npy"), classes)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    old_dir = directory + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+class FlatForest:
+    """Array-compiled forest with the predict_proba/classes_ interface of the sklearn model.
+
+    All trees advance one level per step for a whole chunk of rows, so the
+    Python overhead is per depth level rather than per tree and per row.
+    """
+
+    def __init__(self, arrays, classes, meta):
+        self.meta = meta
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = classes
+        self.n_features_in_ = meta["n_features"]
+        self.n_trees = meta["n_trees"]
+        self.max_depth = meta["max_depth"]
+        # Every split on a 0/1 feature has a threshold in [0, 1): the branch is
+        # then just the feature bit, which skips the threshold gather/compare
+        internal = self.children[:, 0] != np.arange(len(self.feature))
+        self.binary_splits = bool(np.all((self.threshold[internal] >= 0) & (self.threshold[internal] < 1)))
+
+    @classmethod
+    def from_model(cls, model):
+        """Compile an in-memory sklearn forest"""
+        return cls(*flatten_forest(model))
+
+    @classmethod
+    def load(cls, directory=BUNDLE_DIR, mmap_mode="r"):
+        """Open a bundle written by export_forest_bundle, memory-mapped read-only by default"""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model bundle version: {meta.get('format_version')}; re-run run_export_model_bundle.py")
+        # Plain ndarray views over the mapping; np.memmap results carry per-op subclass overhead
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode).view(np.ndarray)
+            for name in BUNDLE_ARRAYS
+        }
+        classes = np.load(os.path.join(directory, "classes.npy"))
+        return cls(arrays, classes, meta)
+
+    def _leaves(self, X):
+        n_rows = len(X)
+        use_bits = self.binary_splits and bool(np.all((X == 0) | (X == 1)))
+        flat_X = X.astype(np.intp).ravel() if use_bits else X.ravel()
+        # One walk per (row, tree). Walks that reached a leaf are dropped every
+        # few steps; compacting on every step costs more than it saves.
+        leaves = np.tile(self.roots, n_rows)
+        walk_ids = np.arange(len(leaves))
+        current = leaves.copy()
+        offsets = np.repeat(np.arange(n_rows, dtype=np.intp) * X.shape[1], self.n_trees)
+        for step in range(self.max_depth):
+            x = flat_X[offsets + self.feature[current]]
+            branch = x if use_bits else (x > self.threshold[current]).astype(np.intp)
+            next_node = self.children[current, branch]
+            if step % COMPACT_EVERY == COMPACT_EVERY - 1:
+                moved = next_node != current
+                leaves[walk_ids] = next_node
+                walk_ids, current, offsets = walk_ids[moved], next_node[moved], offsets[moved]
+                if not len(walk_ids):
+                    break
+            else:
+                current = next_node
+        else:
+            leaves[walk_ids] = current
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input with {self.n_features_in_} features, got shape {X.shape}")
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), ROW_CHUNK):
+            leaves = self._leaves(X[start:start + ROW_CHUNK])
+            if len(leaves) <= 8:
+                proba[start:start + len(leaves)] = self.value[leaves].sum(axis=1)
+            else:
+                # Sum the leaf distributions as a (rows x nodes) indicator matrix product
+                indicator = sparse.csr_matrix(
+                    (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, self.n_trees)),
+                    shape=(len(leaves), len(self.feature))
+                )
+                proba[start:start + len(leaves)] = indicator @ self.value
+        return proba / self.n_trees
+
+def load_model_artifact():
+    """Load the model in the configured format and inference engine, falling back to the pickle"""
+    if MODEL_FORMAT == "bundle":
+        if os.path.exists(os.path.join(BUNDLE_DIR, "meta.json")):
+            forest = FlatForest.load(BUNDLE_DIR)
+            print(f"✅ ML model bundle memory-mapped ({forest.n_trees} trees, {forest.meta['n_nodes']} nodes)")
+            return forest
+        print(f"⚠️ MODEL_FORMAT=bundle but {BUNDLE_DIR} is missing, loading {MODEL_PATH}")
+    model = joblib.load(MODEL_PATH)
+    print("✅ ML model loaded successfully")
+    if INFERENCE_ENGINE == "flat":
+        model = FlatForest.from_model(model)
+        print(f"✅ Using flat forest engine ({model.n_trees} trees compiled)")
+    return model
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.http_cache import make_etag
+
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # 0 disables the cache
+# Upper bound on an entry's age; freshness itself is checked against the database on every read
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", 300))
+
+class HistoryCache:
+    """Serialized history pages per (user_id, page parameters), bounded by total body bytes.
+
+    Every entry carries the ``version`` of the user's history it was built
+    from (see get_history_version: row count and latest prediction_changes
+    id, one indexed query). ``get`` only returns a page whose version still
+    matches, so a write made by another worker process is seen on the next
+    read. The local write paths also call ``invalidate(user_id)`` to free the
+    memory early; a reader takes ``generation(user_id)`` before querying and
+    passes it to ``put``, so a page built from data that changed meanwhile is
+    not stored.
+    """
+
+    def __init__(self, max_bytes=HISTORY_CACHE_MAX_BYTES, ttl_seconds=HISTORY_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, version, body, etag)
+        self._user_keys = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _remove(self, key):
+        _, _, body, _ = self._entries.pop(key)
+        self.size_bytes -= len(body)
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+    def generation(self, user_id):
+        return self._generations.get(user_id, 0)
+
+    def get(self, key, version):
+        """(body, etag) for a (user_id, ...) key built from this history version, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != version or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def put(self, key, generation, version, body):
+        """Store a serialized page built from ``version`` of the history and return its ETag"""
+        etag = make_etag(body)
+        if not self.enabled or len(body) > self.max_bytes:
+            return etag
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return etag
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), version, body, etag)
+            self._user_keys.setdefault(key[0], set()).add(key)
+            self.size_bytes += len(body)
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return etag
+
+    def invalidate(self, user_id):
+        """Drop every cached page of a user (after an insert or delete)"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove(key)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+history_cache = HistoryCache()
@@ -0,0 +1,322 @@
+import os
+import queue
+import threading
+import uuid
+import warnings
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from multiprocessing.managers import BaseManager
+import numpy as np
+from services.forest_bundle import load_model_artifact
+
+# Optional inference-server mode. 0 workers and no address = predict in-process.
+#   INFERENCE_SERVER_WORKERS=N          start N model processes next to this HTTP worker
+#   INFERENCE_SERVER_ADDRESS=host:port  use a shared server (run_inference_server.py) instead,
+#                                       so all HTTP workers on a node share N model copies
+INFERENCE_SERVER_WORKERS = int(os.getenv("INFERENCE_SERVER_WORKERS", 0))
+INFERENCE_SERVER_ADDRESS = os.getenv("INFERENCE_SERVER_ADDRESS")
+# The manager speaks pickle, so the key is what stands between the port and code
+# execution: required for every shared server (loopback too, any local process can
+# connect there); the server started next to an API worker gets a random one
+INFERENCE_SERVER_AUTHKEY = os.getenv("INFERENCE_SERVER_AUTHKEY")
+INFERENCE_MAX_ROWS = int(os.getenv("INFERENCE_MAX_ROWS", 1000))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 30))
+
+def inference_server_enabled():
+    return INFERENCE_SERVER_WORKERS > 0 or bool(INFERENCE_SERVER_ADDRESS)
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return (host, int(port))
+
+def shared_server_authkey(address):
+    """Authkey for a shared server at (host, port): INFERENCE_SERVER_AUTHKEY, always required"""
+    if INFERENCE_SERVER_AUTHKEY:
+        return INFERENCE_SERVER_AUTHKEY.encode()
+    raise ValueError(f"INFERENCE_SERVER_AUTHKEY must be set for the shared inference server at {address[0]}:{address[1]}")
+
+class InferenceManager(BaseManager):
+    """Client side of the manager; typeids are registered below without callables"""
+
+InferenceManager.register("requests")
+InferenceManager.register("responses")
+InferenceManager.register("registry")
+
+class _Registry:
+    """Server-side bookkeeping shared with clients through the manager"""
+
+    def __init__(self):
+        self._classes = None
+        self._ready = threading.Event()
+
+    def set_classes(self, classes):
+        if self._classes is None:
+            self._classes = list(classes)
+        self._ready.set()
+
+    def get_classes(self, timeout=None):
+        if not self._ready.wait(timeout):
+            raise TimeoutError("No inference worker became ready")
+        return self._classes
+
+class InferenceServer:
+    """Manager endpoint with a request queue fed to N dedicated model processes.
+
+    Only small (client, slot, buffer names) tuples go through the queues; the
+    feature matrix and the probabilities live in shared memory owned by the client.
+    """
+
+    def __init__(self, address=("127.0.0.1", 0), authkey=None, n_workers=1):
+        # No key given: a private server, only this process's client learns the key
+        self.authkey = authkey or os.urandom(32)
+        self.n_workers = n_workers
+        self._requests = queue.Queue()
+        self._responses = {}
+        self._responses_lock = threading.Lock()
+        self._registry = _Registry()
+
+        class _ServerManager(BaseManager):
+            pass
+
+        _ServerManager.register("requests", callable=lambda: self._requests)
+        _ServerManager.register("responses", callable=self._get_responses)
+        _ServerManager.register("registry", callable=lambda: self._registry)
+        self._server = _ServerManager(address=address, authkey=self.authkey).get_server()
+        self.address = self._server.address
+        self._workers = []
+        self._thread = None
+
+    def _get_responses(self, client_id):
+        with self._responses_lock:
+            return self._responses.setdefault(client_id, queue.Queue())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="inference-manager", daemon=True)
+        self._thread.start()
+        ctx = mp.get_context("spawn")
+        for i in range(self.n_workers):
+            worker = ctx.Process(
+                target=_worker_main,
+                args=(self.address, self.authkey),
+                name=f"inference-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        print(f"✅ Inference server listening on {self.address[0]}:{self.address[1]} with {self.n_workers} model workers")
+        return self
+
+    def wait_ready(self, timeout=None):
+        self._registry.get_classes(timeout)
+
+    def stop(self):
+        for _ in self._workers:
+            self._requests.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        if getattr(self._server, "stop_event", None) is not None:
+            self._server.stop_event.set()
+
+def _attach(cache, name):
+    shm = cache.get(name)
+    if shm is None:
+        if len(cache) > 256:  # clients come and go; drop stale mappings
+            for old in cache.values():
+                old.close()
+            cache.clear()
+        # The client owns (and unlinks) the segment, so attach without
+        # registering it with this process's resource tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+        cache[name] = shm
+    return shm
+
+def _worker_main(address, authkey):
+    """Model process: load the forest once, then serve predict_proba requests"""
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    manager = InferenceManager(address=address, authkey=authkey)
+    manager.connect()
+    requests = manager.requests()
+    registry = manager.registry()
+
+    # Honours MODEL_FORMAT, so workers can share one memory-mapped bundle
+    model = load_model_artifact()
+    registry.set_classes([str(c) for c in model.classes_])
+
+    attached = {}
+    responses = {}
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        client_id, slot, in_name, out_name, n_rows, n_features = item
+        error = None
+        try:
+            X = np.ndarray((n_rows, n_features), dtype=np.float32, buffer=_attach(attached, in_name).buf)
+            probs = model.predict_proba(X)
+            out = np.ndarray(probs.shape, dtype=np.float64, buffer=_attach(attached, out_name).buf)
+            out[:] = probs
+        except Exception as e:
+            error = str(e)
+        if client_id not in responses:
+            responses[client_id] = manager.responses(client_id)
+        responses[client_id].put((slot, error))
+
+    for shm in attached.values():
+        shm.close()
+
+class _Slot:
+    def __init__(self, index, max_rows, n_features, n_classes):
+        self.index = index
+        self.n_features = n_features
+        self.input_shm = shared_memory.SharedMemory(create=True, size=max_rows * n_features * 4)
+        self.output_shm = shared_memory.SharedMemory(create=True, size=max_rows * n_classes * 8)
+        self.input = np.ndarray((max_rows, n_features), dtype=np.float32, buffer=self.input_shm.buf)
+        self.output = np.ndarray((max_rows, n_classes), dtype=np.float64, buffer=self.output_shm.buf)
+        self.event = threading.Event()
+        self.error = None
+        # Set when predict_proba gave up waiting; the dispatcher frees the slot once the late answer lands
+        self.abandoned = False
+        self.lock = threading.Lock()
+
+    def release(self):
+        for shm in (self.input_shm, self.output_shm):
+            shm.close()
+            shm.unlink()
+
+class InferenceClient:
+    """Stand-in for the fitted model that forwards predict_proba to the inference server.
+
+    Exposes ``classes_`` and ``predict_proba`` so predict_service can use it
+    exactly like the unpickled RandomForestClassifier.
+    """
+
+    def __init__(self, address, authkey, slots=4, max_rows=INFERENCE_MAX_ROWS):
+        self.client_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.max_rows = max_rows
+        self._n_slots = slots
+        self._manager = InferenceManager(address=address, authkey=authkey)
+        self._manager.connect()
+        self._requests = self._manager.requests()
+        self._responses = self._manager.responses(self.client_id)
+        self.classes_ = np.array(self._manager.registry().get_classes(INFERENCE_TIMEOUT))
+
+        self._slots = []
+        self._free = queue.Queue()
+        self._slots_lock = threading.Lock()
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="inference-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _ensure_slots(self, n_features):
+        if self._slots:
+            return
+        with self._slots_lock:
+            if not self._slots:
+                slots = [_Slot(i, self.max_rows, n_features, len(self.classes_)) for i in range(self._n_slots)]
+                for slot in slots:
+                    self._free.put(slot)
+                self._slots = slots
+
+    def _dispatch(self):
+        responses = self._manager.responses(self.client_id)
+        while True:
+            slot_index, error = responses.get()
+            if slot_index is None:
+                break
+            slot = self._slots[slot_index]
+            with slot.lock:
+                if slot.abandoned:
+                    # Nobody waits for this answer any more: the slot is safe to reuse
+                    slot.abandoned = False
+                    self._free.put(slot)
+                    continue
+                slot.error = error
+                slot.event.set()
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) > self.max_rows:
+            return np.vstack([self.predict_proba(X[i:i + self.max_rows]) for i in range(0, len(X), self.max_rows)])
+
+        self._ensure_slots(X.shape[1])
+        try:
+            slot = self._free.get(timeout=INFERENCE_TIMEOUT)  # waits while every slot is in flight (backpressure)
+        except queue.Empty:
+            raise TimeoutError("No inference slot became free in time")
+        if slot.n_features != X.shape[1]:
+            self._free.put(slot)
+            raise ValueError(f"Expected {slot.n_features} features, got {X.shape[1]}")
+        n_rows = len(X)
+        slot.input[:n_rows] = X
+        slot.event.clear()
+        slot.error = None
+        self._requests.put((self.client_id, slot.index, slot.input_shm.name, slot.output_shm.name, n_rows, X.shape[1]))
+        if not slot.event.wait(INFERENCE_TIMEOUT):
+            with slot.lock:
+                if not slot.event.is_set():
+                    # A late answer may still land in this slot: the dispatcher returns it to the pool then
+                    slot.abandoned = True
+                    raise TimeoutError("Inference server did not answer in time")
+        try:
+            if slot.error:
+                raise RuntimeError(f"Inference worker failed: {slot.error}")
+            return slot.output[:n_rows].copy()
+        finally:
+            self._free.put(slot)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._responses.put((None, None))
+            self._dispatcher.join(timeout=5)
+        except Exception:
+            pass
+        for slot in self._slots:
+            slot.release()
+        self._slots = []
+
+_local_server = None
+_client = None
+_client_lock = threading.Lock()
+
+def get_inference_client(slots=4):
+    """Connect to the configured inference server, starting a local one if needed"""
+    global _local_server, _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if INFERENCE_SERVER_ADDRESS:
+                    address = parse_address(INFERENCE_SERVER_ADDRESS)
+                    authkey = shared_server_authkey(address)
+                    _client = InferenceClient(address, authkey, slots=slots)
+                else:
+                    _local_server = InferenceServer(n_workers=INFERENCE_SERVER_WORKERS).start()
+                    try:
+                        _client = InferenceClient(_local_server.address, _local_server.authkey, slots=slots)
+                    except Exception:
+                        # The next attempt (ModelHolder retries) starts a fresh server; don't leave model processes behind
+                        _local_server.stop()
+                        _local_server = None
+                        raise
+    return _client
+
+def close_inference_client():
+    """Release shared memory and stop the local server (called on app shutdown)"""
+    global _local_server, _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+        if _local_server is not None:
+            _local_server.stop()
+            _local_server = None
@@ -0,0 +1,248 @@
+import re
+from functools import lru_cache
+import numpy as np
+
+# Medical rules as data. Keyword groups are matched as substrings of the
+# lower-cased symptoms; rules are tried in order and the first whose group is
+# present wins. Within a rule, the first branch whose "if" holds (any listed
+# group present OR severity in the listed values) supplies the results.
+KEYWORD_GROUPS = {
+    "digestive": ['diarrhea', 'diarrhoea', 'nausea', 'vomiting', 'stomach', 'abdominal'],
+    "respiratory": ['cough', 'throat', 'breathing', 'chest', 'runny', 'congestion'],
+    "febrile": ['fever', 'chills', 'sweating'],
+    "fever": ['fever'],
+    "pain": ['headache', 'pain', 'ache', 'joint', 'muscle'],
+    "headache": ['headache'],
+    "skin": ['rash', 'itching', 'skin', 'redness'],
+    "neurological": ['dizziness', 'blurred', 'vision', 'balance'],
+    "fatigue": ['fatigue', 'tired', 'weakness', 'malaise'],
+    "digestive_upset": ['diarrhea', 'nausea', 'vomiting']
+}
+
+LOGICAL_RULES = [
+    {"when": "digestive", "branches": [
+        {"if": {"groups": ["fever"], "severity": ["Moderate", "Severe"]}, "results": [
+            ('Gastroenteritis', 88.0), ('Food Poisoning', 78.0), ('Viral Gastritis', 68.0)]},
+        {"results": [
+            ('Irritable Bowel Syndrome', 75.0), ('Food Intolerance', 65.0), ('Functional Dyspepsia', 55.0)]}
+    ]},
+    {"when": "respiratory", "branches": [
+        {"if": {"groups": ["fever"]}, "results": [
+            ('Upper Respiratory Infection', 85.0), ('Viral Pharyngitis', 75.0), ('Common Cold', 65.0)]},
+        {"results": [
+            ('Common Cold', 80.0), ('Allergic Rhinitis', 70.0), ('Throat Irritation', 60.0)]}
+    ]},
+    {"when": "febrile", "branches": [
+        {"if": {"severity": ["Severe"]}, "results": [
+            ('Viral Infection', 85.0), ('Influenza', 75.0), ('Bacterial Infection', 65.0)]},
+        {"results": [
+            ('Viral Infection', 80.0), ('Common Cold', 70.0), ('Mild Viral Infection', 60.0)]}
+    ]},
+    {"when": "pain", "branches": [
+        {"if": {"groups": ["headache"]}, "results": [
+            ('Tension Headache', 80.0), ('Migraine', 70.0), ('Stress Headache', 60.0)]},
+        {"results": [
+            ('Muscle Strain', 75.0), ('Arthralgia', 65.0), ('Inflammatory Pain', 55.0)]}
+    ]},
+    {"when": "skin", "branches": [
+        {"results": [('Contact Dermatitis', 80.0), ('Allergic Reaction', 70.0), ('Eczema', 60.0)]}
+    ]},
+    {"when": "neurological", "branches": [
+        {"results": [('Vertigo', 75.0), ('Inner Ear Disorder', 65.0), ('Vestibular Dysfunction', 55.0)]}
+    ]},
+    {"when": "fatigue", "branches": [
+        {"results": [('Viral Infection', 75.0), ('Chronic Fatigue', 65.0), ('Sleep Disorder', 55.0)]}
+    ]}
+]
+
+NO_SYMPTOM_RESULTS = [
+    ('General Health Assessment Needed', 75.0), ('Wellness Check Required', 65.0), ('Preventive Care Consultation', 55.0)
+]
+DEFAULT_RESULTS = [
+    ('General Viral Illness', 70.0), ('Stress-Related Symptoms', 60.0), ('Minor Acute Illness', 50.0)
+]
+
+# ML classes that are dropped unless the model is at least this confident
+SEVERE_DISEASES = ['heart attack', 'aids', 'tuberculosis', 'cancer', 'paralysis']
+SEVERE_MIN_PROBABILITY = 50.0
+
+# ML classes that never fit a symptom group
+DISEASE_EXCLUSIONS = [
+    {"when": "digestive_upset", "exclude": ['vertigo', 'impetigo', 'acne', 'arthritis', 'cervical']}
+]
+
+# ML candidates considered after filtering, and results returned
+ML_CANDIDATES = 7
+TOP_RESULTS = 3
+
+def is_duplicate_name(a, b):
+    """Fuzzy duplicate test on lower-cased names: equal or one contains the other"""
+    return a == b or a in b or b in a
+
+class ClassIndex:
+    """Per-model arrays over the ML classes, so filtering needs no per-class Python.
+
+    ``conflicts[i]`` is every known name (rule results and classes, lower-cased)
+    that counts as a duplicate of class i.
+    """
+
+    def __init__(self, engine, classes):
+        self.names = [str(c) for c in classes]
+        self.lower = [n.lower() for n in self.names]
+        profiles = [engine.disease_profile(n) for n in self.lower]
+        self.severe = np.array([severe for severe, _ in profiles], dtype=bool)
+        # One boolean row per exclusion rule: cost grows with rules, not classes
+        self.exclusions = [
+            (bits, np.array([bool(excluded_by & bits) for _, excluded_by in profiles], dtype=bool))
+            for bits in engine.exclusion_bits
+        ]
+        known = set(engine.result_names) | set(self.lower)
+        self.conflicts = [frozenset(k for k in known if is_duplicate_name(name, k)) for name in self.lower]
+
+class MedicalRuleEngine:
+    """Rule tables compiled into group bitmasks.
+
+    Every symptom string is scanned once by a single multi-pattern regex and its
+    group bitmask memoized; a request then ORs the masks of its symptoms and
+    evaluates rules and disease exclusions with integer tests only.
+    """
+
+    def __init__(self, keyword_groups, logical_rules, exclusions, severe_diseases, severe_min_probability,
+                 no_symptom_results, default_results):
+        self.group_bits = {name: 1 << i for i, name in enumerate(keyword_groups)}
+        keyword_bits = {}
+        for name, keywords in keyword_groups.items():
+            for keyword in keywords:
+                keyword_bits[keyword] = keyword_bits.get(keyword, 0) | self.group_bits[name]
+        # Only the longest keyword starting at a position is reported, so each
+        # keyword also carries the bits of every keyword contained in it
+        self._keyword_bits = {
+            keyword: self._or_bits(bits for other, bits in keyword_bits.items() if other in keyword)
+            for keyword in keyword_bits
+        }
+        alternation = "|".join(re.escape(k) for k in sorted(keyword_bits, key=len, reverse=True))
+        self._matcher = re.compile(f"(?=({alternation}))")
+
+        self._rules = []
+        for rule in logical_rules:
+            branches = []
+            for branch in rule["branches"]:
+                condition = branch.get("if")
+                groups = self._or_bits(self.group_bits[g] for g in condition.get("groups", [])) if condition else 0
+                severities = frozenset(condition.get("severity", [])) if condition else frozenset()
+                branches.append((condition is None, groups, severities, tuple(branch["results"])))
+            self._rules.append((self.group_bits[rule["when"]], branches))
+
+        self._exclusions = [(self.group_bits[e["when"]], tuple(e["exclude"])) for e in exclusions]
+        self.exclusion_bits = sorted({bits for bits, _ in self._exclusions})
+        self._severe_diseases = tuple(severe_diseases)
+        self._severe_min_probability = severe_min_probability
+        self._no_symptom_results = tuple(no_symptom_results)
+        self._default_results = tuple(default_results)
+        self.result_names = {
+            disease.lower()
+            for results in [no_symptom_results, default_results] + [b["results"] for r in logical_rules for b in r["branches"]]
+            for disease, _ in results
+        }
+        self._class_index = None
+        self._class_indexes = lru_cache(maxsize=16)(lambda names: ClassIndex(self, names))
+        # Per-instance memoization of the per-string scans
+        self.symptom_bits = lru_cache(maxsize=4096)(self._symptom_bits)
+        self.disease_profile = lru_cache(maxsize=4096)(self._disease_profile)
+
+    @staticmethod
+    def _or_bits(values):
+        mask = 0
+        for value in values:
+            mask |= value
+        return mask
+
+    def _symptom_bits(self, symptom):
+        return self._or_bits(self._keyword_bits[m.group(1)] for m in self._matcher.finditer(str(symptom).lower()))
+
+    def symptom_mask(self, symptoms):
+        """Bitmask of every keyword group present in the symptoms"""
+        mask = 0
+        for symptom in symptoms:
+            mask |= self.symptom_bits(symptom)
+        return mask
+
+    def _disease_profile(self, disease_name):
+        """(is severe, mask of symptom groups that exclude it) for a lower-cased disease name"""
+        severe = any(s in disease_name for s in self._severe_diseases)
+        excluded_by = self._or_bits(bits for bits, names in self._exclusions if any(n in disease_name for n in names))
+        return severe, excluded_by
+
+    @staticmethod
+    def _as_results(results):
+        return [{'disease': disease, 'probability': probability} for disease, probability in results]
+
+    def logical_diseases(self, symptoms, severity, mask=None):
+        if not symptoms:
+            return self._as_results(self._no_symptom_results)
+        if mask is None:
+            mask = self.symptom_mask(symptoms)
+        for when, branches in self._rules:
+            if not mask & when:
+                continue
+            for unconditional, groups, severities, results in branches:
+                if unconditional or mask & groups or severity in severities:
+                    return self._as_results(results)
+        return self._as_results(self._default_results)
+
+    def class_index(self, classes):
+        """ClassIndex for a model's classes_, reused while the same array is passed in"""
+        cached = self._class_index
+        if cached is not None and cached[0] is classes:
+            return cached[1]
+        index = self._class_indexes(tuple(str(c) for c in classes))
+        self._class_index = (classes, index)
+        return index
+
+    def top_results(self, mask, logical, percentages, index, n=TOP_RESULTS, ml_candidates=ML_CANDIDATES):
+        """Merge the rule results with the best acceptable ML classes.
+
+        Same outcome as sorting every class by probability (ties in class
+        order), dropping inappropriate ones, taking the first ``ml_candidates``,
+        skipping fuzzy duplicates and keeping the ``n`` most probable overall;
+        only the returned ML entries become dicts.
+        """
+        ml = []
+        if len(percentages):
+            good = ~(index.severe & (percentages < self._severe_min_probability))
+            for bits, rows in index.exclusions:
+                if mask & bits:
+                    good &= ~rows
+            candidates = np.flatnonzero(good)
+            if len(candidates) > ml_candidates:
+                values = percentages[candidates]
+                kth = values[np.argpartition(-values, ml_candidates - 1)[ml_candidates - 1]]
+                # Keep every class above the cut and the lowest-index ties on it
+                above = candidates[values > kth]
+                ties = candidates[values == kth][:ml_candidates - len(above)]
+                candidates = np.concatenate([above, ties])
+            ordered = candidates[np.lexsort((candidates, -percentages[candidates]))]
+
+            accepted = {c['disease'].lower() for c in logical}
+            for i in ordered:
+                # At most n ML entries can reach the final n
+                if len(ml) == n:
+                    break
+                if index.conflicts[i].isdisjoint(accepted):
+                    accepted.add(index.lower[i])
+                    ml.append({'disease': index.names[i], 'probability': float(percentages[i])})
+
+        # Both lists are already descending; rule results win ties
+        merged = sorted(logical + ml, key=lambda x: x['probability'], reverse=True)
+        return merged[:n]
+
+    def is_inappropriate(self, mask, disease_name, probability):
+        severe, excluded_by = self.disease_profile(disease_name)
+        if severe and probability < self._severe_min_probability:
+            return True
+        return bool(mask & excluded_by)
+
+rule_engine = MedicalRuleEngine(
+    KEYWORD_GROUPS, LOGICAL_RULES, DISEASE_EXCLUSIONS, SEVERE_DISEASES, SEVERE_MIN_PROBABILITY,
+    NO_SYMPTOM_RESULTS, DEFAULT_RESULTS
+)
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+import joblib
+from services.symptom_encoder import SymptomEncoder
+from services.inference_server import inference_server_enabled, get_inference_client
+from services.forest_bundle import load_model_artifact
+
+SYMPTOM_COLUMNS_PATH = os.path.join("dataset", "symptom_columns.pkl")
+# After a failed load, serve the fallback logic for this long before touching the disk again
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", 30))
+
+class ModelHolder:
+    """Process-wide owner of the ML model, symptom columns and encoder.
+
+    Loading is single-flight under a lock, failures are cached for
+    MODEL_RETRY_SECONDS, and ``status()`` reports readiness for /health.
+    """
+
+    def __init__(self, duration_values, severity_values, inference_slots=4):
+        self._duration_values = duration_values
+        self._severity_values = severity_values
+        self._inference_slots = inference_slots
+        self._lock = threading.Lock()
+        self.model = None
+        self.symptom_columns = None
+        self.encoder = None
+        self.state = "cold"  # cold -> loading -> ready | failed
+        self.error = None
+        self.failed_at = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.version = 0
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def _in_backoff(self):
+        return self.state == "failed" and time.monotonic() - self.failed_at < MODEL_RETRY_SECONDS
+
+    def ensure_loaded(self):
+        """Return True when the model is usable; load it at most once at a time"""
+        if self.state == "ready":
+            return True
+        if self._in_backoff():
+            return False
+        with self._lock:
+            # Another thread may have finished (or failed) while we waited
+            if self.state == "ready":
+                return True
+            if self._in_backoff():
+                return False
+            return self._load()
+
+    def _load(self):
+        self.state = "loading"
+        started = time.monotonic()
+        try:
+            if inference_server_enabled():
+                # Same predict_proba/classes_ interface, served by dedicated model processes
+                model = get_inference_client(slots=self._inference_slots)
+                print("✅ Connected to inference server")
+            else:
+                model = load_model_artifact()
+            symptom_columns = joblib.load(SYMPTOM_COLUMNS_PATH)
+            print("✅ Symptom columns loaded successfully")
+            encoder = SymptomEncoder(symptom_columns, self._duration_values, self._severity_values)
+        except Exception as e:
+            self.error = str(e)
+            if self.model is not None:
+                # A failed reload keeps serving the previous model
+                self.state = "ready"
+                print(f"⚠️ Warning: Model reload failed, keeping version {self.version}: {e}")
+                return False
+            self.state = "failed"
+            self.failed_at = time.monotonic()
+            print(f"⚠️ Warning: Could not load ML model: {e}")
+            print(f"🔄 Using fallback prediction logic (next retry in {MODEL_RETRY_SECONDS:.0f}s)")
+            return False
+
+        self.model = model
+        self.symptom_columns = symptom_columns
+        self.encoder = encoder
+        self.error = None
+        self.failed_at = None
+        self.loaded_at = time.time()
+        self.load_seconds = round(time.monotonic() - started, 3)
+        self.version += 1
+        self.state = "ready"
+        return True
+
+    def warm(self):
+        """Eagerly load during application startup"""
+        return self.ensure_loaded()
+
+    def reload(self):
+        """Force a fresh load from disk (e.g. after retraining)"""
+        with self._lock:
+            return self._load()
+
+    def status(self):
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+            "retry_in_seconds": round(MODEL_RETRY_SECONDS - (time.monotonic() - self.failed_at), 1) if self._in_backoff() else None
+        }
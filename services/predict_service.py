@@ -1,65 +1,64 @@
-import pandas as pd
-import joblib
 import os
+import numpy as np
+import warnings
+from datetime import datetime, timedelta
 from sqlalchemy.exc import IntegrityError
-from models.prediction_model import Prediction
+from models.prediction_model import Prediction, PredictionChange
 from models.user_model import User
-from config.database import SessionLocal
-import json
+from sqlalchemy import select, func
+from sqlalchemy.orm import load_only
+from config.database import with_session, with_async_session
+from services.model_holder import ModelHolder
+from services.prediction_cache import PredictionCache, make_key
+from services.medical_rules import rule_engine
+from services.prediction_writer import prediction_writer
+from services.history_cache import history_cache
+from services.prediction_format import (
+    normalize_dynamic_answers, normalize_user_journey, normalize_other_symptoms,
+    format_stored_prediction, format_prediction_summary
+)
+from utils.executor import PREDICT_WORKERS
 
-# Make model loading more resilient
-model = None
-symptom_columns = None
-
-def load_model_safely():
-    """Load model and symptom columns safely"""
-    global model, symptom_columns
-    try:
-        if model is None:
-            model = joblib.load(os.path.join("dataset", "trained_model.pkl"))
-            print("✅ ML model loaded successfully")
-        if symptom_columns is None:
-            symptom_columns = joblib.load(os.path.join("dataset", "symptom_columns.pkl"))
-            print("✅ Symptom columns loaded successfully")
-        return True
-    except Exception as e:
-        print(f"⚠️ Warning: Could not load ML model: {e}")
-        print("🔄 Using fallback prediction logic")
-        return False
+# Longest a transaction may take between writing its prediction_changes entry and
+# committing; the sync cursor only moves past changes older than this
+HISTORY_SYNC_SETTLE_SECONDS = float(os.getenv("HISTORY_SYNC_SETTLE_SECONDS", 30))
 
 # Initialize fallback data
 duration_values = ["1-3 days", "4-7 days", "More than a week"]
 severity_values = ["Mild", "Moderate", "Severe"]
 
+# Single-flight model loading with a cached failure window; warmed on startup
+model_holder = ModelHolder(duration_values, severity_values, inference_slots=PREDICT_WORKERS)
+
+# Scored top results per canonical input; dropped whenever the model version changes
+prediction_cache = PredictionCache()
+
+def load_model_safely():
+    """Load model and symptom columns safely"""
+    return model_holder.ensure_loaded()
+
 def encode_input(symptoms, duration, severity):
     # Try to load model if not already loaded
     if not load_model_safely():
         # Use fallback encoding if model loading fails
         return create_fallback_encoding(symptoms, duration, severity)
     
-    vector = [0] * len(symptom_columns)
-    for symptom in symptoms:
-        s = symptom.lower()
-        if s == "fever":
-            if severity == "Mild" and "mild_fever" in symptom_columns:
-                vector[symptom_columns.index("mild_fever")] = 1
-            elif severity in ["Moderate", "Severe"] and "high_fever" in symptom_columns:
-                vector[symptom_columns.index("high_fever")] = 1
-        elif s in symptom_columns:
-            vector[symptom_columns.index(s)] = 1
-    df = pd.DataFrame([vector], columns=symptom_columns)
-    for val in duration_values:
-        df[f"duration_{val}"] = 1 if duration == val else 0
-    for val in severity_values:
-        df[f"severity_{val}"] = 1 if severity == val else 0
-    return df
+    # Precompiled encoder: dict lookups into a (1, n_features) NumPy row
+    return model_holder.encoder.encode(symptoms, duration, severity)
 
 def create_fallback_encoding(symptoms, duration, severity):
     """Create simple fallback when ML model is not available"""
     return {"symptoms": symptoms, "duration": duration, "severity": severity}
 
-def check_user_exists(user_id):
-    db = SessionLocal()
+def _is_unknown_user_error(error):
+    """True when an IntegrityError is the predictions.user_id foreign key refusing the row"""
+    orig = getattr(error, "orig", error)
+    args = getattr(orig, "args", ())
+    # MySQL 1452: Cannot add or update a child row; SQLite reports the FK by message only
+    return (bool(args) and args[0] == 1452) or "FOREIGN KEY constraint failed" in str(orig)
+
+@with_session
+def check_user_exists(user_id, db=None):
     try:
         user = db.query(User).filter(User.user_id == user_id).first()
         return user is not None
@@ -67,113 +66,293 @@ def check_user_exists(user_id):
         print(f"DEBUG: Database error in check_user_exists: {e}")
         # Return True to allow prediction to continue
         return True
-    finally:
-        try:
-            db.close()
-        except:
-            pass
 
-def predict_result(data):
+def _parse_predict_input(data):
+    """Normalize one prediction payload into the values the pipeline works on"""
     symptoms = [s.lower() for s in data.get("symptoms", [])]
     duration_input = data.get("duration", "1-3 days").strip().lower()
     severity_input = data.get("severity", "Mild").strip().lower()
     user_id = data.get("user_id")
-    
-    # NEW: Extract comprehensive assessment data
-    dynamic_answers = data.get("dynamic_answers", [])
-    user_journey = data.get("user_journey", {})
-    assessment_timestamp = data.get("timestamp")
 
     if not user_id or not isinstance(user_id, int):
         raise ValueError("User ID tidak valid")
-    
-    # Make user check more resilient
-    try:
-        if not check_user_exists(user_id):
-            raise ValueError("User tidak ditemukan")
-    except Exception as db_error:
-        print(f"DEBUG: Database error checking user, proceeding anyway: {db_error}")
-        # Continue with prediction even if user check fails
 
     duration = next((d for d in duration_values if d.lower() == duration_input), "1-3 days")
     severity = next((s for s in severity_values if s.lower() == severity_input), "Mild")
 
-    # Try to use ML model, fallback to logic-based prediction
-    raw_predictions = []
-    try:
-        if load_model_safely() and model is not None:
-            input_df = encode_input(symptoms, duration, severity)
-            if hasattr(input_df, 'predict_proba'):  # Check if it's a proper DataFrame
-                probs = model.predict_proba(input_df)[0]
-                classes = model.classes_
-                raw_predictions = [
-                    {"disease": classes[i], "probability": round(float(probs[i]) * 100, 2)}
-                    for i in range(len(classes))
-                ]
-                print("✅ Using ML predictions")
+    return {
+        "user_id": user_id,
+        "symptoms": symptoms,
+        "duration": duration,
+        "severity": severity,
+        # NEW: Extract comprehensive assessment data, in the canonical stored shape
+        "dynamic_answers": normalize_dynamic_answers(data.get("dynamic_answers", [])),
+        "user_journey": normalize_user_journey(data.get("user_journey", {})),
+        "assessment_timestamp": _assessment_time(data.get("timestamp"))
+    }
+
+def _assessment_time(value):
+    """Client-supplied assessment time (datetime or ISO string), else now; the history date filters use it"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.now()
+
+def _predict_proba(model, X):
+    """model.predict_proba without the feature-name warning for bare arrays"""
+    # The encoder lays rows out in the trained column order, so the fitted
+    # feature names do not need to travel with every array
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict_proba(X)
+
+def _to_percentages(probs):
+    """predict_proba output (one row or a matrix) as percentages rounded to 2 decimals"""
+    return np.round(np.asarray(probs, dtype=np.float64) * 100, 2)
+
+def _prediction_values(parsed, top_3_results, assessment_summary):
+    """Column values of the Prediction row for a scored input"""
+    symptoms = parsed["symptoms"]
+    return {
+        "user_id": parsed["user_id"],
+        "main_symptom": symptoms[0] if symptoms else None,
+        "other_symptoms": normalize_other_symptoms(", ".join(symptoms[1:])),
+        "duration": parsed["duration"],
+        "severity": parsed["severity"],
+        "top_results": top_3_results,
+        "dynamic_answers": parsed["dynamic_answers"],
+        "user_journey": parsed["user_journey"],
+        "assessment_summary": assessment_summary,
+        "total_symptoms_count": len(symptoms),
+        "assessment_timestamp": parsed["assessment_timestamp"]
+    }
+
+def _build_prediction(parsed, top_3_results, assessment_summary):
+    """Create the Prediction row for a scored input"""
+    return Prediction(**_prediction_values(parsed, top_3_results, assessment_summary))
+
+def _format_result(predict_id, parsed, top_3_results, assessment_summary):
+    """Response payload for a scored input"""
+    symptoms = parsed["symptoms"]
+    return {
+        "predict_id": predict_id,
+        "input": {
+            "main_symptom": symptoms[0] if symptoms else None,
+            "other_symptoms": symptoms[1:] if len(symptoms) > 1 else [],
+            "duration": parsed["duration"],
+            "severity": parsed["severity"],
+            "dynamic_answers": parsed["dynamic_answers"],
+            "user_journey": parsed["user_journey"],
+            "total_symptoms": len(symptoms)
+        },
+        "top_results": top_3_results,
+        "assessment_summary": assessment_summary
+    }
+
+@with_session
+def predict_result(data, db=None):
+    parsed = _parse_predict_input(data)
+    user_id = parsed["user_id"]
+    symptoms = parsed["symptoms"]
+    duration = parsed["duration"]
+    severity = parsed["severity"]
+
+    # No separate user lookup: the predictions.user_id foreign key rejects
+    # unknown users on insert, which saves a round trip per request
+
+    # Identical (symptoms, duration, severity) inputs score identically for a
+    # given model version, so repeats skip encoding, inference and the rules
+    model_ready = load_model_safely()
+    model_version = model_holder.version
+    cache_key = make_key(symptoms, duration, severity)
+    top_3_results = prediction_cache.get(cache_key, model_version)
+    if top_3_results is not None:
+        print("✅ Prediction cache hit")
+    else:
+        # Try to use ML model, fallback to logic-based prediction
+        raw_predictions = []
+        classes = None
+        try:
+            if model_ready:
+                model = model_holder.model
+                input_row = encode_input(symptoms, duration, severity)
+                if isinstance(input_row, np.ndarray):  # Fallback encoding is a plain dict
+                    probs = _predict_proba(model, input_row)[0]
+                    raw_predictions, classes = _to_percentages(probs), model.classes_
+                    print("✅ Using ML predictions")
+                else:
+                    print("🔄 Fallback: ML model unavailable, using logic-based predictions")
             else:
-                print("🔄 Fallback: ML model unavailable, using logic-based predictions")
-        else:
-            print("🔄 Using logic-based predictions only")
-    except Exception as ml_error:
-        print(f"⚠️ ML prediction failed: {ml_error}, using logic-based predictions")
-    
-    # APPLY ENHANCED MEDICAL LOGIC (works with or without ML)
-    final_results = apply_enhanced_medical_logic(symptoms, raw_predictions, duration, severity)
-    
-    # Always ensure exactly 3 results
-    top_3_results = final_results[:3]
+                print("🔄 Using logic-based predictions only")
+        except Exception as ml_error:
+            print(f"⚠️ ML prediction failed: {ml_error}, using logic-based predictions")
+        
+        # APPLY ENHANCED MEDICAL LOGIC (works with or without ML)
+        final_results = apply_enhanced_medical_logic(symptoms, raw_predictions, duration, severity, classes)
+        
+        # Always ensure exactly 3 results
+        top_3_results = final_results[:3]
+        # Logic-only fallbacks are not cached, so a transient ML failure does not stick
+        if classes is not None:
+            prediction_cache.put(cache_key, model_version, top_3_results)
+
+    assessment_summary = _generate_assessment_summary(symptoms, duration, severity, parsed["dynamic_answers"], parsed["user_journey"])
     
     print(f"DEBUG: Returning prediction with {len(top_3_results)} results")
     print(f"DEBUG: Top results: {top_3_results}")
 
+    # Write-behind: the id comes from a reserved block and the row is inserted in the background
+    if prediction_writer.enabled:
+        # The row is inserted later, so the foreign key cannot answer for the user here
+        if not check_user_exists(user_id, db=db):
+            raise ValueError("User tidak ditemukan")
+        predict_id = prediction_writer.submit(_prediction_values(parsed, top_3_results, assessment_summary))
+        if predict_id is not None:
+            return _format_result(predict_id, parsed, top_3_results, assessment_summary)
+        # No ids could be reserved (DB unreachable): fall back to saving inline
+
     # Try to save comprehensive data to database
     predict_id = None
     try:
-        db = SessionLocal()
-        prediction = Prediction(
-            user_id=user_id,
-            main_symptom=symptoms[0] if symptoms else None,
-            other_symptoms=", ".join(symptoms[1:]) if len(symptoms) > 1 else "",
-            duration=duration,
-            severity=severity,
-            top_results=top_3_results,
-            dynamic_answers=dynamic_answers,
-            user_journey=user_journey,
-            assessment_summary=_generate_assessment_summary(symptoms, duration, severity, dynamic_answers, user_journey),
-            total_symptoms_count=len(symptoms),
-            assessment_timestamp=assessment_timestamp
-        )
+        prediction = _build_prediction(parsed, top_3_results, assessment_summary)
         db.add(prediction)
-        db.commit()
-        db.refresh(prediction)
+        db.flush()
+        # Read before commit, which expires the instance
         predict_id = prediction.predict_id
+        db.add(PredictionChange(predict_id=predict_id, user_id=user_id))
+        db.commit()
+        history_cache.invalidate(user_id)
         print(f"DEBUG: Successfully saved comprehensive prediction with ID: {predict_id}")
+    except IntegrityError as e:
+        db.rollback()
+        if _is_unknown_user_error(e):
+            raise ValueError("User tidak ditemukan")
+        raise
     except Exception as e:
         print(f"DEBUG: Failed to save prediction to database: {e}")
+        db.rollback()
         import time
         predict_id = int(time.time())
-    finally:
+
+    return _format_result(predict_id, parsed, top_3_results, assessment_summary)
+
+def _existing_user_ids(user_ids, db):
+    """Return the subset of user_ids present in the users table with a single IN query"""
+    rows = db.query(User.user_id).filter(User.user_id.in_(set(user_ids))).all()
+    return {row[0] for row in rows}
+
+def _save_batch(values, db):
+    """Insert many Prediction rows in one flush/commit and return their ids, or None if nothing was saved"""
+    predictions = [Prediction(**v) for v in values]
+    try:
+        db.add_all(predictions)
+        db.flush()
+        # Read before commit, which expires the instances
+        predict_ids = [prediction.predict_id for prediction in predictions]
+        db.add_all([PredictionChange(predict_id=i, user_id=v["user_id"]) for i, v in zip(predict_ids, values)])
+        db.commit()
+        for user_id in {v["user_id"] for v in values}:
+            history_cache.invalidate(user_id)
+        return predict_ids
+    except Exception as e:
+        print(f"DEBUG: Failed to save batch predictions to database: {e}")
+        db.rollback()
+        return None
+
+@with_session
+def predict_batch(items, db=None):
+    """Score many symptom sets with one predict_proba call and one bulk insert.
+
+    Returns one entry per input item, in input order. Invalid items are
+    reported individually and do not fail the rest of the batch.
+    """
+    entries = [{"index": i, "success": False, "data": None, "error": None} for i in range(len(items))]
+
+    parsed_items = {}
+    for i, data in enumerate(items):
         try:
-            db.close()
-        except:
-            pass
+            parsed_items[i] = _parse_predict_input(data)
+        except Exception as e:
+            entries[i]["error"] = str(e)
 
-    result = {
-        "predict_id": predict_id,
-        "input": {
-            "main_symptom": symptoms[0] if symptoms else None,
-            "other_symptoms": symptoms[1:] if len(symptoms) > 1 else [],
-            "duration": duration,
-            "severity": severity,
-            "dynamic_answers": dynamic_answers,
-            "user_journey": user_journey,
-            "total_symptoms": len(symptoms)
-        },
-        "top_results": top_3_results,
-        "assessment_summary": _generate_assessment_summary(symptoms, duration, severity, dynamic_answers, user_journey)
-    }
-    return result
+    if parsed_items:
+        try:
+            known_users = _existing_user_ids((p["user_id"] for p in parsed_items.values()), db)
+            for i in list(parsed_items):
+                if parsed_items[i]["user_id"] not in known_users:
+                    entries[i]["error"] = "User tidak ditemukan"
+                    del parsed_items[i]
+        except Exception as db_error:
+            print(f"DEBUG: Database error checking users, proceeding anyway: {db_error}")
+
+    order = list(parsed_items)
+    if not order:
+        return entries
+
+    model_ready = load_model_safely()
+    model_version = model_holder.version
+
+    # Cached inputs skip the matrix entirely
+    cached = {}
+    for i in order:
+        p = parsed_items[i]
+        hit = prediction_cache.get(make_key(p["symptoms"], p["duration"], p["severity"]), model_version)
+        if hit is not None:
+            cached[i] = hit
+    to_score = [i for i in order if i not in cached]
+
+    # Encode every remaining item into one matrix and run the forest once
+    probs_matrix = None
+    model = None
+    try:
+        if model_ready and to_score:
+            model, encoder = model_holder.model, model_holder.encoder
+            matrix = np.zeros((len(to_score), encoder.n_features), dtype=np.float32)
+            for row, i in enumerate(to_score):
+                p = parsed_items[i]
+                encoder.fill_row(matrix[row], p["symptoms"], p["duration"], p["severity"])
+            probs_matrix = _to_percentages(_predict_proba(model, matrix))
+            print(f"✅ Using ML predictions for batch of {len(to_score)} ({len(cached)} cached)")
+        elif to_score:
+            print("🔄 Using logic-based predictions only")
+    except Exception as ml_error:
+        print(f"⚠️ Batch ML prediction failed: {ml_error}, using logic-based predictions")
+
+    rows = {i: row for row, i in enumerate(to_score)}
+    scored = []
+    for i in order:
+        p = parsed_items[i]
+        try:
+            top_3_results = cached.get(i)
+            if top_3_results is None:
+                if probs_matrix is not None:
+                    top_3_results = apply_enhanced_medical_logic(p["symptoms"], probs_matrix[rows[i]], p["duration"], p["severity"], model.classes_)[:3]
+                    prediction_cache.put(make_key(p["symptoms"], p["duration"], p["severity"]), model_version, top_3_results)
+                else:
+                    top_3_results = apply_enhanced_medical_logic(p["symptoms"], [], p["duration"], p["severity"])[:3]
+            assessment_summary = _generate_assessment_summary(p["symptoms"], p["duration"], p["severity"], p["dynamic_answers"], p["user_journey"])
+            scored.append((i, top_3_results, assessment_summary, _prediction_values(p, top_3_results, assessment_summary)))
+        except Exception as e:
+            entries[i]["error"] = str(e)
+
+    predict_ids = None
+    if prediction_writer.enabled and scored:
+        predict_ids = prediction_writer.submit_many([values for _, _, _, values in scored])
+    if predict_ids is None and scored:
+        predict_ids = _save_batch([values for _, _, _, values in scored], db)
+
+    for (i, top_3_results, assessment_summary, _), predict_id in zip(scored, predict_ids or [None] * len(scored)):
+        if predict_id is None:
+            entries[i]["error"] = "Prediction could not be saved"
+            continue
+        entries[i]["success"] = True
+        entries[i]["data"] = _format_result(predict_id, parsed_items[i], top_3_results, assessment_summary)
+
+    return entries
 
 def _generate_assessment_summary(symptoms, duration, severity, dynamic_answers, user_journey):
     """Generate a comprehensive text summary of the health assessment"""
@@ -208,37 +387,26 @@ def _generate_assessment_summary(symptoms, duration, severity, dynamic_answers,
     
     return " | ".join(summary_parts)
 
-def apply_enhanced_medical_logic(symptoms, raw_predictions, duration, severity):
-    """ENHANCED: Always return exactly 3 medically sensible diseases"""
+def apply_enhanced_medical_logic(symptoms, raw_predictions, duration, severity, classes=None):
+    """ENHANCED: Always return exactly 3 medically sensible diseases
+
+    raw_predictions is either a percentage vector aligned with ``classes``
+    (see _to_percentages) or a list of {'disease', 'probability'} dicts.
+    """
     print(f"DEBUG: Enhanced logic for symptoms: {symptoms}")
     
-    # Get symptom-specific logical diseases first
-    logical_diseases = get_enhanced_logical_diseases(symptoms, duration, severity)
+    # Keyword groups are resolved once and shared by the rules and every ML class check
+    symptom_mask = rule_engine.symptom_mask(symptoms)
     
-    # Filter ML predictions to remove obviously wrong ones
-    good_ml_predictions = []
-    if raw_predictions:
-        raw_predictions.sort(key=lambda x: x['probability'], reverse=True)
-        
-        for pred in raw_predictions:
-            disease_name = pred['disease'].lower()
-            
-            # Skip obviously inappropriate diseases
-            if is_inappropriate_disease(symptoms, disease_name, pred['probability']):
-                continue
-                
-            good_ml_predictions.append(pred)
-    
-    # Combine logical diseases with good ML predictions
-    all_candidates = logical_diseases[:]
+    # Get symptom-specific logical diseases first
+    logical_diseases = get_enhanced_logical_diseases(symptoms, duration, severity, symptom_mask)
     
-    # Add good ML predictions that aren't duplicates
-    for ml_pred in good_ml_predictions[:7]:  # Consider top 7 ML predictions
-        if not is_duplicate_disease(ml_pred, all_candidates):
-            all_candidates.append(ml_pred)
+    if classes is None:
+        classes = [pred['disease'] for pred in raw_predictions]
+        raw_predictions = np.array([pred['probability'] for pred in raw_predictions], dtype=np.float64)
     
-    # Sort by probability and medical relevance
-    all_candidates.sort(key=lambda x: x['probability'], reverse=True)
+    # Filter, rank and dedup the ML classes as arrays, then merge with the logical diseases
+    all_candidates = rule_engine.top_results(symptom_mask, logical_diseases, raw_predictions, rule_engine.class_index(classes))
     
     # Ensure we have exactly 3 results
     if len(all_candidates) >= 3:
@@ -254,126 +422,15 @@ def apply_enhanced_medical_logic(symptoms, raw_predictions, duration, severity):
         
         return all_candidates[:3]
 
-def get_enhanced_logical_diseases(symptoms, duration, severity):
+def get_enhanced_logical_diseases(symptoms, duration, severity, symptom_mask=None):
     """Get medically logical diseases based on symptoms, duration, and severity"""
-    if not symptoms:
-        return [
-            {'disease': 'General Health Assessment Needed', 'probability': 75.0},
-            {'disease': 'Wellness Check Required', 'probability': 65.0},
-            {'disease': 'Preventive Care Consultation', 'probability': 55.0}
-        ]
-    
-    symptom_text = ' '.join(str(s).lower() for s in symptoms)
-    
-    # DIGESTIVE SYMPTOMS - Highest Priority
-    if any(gi in symptom_text for gi in ['diarrhea', 'diarrhoea', 'nausea', 'vomiting', 'stomach', 'abdominal']):
-        if 'fever' in symptom_text or severity in ['Moderate', 'Severe']:
-            return [
-                {'disease': 'Gastroenteritis', 'probability': 88.0},
-                {'disease': 'Food Poisoning', 'probability': 78.0},
-                {'disease': 'Viral Gastritis', 'probability': 68.0}
-            ]
-        else:
-            return [
-                {'disease': 'Irritable Bowel Syndrome', 'probability': 75.0},
-                {'disease': 'Food Intolerance', 'probability': 65.0},
-                {'disease': 'Functional Dyspepsia', 'probability': 55.0}
-            ]
-    
-    # RESPIRATORY SYMPTOMS
-    elif any(resp in symptom_text for resp in ['cough', 'throat', 'breathing', 'chest', 'runny', 'congestion']):
-        if 'fever' in symptom_text:
-            return [
-                {'disease': 'Upper Respiratory Infection', 'probability': 85.0},
-                {'disease': 'Viral Pharyngitis', 'probability': 75.0},
-                {'disease': 'Common Cold', 'probability': 65.0}
-            ]
-        else:
-            return [
-                {'disease': 'Common Cold', 'probability': 80.0},
-                {'disease': 'Allergic Rhinitis', 'probability': 70.0},
-                {'disease': 'Throat Irritation', 'probability': 60.0}
-            ]
-    
-    # FEVER SYMPTOMS
-    elif any(fever in symptom_text for fever in ['fever', 'chills', 'sweating']):
-        if severity == 'Severe':
-            return [
-                {'disease': 'Viral Infection', 'probability': 85.0},
-                {'disease': 'Influenza', 'probability': 75.0},
-                {'disease': 'Bacterial Infection', 'probability': 65.0}
-            ]
-        else:
-            return [
-                {'disease': 'Viral Infection', 'probability': 80.0},
-                {'disease': 'Common Cold', 'probability': 70.0},
-                {'disease': 'Mild Viral Infection', 'probability': 60.0}
-            ]
-    
-    # PAIN SYMPTOMS
-    elif any(pain in symptom_text for pain in ['headache', 'pain', 'ache', 'joint', 'muscle']):
-        if 'headache' in symptom_text:
-            return [
-                {'disease': 'Tension Headache', 'probability': 80.0},
-                {'disease': 'Migraine', 'probability': 70.0},
-                {'disease': 'Stress Headache', 'probability': 60.0}
-            ]
-        else:
-            return [
-                {'disease': 'Muscle Strain', 'probability': 75.0},
-                {'disease': 'Arthralgia', 'probability': 65.0},
-                {'disease': 'Inflammatory Pain', 'probability': 55.0}
-            ]
-    
-    # SKIN SYMPTOMS
-    elif any(skin in symptom_text for skin in ['rash', 'itching', 'skin', 'redness']):
-        return [
-            {'disease': 'Contact Dermatitis', 'probability': 80.0},
-            {'disease': 'Allergic Reaction', 'probability': 70.0},
-            {'disease': 'Eczema', 'probability': 60.0}
-        ]
-    
-    # NEUROLOGICAL SYMPTOMS
-    elif any(neuro in symptom_text for neuro in ['dizziness', 'blurred', 'vision', 'balance']):
-        return [
-            {'disease': 'Vertigo', 'probability': 75.0},
-            {'disease': 'Inner Ear Disorder', 'probability': 65.0},
-            {'disease': 'Vestibular Dysfunction', 'probability': 55.0}
-        ]
-    
-    # FATIGUE/GENERAL SYMPTOMS
-    elif any(general in symptom_text for general in ['fatigue', 'tired', 'weakness', 'malaise']):
-        return [
-            {'disease': 'Viral Infection', 'probability': 75.0},
-            {'disease': 'Chronic Fatigue', 'probability': 65.0},
-            {'disease': 'Sleep Disorder', 'probability': 55.0}
-        ]
-    
-    # DEFAULT FALLBACK
-    else:
-        return [
-            {'disease': 'General Viral Illness', 'probability': 70.0},
-            {'disease': 'Stress-Related Symptoms', 'probability': 60.0},
-            {'disease': 'Minor Acute Illness', 'probability': 50.0}
-        ]
+    return rule_engine.logical_diseases(symptoms, severity, symptom_mask)
 
-def is_inappropriate_disease(symptoms, disease_name, probability):
+def is_inappropriate_disease(symptoms, disease_name, probability, symptom_mask=None):
     """Check if a disease is inappropriate for given symptoms"""
-    symptom_text = ' '.join(symptoms).lower()
-    
-    # Always filter out these completely inappropriate diseases
-    severe_diseases = ['heart attack', 'aids', 'tuberculosis', 'cancer', 'paralysis']
-    if any(severe in disease_name for severe in severe_diseases):
-        if probability < 50.0:  # Only allow if very high probability
-            return True
-    
-    # Filter disease-symptom mismatches
-    if any(digestive in symptom_text for digestive in ['diarrhea', 'nausea', 'vomiting']):
-        inappropriate = ['vertigo', 'impetigo', 'acne', 'arthritis', 'cervical']
-        if any(inappropriate_disease in disease_name for inappropriate_disease in inappropriate):
-            return True
-    
-    return False
+    if symptom_mask is None:
+        symptom_mask = rule_engine.symptom_mask(symptoms)
+    return rule_engine.is_inappropriate(symptom_mask, disease_name, probability)
 
 def is_duplicate_disease(new_disease, existing_diseases):
     """Check if disease is already in the list (fuzzy matching)"""
@@ -395,192 +452,209 @@ def get_emergency_fallbacks(symptoms):
         {'disease': 'Mild Infection', 'probability': 35.0}
     ]
 
-def get_predictions_by_user(user_id: int):
-    print(f"DEBUG: get_predictions_by_user called with user_id: {user_id}")
+# Columns read for the compact history listing; the answer/journey JSON stays in the DB
+SUMMARY_COLUMNS = (
+    Prediction.predict_id, Prediction.assessment_timestamp, Prediction.main_symptom,
+    Prediction.severity, Prediction.top_results
+)
+
+@with_async_session
+async def get_prediction_page(user_id: int, db=None, limit=None, cursor=None, date_from=None, date_to=None, view="full"):
+    """One page of a user's predictions, newest first.
+
+    Keyset pagination on (user_id, predict_id DESC), served by the
+    ix_predictions_user_predict index: ``cursor`` is the ``next_cursor`` of
+    the previous page, i.e. only rows with a smaller predict_id are read.
+    ``date_from``/``date_to`` bound assessment_timestamp (inclusive). Rows
+    written before that column was filled on insert have it NULL and only
+    show up in unfiltered pages.
+    ``limit=None`` returns every matching row. ``view="summary"`` loads only
+    SUMMARY_COLUMNS and returns compact entries.
+    """
+    print(f"DEBUG: get_prediction_page called with user_id: {user_id}, limit: {limit}, cursor: {cursor}")
     
     if not user_id or not isinstance(user_id, int):
         print(f"DEBUG: Invalid user_id: {user_id}")
         raise ValueError("User ID tidak valid")
     
-    db = SessionLocal()
     try:
         # Check if user exists
-        user = db.query(User).filter(User.user_id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             print(f"DEBUG: User {user_id} not found")
             raise ValueError("User tidak ditemukan")
         
-        # Get predictions
-        predictions = db.query(Prediction).filter(Prediction.user_id == user_id).order_by(Prediction.predict_id.desc()).all()
+        query = select(Prediction).where(Prediction.user_id == user_id)
+        if cursor is not None:
+            query = query.where(Prediction.predict_id < cursor)
+        if date_from is not None:
+            query = query.where(Prediction.assessment_timestamp >= date_from)
+        if date_to is not None:
+            query = query.where(Prediction.assessment_timestamp <= date_to)
+        query = query.order_by(Prediction.predict_id.desc())
+        if view == "summary":
+            query = query.options(load_only(*SUMMARY_COLUMNS))
+            format_row = format_prediction_summary
+        else:
+            format_row = format_stored_prediction
+        if limit is not None:
+            # One extra row tells whether another page exists
+            query = query.limit(limit + 1)
+        predictions = (await db.execute(query)).scalars().all()
+        
+        has_more = limit is not None and len(predictions) > limit
+        if has_more:
+            predictions = predictions[:limit]
         print(f"DEBUG: Found {len(predictions)} predictions for user {user_id}")
         
         formatted = []
         for p in predictions:
             try:
-                print(f"DEBUG: Processing prediction {p.predict_id}")
-                
-                # Handle dynamic_answers with explicit type conversion
-                dynamic_answers = p.dynamic_answers
-                if isinstance(dynamic_answers, str):
-                    try:
-                        dynamic_answers = json.loads(dynamic_answers)
-                    except Exception as e:
-                        print(f"DEBUG: Failed to parse dynamic_answers JSON: {e}")
-                        dynamic_answers = []
-                elif dynamic_answers is None:
-                    dynamic_answers = []
-                
-                # CRITICAL FIX: Ensure dynamic_answers is always List<Map<String, dynamic>>
-                formatted_dynamic_answers = []
-                if isinstance(dynamic_answers, list):
-                    for answer in dynamic_answers:
-                        if isinstance(answer, dict):
-                            # Ensure all values are strings or proper types
-                            formatted_dynamic_answers.append({
-                                "question": str(answer.get("question", "")),
-                                "answer": str(answer.get("answer", "")),
-                                "category": str(answer.get("category", "general")),
-                                "timestamp": str(answer.get("timestamp", ""))
-                            })
-                        elif isinstance(answer, str):
-                            # Convert string answers to proper dict format
-                            formatted_dynamic_answers.append({
-                                "question": "Response",
-                                "answer": str(answer),
-                                "category": "general",
-                                "timestamp": ""
-                            })
-                        else:
-                            # Convert any other type to string
-                            formatted_dynamic_answers.append({
-                                "question": "Data",
-                                "answer": str(answer),
-                                "category": "general", 
-                                "timestamp": ""
-                            })
-                
-                # Handle user_journey with explicit type conversion
-                user_journey = p.user_journey
-                if isinstance(user_journey, str):
-                    try:
-                        user_journey = json.loads(user_journey)
-                    except Exception as e:
-                        print(f"DEBUG: Failed to parse user_journey JSON: {e}")
-                        user_journey = {}
-                elif user_journey is None:
-                    user_journey = {}
-                
-                # Ensure user_journey is always Map<String, dynamic>
-                if not isinstance(user_journey, dict):
-                    user_journey = {}
-                
-                # Convert all values to strings for consistency
-                formatted_user_journey = {}
-                for key, value in user_journey.items():
-                    formatted_user_journey[str(key)] = str(value) if value is not None else ""
-                
-                # Handle top_results with explicit type conversion
-                top_results = p.top_results
-                if isinstance(top_results, str):
-                    try:
-                        top_results = json.loads(top_results)
-                    except Exception as e:
-                        print(f"DEBUG: Failed to parse top_results JSON: {e}")
-                        top_results = []
-                elif top_results is None:
-                    top_results = []
-                
-                # CRITICAL FIX: Ensure top_results is always List<Map<String, dynamic>>
-                formatted_top_results = []
-                if isinstance(top_results, list):
-                    for result in top_results:
-                        if isinstance(result, dict):
-                            formatted_top_results.append({
-                                "disease": str(result.get("disease", "Unknown")),
-                                "probability": float(result.get("probability", 0.0))
-                            })
-                        elif isinstance(result, str):
-                            # Convert string results to proper dict format
-                            formatted_top_results.append({
-                                "disease": str(result),
-                                "probability": 0.0
-                            })
-                        else:
-                            # Convert any other type
-                            formatted_top_results.append({
-                                "disease": str(result),
-                                "probability": 0.0
-                            })
-                
-                # Handle other_symptoms as List<String>
-                other_symptoms_list = []
-                if p.other_symptoms:
-                    other_symptoms_list = [s.strip() for s in p.other_symptoms.split(", ") if s.strip()]
-                
-                # CRITICAL FIX: Handle None assessment_summary from older predictions
-                assessment_summary = getattr(p, 'assessment_summary', None)
-                if assessment_summary is None:
-                    assessment_summary = f"{p.main_symptom or 'Unknown'} - {p.duration or 'Unknown'} - {p.severity or 'Unknown'}"
-                
-                # CRITICAL FIX: Handle None total_symptoms_count from older predictions
-                total_symptoms_count = getattr(p, 'total_symptoms_count', None)
-                if total_symptoms_count is None:
-                    # Calculate from other_symptoms if available
-                    calculated_count = 1  # main_symptom
-                    if p.other_symptoms:
-                        calculated_count += len([s for s in p.other_symptoms.split(", ") if s.strip()])
-                    total_symptoms_count = calculated_count
-                
-                prediction_data = {
-                    "predict_id": int(p.predict_id),
-                    "timestamp": str(p.assessment_timestamp or p.predict_id),
-                    "input": {
-                        "main_symptom": str(p.main_symptom or ""),
-                        "other_symptoms": other_symptoms_list,  # This should be List<String>
-                        "duration": str(p.duration or ""),
-                        "severity": str(p.severity or ""),
-                        "dynamic_answers": formatted_dynamic_answers,  # This should be List<Map<String, dynamic>>
-                        "user_journey": formatted_user_journey,  # This should be Map<String, dynamic>
-                        "total_symptoms": int(total_symptoms_count)  # FIXED: Never None
-                    },
-                    "top_results": formatted_top_results,  # This should be List<Map<String, dynamic>>
-                    "assessment_summary": str(assessment_summary)  # Never None
-                }
-                
-                formatted.append(prediction_data)
-                print(f"DEBUG: Successfully processed prediction {p.predict_id}")
-                
+                formatted.append(format_row(p))
             except Exception as pred_error:
                 print(f"DEBUG: Error processing prediction {p.predict_id}: {pred_error}")
                 # Continue with next prediction instead of failing completely
                 continue
         
-        print(f"DEBUG: Successfully formatted {len(formatted)} predictions")
-        return formatted
+        return {
+            "predictions": formatted,
+            "next_cursor": int(predictions[-1].predict_id) if has_more else None,
+            "has_more": has_more
+        }
         
     except Exception as e:
-        print(f"DEBUG: Database error in get_predictions_by_user: {e}")
+        print(f"DEBUG: Database error in get_prediction_page: {e}")
         import traceback
         traceback.print_exc()
         raise e
-    finally:
-        db.close()
 
-def delete_prediction_by_id(predict_id: int):
+async def get_predictions_by_user(user_id: int, db=None, **page):
+    """Formatted predictions of a user, newest first; accepts the get_prediction_page filters"""
+    return (await get_prediction_page(user_id, db=db, **page))["predictions"]
+
+def _parse_sync_cursor(since):
+    """'<change_id>' -> change_id; empty means from the beginning"""
+    if not since:
+        return 0
+    try:
+        last_change_id = int(since)
+    except ValueError:
+        # Including '<predict_id>-<deletion_id>' cursors of earlier versions: clients resync
+        raise ValueError("Cursor tidak valid")
+    if last_change_id < 0:
+        raise ValueError("Cursor tidak valid")
+    return last_change_id
+
+@with_async_session
+async def get_history_version(user_id: int, db=None):
+    """(row count, max change_id) of a user's history in one round trip.
+
+    Both come from the (user_id, ...) indexes. Every insert or delete, by any
+    worker, adds a prediction_changes entry; the count also catches rows
+    written without one (before run_add_prediction_changes.py).
+    """
+    query = select(
+        select(func.count(Prediction.predict_id)).where(Prediction.user_id == user_id).scalar_subquery(),
+        select(func.max(PredictionChange.change_id)).where(PredictionChange.user_id == user_id).scalar_subquery()
+    )
+    return tuple((await db.execute(query)).one())
+
+@with_async_session
+async def get_prediction_changes(user_id: int, since=None, limit=None, db=None):
+    """Predictions created and deleted since a sync cursor, for clients that keep a local copy.
+
+    Reads the prediction_changes log in change_id order; ``created`` and
+    ``deleted`` keep that order. A change_id is assigned when the insert or
+    delete is written, so rows that become visible late or below the highest
+    predict_id still come after the cursor. Concurrent transactions can still
+    commit out of change_id order, so ``next_cursor`` only moves past changes
+    older than HISTORY_SYNC_SETTLE_SECONDS: newer ones are sent again by the
+    next sync, and clients apply ``created`` as an upsert by predict_id.
+    """
+    print(f"DEBUG: get_prediction_changes called with user_id: {user_id}, since: {since}")
+    
+    if not user_id or not isinstance(user_id, int):
+        raise ValueError("User ID tidak valid")
+    last_change_id = _parse_sync_cursor(since)
+    
+    user = await db.get(User, user_id)
+    if not user:
+        raise ValueError("User tidak ditemukan")
+    
+    query = select(PredictionChange).where(
+        PredictionChange.user_id == user_id, PredictionChange.change_id > last_change_id
+    ).order_by(PredictionChange.change_id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    changes = (await db.execute(query)).scalars().all()
+    has_more = limit is not None and len(changes) > limit
+    if has_more:
+        changes = changes[:limit]
+    
+    next_change_id = last_change_id
+    settled_before = datetime.now() - timedelta(seconds=HISTORY_SYNC_SETTLE_SECONDS)
+    for change in changes:
+        if change.changed_at > settled_before:
+            # An earlier change_id may still be uncommitted; resend from here next time
+            has_more = False
+            break
+        next_change_id = change.change_id
+    
+    created_ids = [c.predict_id for c in changes if not c.deleted]
+    rows = {}
+    if created_ids:
+        rows = {p.predict_id: p for p in (await db.execute(
+            select(Prediction).where(Prediction.user_id == user_id, Prediction.predict_id.in_(created_ids))
+        )).scalars()}
+    
+    formatted = []
+    for predict_id in created_ids:
+        # Missing: deleted since, its delete entry follows
+        p = rows.get(predict_id)
+        if p is None:
+            continue
+        try:
+            formatted.append(format_stored_prediction(p))
+        except Exception as pred_error:
+            print(f"DEBUG: Error processing prediction {p.predict_id}: {pred_error}")
+            continue
+    
+    deleted = [int(c.predict_id) for c in changes if c.deleted]
+    print(f"DEBUG: {len(formatted)} created, {len(deleted)} deleted since {since!r} for user {user_id}")
+    return {
+        "created": formatted,
+        "deleted": deleted,
+        "next_cursor": str(next_change_id),
+        "has_more": has_more
+    }
+
+@with_async_session
+async def get_prediction_by_id(predict_id: int, db=None):
+    """Full record of one prediction, for detail views opened from the summary listing"""
+    if not predict_id or not isinstance(predict_id, int):
+        raise ValueError("Predict ID tidak valid")
+    prediction = await db.get(Prediction, predict_id)
+    if not prediction:
+        raise ValueError("Prediksi tidak ditemukan")
+    return format_stored_prediction(prediction)
+
+@with_async_session
+async def delete_prediction_by_id(predict_id: int, db=None):
     if not predict_id or not isinstance(predict_id, int):
         raise ValueError("Predict ID tidak valid")
-    db = SessionLocal()
     try:
-        prediction = db.query(Prediction).filter(Prediction.predict_id == predict_id).first()
+        prediction = await db.get(Prediction, predict_id)
         if not prediction:
             raise ValueError("Prediksi tidak ditemukan")
-        db.delete(prediction)
-        db.commit()
+        # Logged in the same transaction, so syncing clients learn about the delete
+        user_id = prediction.user_id
+        db.add(PredictionChange(predict_id=prediction.predict_id, user_id=user_id, deleted=True))
+        await db.delete(prediction)
+        await db.commit()
+        history_cache.invalidate(user_id)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
-    finally:
-        db.close()
 
 def test_all_medical_patterns():
     """Basic test function"""
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 10000))  # 0 disables the cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 3600))
+
+def make_key(symptoms, duration, severity):
+    """Canonical form of a scoring input: symptom order and repeats do not change the result"""
+    return (tuple(sorted(set(symptoms))), duration, severity)
+
+class PredictionCache:
+    """Bounded in-process LRU cache with TTL for scored top results.
+
+    Entries are tagged with the model version they were computed with; when
+    the model holder reports a new version the whole cache is dropped.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Return a copy of the cached results, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            results = entry[1]
+        # Callers may mutate what they get back
+        return [dict(r) for r in results]
+
+    def put(self, key, version, results):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic(), [dict(r) for r in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "model_version": self._version
+        }
@@ -0,0 +1,75 @@
+import csv
+import io
+import os
+import orjson
+from sqlalchemy import select
+from models.prediction_model import Prediction
+from config.database import AsyncSessionLocal
+from services.prediction_format import format_stored_prediction
+
+# Rows fetched per round trip from the server-side cursor, and per streamed chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+EXPORT_TOP_RESULTS = 3
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+
+CSV_HEADER = (
+    ["predict_id", "timestamp", "main_symptom", "other_symptoms", "duration", "severity", "total_symptoms"]
+    + [f"top_{i}_{field}" for i in range(1, EXPORT_TOP_RESULTS + 1) for field in ("disease", "probability")]
+    + ["assessment_summary", "dynamic_answers", "user_journey"]
+)
+
+def _csv_row(prediction):
+    data = prediction["input"]
+    top = []
+    for i in range(EXPORT_TOP_RESULTS):
+        result = prediction["top_results"][i] if i < len(prediction["top_results"]) else None
+        top += [result["disease"], result["probability"]] if result else ["", ""]
+    return (
+        [prediction["predict_id"], prediction["timestamp"], data["main_symptom"], "; ".join(data["other_symptoms"]),
+         data["duration"], data["severity"], data["total_symptoms"]]
+        + top
+        + [prediction["assessment_summary"],
+           orjson.dumps(data["dynamic_answers"]).decode(), orjson.dumps(data["user_journey"]).decode()]
+    )
+
+async def _stored_rows(user_id, batch_size):
+    """A user's predictions, oldest first, from a server-side cursor.
+
+    Plain column rows rather than ORM objects, so nothing accumulates in a
+    session identity map. The session is the generator's own: a streamed
+    response outlives the request's dependencies.
+    """
+    query = (
+        select(*Prediction.__table__.columns)
+        .where(Prediction.user_id == user_id)
+        .order_by(Prediction.predict_id)
+        .execution_options(yield_per=batch_size)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+async def export_predictions(user_id: int, fmt="ndjson", batch_size=EXPORT_BATCH_SIZE):
+    """Encoded chunks of a user's full history; one chunk per fetched batch, so memory stays flat"""
+    print(f"DEBUG: Exporting predictions of user {user_id} as {fmt}")
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_HEADER)
+        yield buffer.getvalue().encode("utf-8")
+    exported = 0
+    async for rows in _stored_rows(user_id, batch_size):
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(_csv_row(format_stored_prediction(row)) for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+        else:
+            yield b"".join(orjson.dumps(format_stored_prediction(row)) + b"\n" for row in rows)
+        exported += len(rows)
+    print(f"DEBUG: Exported {exported} predictions of user {user_id}")
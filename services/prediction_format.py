@@ -0,0 +1,115 @@
+import json
+
+# Canonical shapes of the JSON columns of a Prediction row, as the Flutter
+# client reads them. Enforced when a row is written (and by
+# run_normalize_predictions.py for older rows), so reads return them as stored.
+#   dynamic_answers: [{"question": str, "answer": str, "category": str, "timestamp": str}]
+#   user_journey:    {str: str}
+#   top_results:     [{"disease": str, "probability": float}]
+
+def _load_json(value, default):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except Exception as e:
+            print(f"DEBUG: Failed to parse stored JSON: {e}")
+            return default
+    return default if value is None else value
+
+def normalize_dynamic_answers(value):
+    answers = _load_json(value, [])
+    if not isinstance(answers, list):
+        return []
+    normalized = []
+    for answer in answers:
+        if isinstance(answer, dict):
+            normalized.append({
+                "question": str(answer.get("question", "")),
+                "answer": str(answer.get("answer", "")),
+                "category": str(answer.get("category", "general")),
+                "timestamp": str(answer.get("timestamp", ""))
+            })
+        else:
+            # Bare strings were free-text responses; anything else is kept as text
+            normalized.append({
+                "question": "Response" if isinstance(answer, str) else "Data",
+                "answer": str(answer),
+                "category": "general",
+                "timestamp": ""
+            })
+    return normalized
+
+def normalize_user_journey(value):
+    journey = _load_json(value, {})
+    if not isinstance(journey, dict):
+        return {}
+    return {str(key): str(item) if item is not None else "" for key, item in journey.items()}
+
+def normalize_top_results(value):
+    results = _load_json(value, [])
+    if not isinstance(results, list):
+        return []
+    normalized = []
+    for result in results:
+        if isinstance(result, dict):
+            normalized.append({
+                "disease": str(result.get("disease", "Unknown")),
+                "probability": float(result.get("probability", 0.0))
+            })
+        else:
+            normalized.append({"disease": str(result), "probability": 0.0})
+    return normalized
+
+def normalize_other_symptoms(value):
+    """Comma-joined symptom list without blanks, so reads can split it as is"""
+    if not value:
+        return ""
+    return ", ".join(s.strip() for s in value.split(", ") if s.strip())
+
+def normalized_columns(p):
+    """Canonical values of every column the history read path relies on"""
+    other_symptoms = normalize_other_symptoms(p.other_symptoms)
+    total_symptoms_count = p.total_symptoms_count
+    if total_symptoms_count is None:
+        # main_symptom plus the other symptoms
+        total_symptoms_count = 1 + (len(other_symptoms.split(", ")) if other_symptoms else 0)
+    assessment_summary = p.assessment_summary
+    if assessment_summary is None or assessment_summary == "None":
+        assessment_summary = f"{p.main_symptom or 'Unknown'} - {p.duration or 'Unknown'} - {p.severity or 'Unknown'}"
+    return {
+        "other_symptoms": other_symptoms,
+        "dynamic_answers": normalize_dynamic_answers(p.dynamic_answers),
+        "user_journey": normalize_user_journey(p.user_journey),
+        "top_results": normalize_top_results(p.top_results),
+        "total_symptoms_count": total_symptoms_count,
+        "assessment_summary": assessment_summary
+    }
+
+def format_stored_prediction(p):
+    """Stored Prediction row -> response dict; rows are written in canonical form, so no reshaping"""
+    return {
+        "predict_id": p.predict_id,
+        "timestamp": str(p.assessment_timestamp or p.predict_id),
+        "input": {
+            "main_symptom": p.main_symptom or "",
+            "other_symptoms": p.other_symptoms.split(", ") if p.other_symptoms else [],
+            "duration": p.duration or "",
+            "severity": p.severity or "",
+            "dynamic_answers": p.dynamic_answers or [],
+            "user_journey": p.user_journey or {},
+            "total_symptoms": p.total_symptoms_count or 0
+        },
+        "top_results": p.top_results or [],
+        "assessment_summary": p.assessment_summary or ""
+    }
+
+def format_prediction_summary(p):
+    """Compact history entry: enough for the list screen, the rest via /predict/item/{predict_id}"""
+    top_results = p.top_results or []
+    return {
+        "predict_id": p.predict_id,
+        "timestamp": str(p.assessment_timestamp or p.predict_id),
+        "main_symptom": p.main_symptom or "",
+        "severity": p.severity or "",
+        "top_disease": top_results[0] if top_results else None
+    }
@@ -0,0 +1,444 @@
+import glob
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from models.prediction_model import Prediction, PredictionChange, PredictionIdSequence, PredictionWriterLease
+from config.database import SessionLocal
+from services.history_cache import history_cache
+
+# Optional write-behind mode for Prediction rows. Off = the request commits its own row.
+#   PREDICTION_WRITE_BEHIND=1  assign predict_id from a reserved block, queue the row and
+#                              insert it in batches from a background thread
+# Write-behind needs a single API process: history pages, keyset pagination and the
+# sync cursor follow predict_id, and blocks held by several processes would hand out
+# ids out of creation order. The writer holds a lease row (prediction_writer_lease)
+# and a second process refuses to start it. Reserved ids are not visible to the
+# AUTO_INCREMENT counter until written, so the inline path must not run next to it.
+PREDICTION_WRITE_BEHIND = os.getenv("PREDICTION_WRITE_BEHIND", "0") == "1"
+# Seconds the lease outlives its last renewal (renewed every third of that); also how
+# long a starting process waits for a predecessor that is shutting down
+PREDICTION_WRITER_LEASE = float(os.getenv("PREDICTION_WRITER_LEASE", 30))
+PREDICTION_WRITE_BATCH = int(os.getenv("PREDICTION_WRITE_BATCH", 200))
+PREDICTION_FLUSH_INTERVAL = float(os.getenv("PREDICTION_FLUSH_INTERVAL", 0.2))
+PREDICTION_ID_BLOCK = int(os.getenv("PREDICTION_ID_BLOCK", 100))
+# Batches that cannot be written are appended here and replayed once the DB is back
+PREDICTION_JOURNAL = os.getenv("PREDICTION_JOURNAL", os.path.join("dataset", "prediction_journal.jsonl"))
+PREDICTION_JOURNAL_RETRY = float(os.getenv("PREDICTION_JOURNAL_RETRY", 30))
+# Rows the database refused (e.g. unknown user) after their predict_id went out to the client
+PREDICTION_DEAD_LETTER = os.getenv("PREDICTION_DEAD_LETTER", os.path.join("dataset", "prediction_rejected.jsonl"))
+# Columns that go through the journal as ISO strings
+_DATETIME_COLUMNS = ("assessment_timestamp",)
+
+def _claim_pid(path):
+    """pid in a '<journal>.replay-<pid>-<n>' claim name, or None"""
+    try:
+        return int(path.rsplit(".replay-", 1)[1].split("-", 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def _journal_row(line):
+    row = json.loads(line)
+    for column in _DATETIME_COLUMNS:
+        if isinstance(row.get(column), str):
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+class PredictionWriter:
+    """Background batch writer for Prediction rows.
+
+    ``submit_many`` hands out ids from a block reserved in
+    ``prediction_id_sequence`` and queues the rows; the writer thread inserts
+    them as multi-row INSERTs. Rows carry their final predict_id, so replaying
+    a journal twice is harmless: already written rows are skipped.
+
+    Only the holder of the ``prediction_writer_lease`` row reserves ids, so one
+    process at a time hands them out in order; ``start`` raises when another
+    live process holds the lease.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size=PREDICTION_WRITE_BATCH,
+                 flush_interval=PREDICTION_FLUSH_INTERVAL, id_block=PREDICTION_ID_BLOCK,
+                 journal_path=PREDICTION_JOURNAL, dead_letter_path=PREDICTION_DEAD_LETTER,
+                 lease_seconds=PREDICTION_WRITER_LEASE, enabled=PREDICTION_WRITE_BEHIND):
+        self.enabled = enabled
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self._lease_renewed = None
+        self.dead_letter_path = dead_letter_path
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block = id_block
+        self.journal_path = journal_path
+        self._queue = queue.Queue()
+        self._ids = deque()
+        self._ids_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._last_replay = 0.0
+        self._prefetch_failed_at = None
+        self._claims = 0
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.last_error = None
+
+    # ---- single-writer lease ----
+
+    def _hold_lease(self, db):
+        """Take or renew the lease inside the caller's transaction; the other live holder, or None"""
+        now = datetime.now()
+        lease = db.execute(
+            select(PredictionWriterLease).where(PredictionWriterLease.id == 1).with_for_update()
+        ).scalar_one_or_none()
+        if lease is None:
+            lease = PredictionWriterLease(id=1, owner=self.owner, expires_at=now)
+            db.add(lease)
+        elif lease.owner != self.owner and lease.expires_at > now:
+            return lease.owner
+        lease.owner = self.owner
+        lease.expires_at = now + timedelta(seconds=self.lease_seconds)
+        return None
+
+    def _renew_lease(self):
+        """Commit a lease renewal; the other live holder, or None"""
+        db = self._session_factory()
+        try:
+            for attempt in range(3):
+                try:
+                    holder = self._hold_lease(db)
+                    if holder is not None:
+                        db.rollback()
+                        return holder
+                    db.commit()
+                    self._lease_renewed = time.monotonic()
+                    return None
+                except IntegrityError:
+                    # Another process created the lease row first
+                    db.rollback()
+            raise RuntimeError("Could not take the prediction writer lease")
+        finally:
+            db.close()
+
+    def _acquire_lease(self):
+        """Wait up to one lease period for another holder to stop (rolling restart), else refuse"""
+        deadline = time.monotonic() + self.lease_seconds
+        while True:
+            holder = self._renew_lease()
+            if holder is None:
+                return
+            if time.monotonic() >= deadline:
+                raise RuntimeError(
+                    f"Prediction write-behind is already running in {holder}; "
+                    "PREDICTION_WRITE_BEHIND=1 needs a single API worker"
+                )
+            time.sleep(1)
+
+    def _release_lease(self):
+        db = self._session_factory()
+        try:
+            lease = db.get(PredictionWriterLease, 1)
+            if lease is not None and lease.owner == self.owner:
+                lease.expires_at = datetime.now()
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Could not release the prediction writer lease: {e}")
+        finally:
+            db.close()
+        self._lease_renewed = None
+
+    # ---- id blocks ----
+
+    def _reserve_block(self, size):
+        """Move the shared counter forward by ``size`` and return the reserved ids"""
+        db = self._session_factory()
+        try:
+            for attempt in range(3):
+                try:
+                    # Checked in the same transaction: only the lease holder gets ids
+                    holder = self._hold_lease(db)
+                    if holder is not None:
+                        db.rollback()
+                        raise RuntimeError(f"Prediction write-behind lease is held by {holder}")
+                    self._lease_renewed = time.monotonic()
+                    sequence = db.execute(
+                        select(PredictionIdSequence).where(PredictionIdSequence.id == 1).with_for_update()
+                    ).scalar_one_or_none()
+                    # Never hand out ids below rows written by the synchronous path
+                    floor = (db.execute(select(func.max(Prediction.predict_id))).scalar() or 0) + 1
+                    if sequence is None:
+                        sequence = PredictionIdSequence(id=1, next_id=floor)
+                        db.add(sequence)
+                    start = max(sequence.next_id, floor)
+                    sequence.next_id = start + size
+                    db.commit()
+                    return range(start, start + size)
+                except IntegrityError:
+                    # Another process created the counter or lease row first
+                    db.rollback()
+            raise RuntimeError("Could not reserve a predict_id block")
+        finally:
+            db.close()
+
+    def _take_ids(self, n):
+        with self._ids_lock:
+            if len(self._ids) < n:
+                self._ids.extend(self._reserve_block(max(self.id_block, n - len(self._ids))))
+            return [self._ids.popleft() for _ in range(n)]
+
+    def _prefetch_ids(self):
+        # Keep half a block in hand so a short DB outage does not stall /predict
+        with self._ids_lock:
+            if len(self._ids) < self.id_block // 2:
+                self._ids.extend(self._reserve_block(self.id_block))
+
+    # ---- public API ----
+
+    def start(self):
+        """Take the single-writer lease, replay any journal left by a previous run and start the writer thread.
+
+        Raises RuntimeError when another live process runs write-behind.
+        """
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            try:
+                self._acquire_lease()
+            except RuntimeError:
+                raise
+            except Exception as e:
+                # DB unreachable: the lease is taken with the first id block instead
+                self.last_error = str(e)
+                print(f"⚠️ Could not take the prediction writer lease yet: {e}")
+            self._stopping.clear()
+            try:
+                self._replay_journal()
+            except Exception as e:
+                # The writer thread retries every PREDICTION_JOURNAL_RETRY seconds; startup must not fail
+                self.last_error = str(e)
+                print(f"⚠️ Could not replay prediction journal: {e}")
+            self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+            self._thread.start()
+            print(f"✅ Prediction write-behind enabled (batch {self.batch_size}, id block {self.id_block})")
+
+    def submit_many(self, rows):
+        """Assign predict_ids to Prediction column dicts and queue them; None if no ids can be reserved"""
+        if self._thread is None:
+            self.start()
+        try:
+            ids = self._take_ids(len(rows))
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Could not reserve prediction ids: {e}")
+            return None
+        for row, predict_id in zip(rows, ids):
+            row["predict_id"] = predict_id
+            self._queue.put(row)
+        return ids
+
+    def submit(self, row):
+        ids = self.submit_many([row])
+        return ids[0] if ids else None
+
+    def stop(self, timeout=30):
+        """Flush everything still queued (called on app shutdown); unwritable rows go to the journal"""
+        with self._start_lock:
+            if self._thread is None:
+                return
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+        leftover = self._drain(None)
+        if leftover:
+            self._write(leftover)
+        # A restarted or replacement process can take over right away
+        self._release_lease()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None,
+            "queued": self._queue.qsize(),
+            "reserved_ids": len(self._ids),
+            "lease_owner": self.owner if self._lease_renewed is not None else None,
+            "written": self.written,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "journal_pending": os.path.exists(self.journal_path),
+            "last_error": self.last_error
+        }
+
+    # ---- writer thread ----
+
+    def _drain(self, limit):
+        rows = []
+        while limit is None or len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+            if first is None and self._stopping.is_set():
+                break
+            rows = [first] if first is not None else []
+            rows += self._drain(self.batch_size - len(rows))
+            if rows:
+                self._write(rows)
+            try:
+                if time.monotonic() - self._last_replay > PREDICTION_JOURNAL_RETRY and os.path.exists(self.journal_path):
+                    self._replay_journal()
+                if self._prefetch_failed_at is None or time.monotonic() - self._prefetch_failed_at > PREDICTION_JOURNAL_RETRY:
+                    self._prefetch_failed_at = None
+                    if self._lease_renewed is None or time.monotonic() - self._lease_renewed > self.lease_seconds / 3:
+                        holder = self._renew_lease()
+                        if holder is not None:
+                            raise RuntimeError(f"Prediction write-behind lease was taken over by {holder}")
+                    self._prefetch_ids()
+            except Exception as e:
+                self._prefetch_failed_at = time.monotonic()
+                self.last_error = str(e)
+
+    def _insert(self, rows):
+        db = self._session_factory()
+        try:
+            db.execute(insert(Prediction), rows)
+            # Numbered now, so the sync cursor sees rows written after higher predict_ids
+            db.execute(insert(PredictionChange), [{"predict_id": row["predict_id"], "user_id": row["user_id"]} for row in rows])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        # Cached history pages of these users are stale only once the rows are visible
+        for user_id in {row["user_id"] for row in rows}:
+            history_cache.invalidate(user_id)
+
+    def _written_already(self, predict_id):
+        """True when a replayed row is already in the table (not an error)"""
+        db = self._session_factory()
+        try:
+            return db.execute(select(Prediction.predict_id).where(Prediction.predict_id == predict_id)).first() is not None
+        except Exception:
+            return False
+        finally:
+            db.close()
+
+    def _write(self, rows):
+        """Insert a batch; returns False when it had to be journaled"""
+        try:
+            self._insert(rows)
+            self.written += len(rows)
+            return True
+        except IntegrityError:
+            # One bad row (missing user, already written) must not sink the batch
+            for row in rows:
+                try:
+                    self._insert([row])
+                    self.written += 1
+                except IntegrityError as e:
+                    if self._written_already(row.get("predict_id")):
+                        continue
+                    self.dropped += 1
+                    print(f"⚠️ Prediction {row.get('predict_id')} rejected, moved to {self.dead_letter_path}: {e.orig}")
+                    self._dead_letter(row, e.orig)
+                except Exception as e:
+                    self.last_error = str(e)
+                    self._spill([row])
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Prediction batch write failed, journaling {len(rows)} rows: {e}")
+            self._spill(rows)
+            return False
+
+    # ---- journal ----
+
+    def _spill(self, rows):
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+        self.spilled += len(rows)
+        # Back off before the next replay attempt
+        self._last_replay = time.monotonic()
+
+    def _dead_letter(self, row, error):
+        """Keep a refused row (its predict_id was already handed out) for manual repair"""
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"error": str(error), "row": row}, default=str) + "\n")
+        except OSError as e:
+            self.last_error = str(e)
+            print(f"⚠️ Could not write rejected prediction {row.get('predict_id')}: {e}")
+
+    def _claim(self, path):
+        """Rename a journal (or a dead process's claim) to a new claim of this process; None if someone was faster"""
+        self._claims += 1
+        claim = f"{self.journal_path}.replay-{os.getpid()}-{self._claims}"
+        try:
+            os.replace(path, claim)
+        except FileNotFoundError:
+            return None
+        return claim
+
+    def _replay_journal(self):
+        self._last_replay = time.monotonic()
+        # Claim the journal by renaming it. Claims of live sibling processes are
+        # theirs to finish; claims left by a crashed process are taken over.
+        if os.path.exists(self.journal_path):
+            self._claim(self.journal_path)
+        for path in sorted(glob.glob(f"{self.journal_path}.replay-*")):
+            pid = _claim_pid(path)
+            if pid != os.getpid():
+                if pid is not None and _pid_alive(pid):
+                    continue
+                path = self._claim(path)
+                if path is None:
+                    continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    rows = [_journal_row(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                continue
+            print(f"DEBUG: Replaying {len(rows)} journaled predictions from {path}")
+            ok = True
+            for i in range(0, len(rows), self.batch_size):
+                ok = self._write(rows[i:i + self.batch_size]) and ok
+            # Failed batches were journaled again, so the claimed file is done either way
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            if not ok:
+                break
+
+prediction_writer = PredictionWriter()
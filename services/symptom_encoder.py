@@ -0,0 +1,68 @@
+import numpy as np
+
+class SymptomEncoder:
+    """Precompiled symptom/duration/severity -> feature row encoder.
+
+    Built once when the model is loaded so that encoding a request is a few
+    dict lookups and array writes instead of list scans and a DataFrame build.
+    """
+
+    def __init__(self, symptom_columns, duration_values, severity_values):
+        columns = list(symptom_columns)
+        # The trained feature list already ends with the one-hot columns, but
+        # keep the old behaviour of appending them if an older list lacks them
+        for val in duration_values:
+            if f"duration_{val}" not in columns:
+                columns.append(f"duration_{val}")
+        for val in severity_values:
+            if f"severity_{val}" not in columns:
+                columns.append(f"severity_{val}")
+
+        self.columns = columns
+        self.n_features = len(columns)
+        self.index = {name: i for i, name in enumerate(columns)}
+
+        # One-hot offsets resolved ahead of time
+        self.duration_offsets = {val: self.index[f"duration_{val}"] for val in duration_values}
+        self.severity_offsets = {val: self.index[f"severity_{val}"] for val in severity_values}
+        self._onehot_offsets = list(self.duration_offsets.values()) + list(self.severity_offsets.values())
+
+        self.mild_fever_index = self.index.get("mild_fever")
+        self.high_fever_index = self.index.get("high_fever")
+
+        # float32 is what the forest uses internally, so predict_proba skips a copy
+        self._template = np.zeros(self.n_features, dtype=np.float32)
+
+    def symptom_indices(self, symptoms, severity):
+        """Column indices set by the given symptoms (fever mapped by severity)"""
+        indices = []
+        for symptom in symptoms:
+            s = symptom.lower()
+            if s == "fever":
+                if severity == "Mild" and self.mild_fever_index is not None:
+                    indices.append(self.mild_fever_index)
+                elif severity in ["Moderate", "Severe"] and self.high_fever_index is not None:
+                    indices.append(self.high_fever_index)
+            else:
+                i = self.index.get(s)
+                if i is not None:
+                    indices.append(i)
+        return indices
+
+    def fill_row(self, row, symptoms, duration, severity):
+        """Write the encoding of one input into a preallocated row"""
+        row[self.symptom_indices(symptoms, severity)] = 1
+        row[self._onehot_offsets] = 0
+        d = self.duration_offsets.get(duration)
+        if d is not None:
+            row[d] = 1
+        s = self.severity_offsets.get(severity)
+        if s is not None:
+            row[s] = 1
+        return row
+
+    def encode(self, symptoms, duration, severity):
+        """Encode a single input as a (1, n_features) array"""
+        row = self._template.copy()
+        self.fill_row(row, symptoms, duration, severity)
+        return row.reshape(1, -1)
@@ -1,13 +1,18 @@
+import asyncio
 import os
 import base64
 from datetime import datetime
+from sqlalchemy import select
 from models.user_model import User
-from config.database import SessionLocal
+from config.database import with_async_session
 from utils.email_utils import send_otp_email, verify_otp, generate_otp
 
 UPLOAD_DIR = "assets/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+async def _first_user(db, *criteria):
+    return (await db.execute(select(User).where(*criteria))).scalars().first()
+
 def save_photo(photo_b64: str, user_id: int) -> str:
     if not photo_b64:
         return None
@@ -21,124 +26,104 @@ def save_photo(photo_b64: str, user_id: int) -> str:
         f.write(img_data)
     return filepath
 
-def get_all_users():
-    db = SessionLocal()
-    users = db.query(User).all()
-    db.close()
-    return users
+@with_async_session
+async def get_all_users(db=None):
+    return (await db.execute(select(User))).scalars().all()
 
-def create_user(data: dict):
-    db = SessionLocal()
-    try:
+@with_async_session
+async def create_user(data: dict, db=None):
+    photo_b64 = data.pop("photo", None)
+    new_user = User(**data)
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    if photo_b64:
+        new_user.photo = save_photo(photo_b64, new_user.user_id)
+        await db.commit()
+        await db.refresh(new_user)
+    return new_user
+
+@with_async_session
+async def update_user(user_id: int, data: dict, db=None):
+    user = await _first_user(db, User.user_id == user_id)
+    if user:
         photo_b64 = data.pop("photo", None)
-        new_user = User(**data)
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
         if photo_b64:
-            new_user.photo = save_photo(photo_b64, new_user.user_id)
-            db.commit()
-            db.refresh(new_user)
-        return new_user
-    finally:
-        db.close()
-
-def update_user(user_id: int, data: dict):
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.user_id == user_id).first()
-        if user:
-            photo_b64 = data.pop("photo", None)
-            if photo_b64:
-                if user.photo and os.path.exists(user.photo):
-                    os.remove(user.photo)
-                user.photo = save_photo(photo_b64, user_id)
-            for key, value in data.items():
-                setattr(user, key, value)
-            db.commit()
-            db.refresh(user)
-        return user
-    finally:
-        db.close()
+            if user.photo and os.path.exists(user.photo):
+                os.remove(user.photo)
+            user.photo = save_photo(photo_b64, user_id)
+        for key, value in data.items():
+            setattr(user, key, value)
+        await db.commit()
+        await db.refresh(user)
+    return user
 
-def delete_user(user_id: int):
-    db = SessionLocal()
-    user = db.query(User).filter(User.user_id == user_id).first()
+@with_async_session
+async def delete_user(user_id: int, db=None):
+    user = await _first_user(db, User.user_id == user_id)
     if user:
-        db.delete(user)
-        db.commit()
-    db.close()
+        await db.delete(user)
+        await db.commit()
     return user
 
-def find_user_by_email(email: str):
-    db = SessionLocal()
-    user = db.query(User).filter(User.email == email).first()
-    db.close()
-    return user
+@with_async_session
+async def find_user_by_email(email: str, db=None):
+    return await _first_user(db, User.email == email)
 
-def authenticate_user(email, password):
-    db = SessionLocal()
+@with_async_session
+async def authenticate_user(email, password, db=None):
     try:
         # Add retry logic for database connections
-        user = db.query(User).filter(User.email == email, User.password == password).first()
+        user = await _first_user(db, User.email == email, User.password == password)
         return user
     except Exception as e:
         print(f"Database error in authenticate_user: {e}")
-        db.rollback()
-        # Try once more with a fresh connection
+        await db.rollback()
+        # Try once more; pre-ping hands the session a fresh connection after the rollback
         try:
-            db.close()
-            db = SessionLocal()
-            user = db.query(User).filter(User.email == email, User.password == password).first()
+            user = await _first_user(db, User.email == email, User.password == password)
             return user
         except Exception as retry_error:
             print(f"Retry failed: {retry_error}")
             return None
-    finally:
-        db.close()
 
-def request_password_reset(email: str) -> bool:
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            return False
-        
-        otp = generate_otp()
-        success = send_otp_email(email, otp)
-        return success
-    finally:
-        db.close()
+@with_async_session
+async def request_password_reset(email: str, db=None) -> bool:
+    user = await _first_user(db, User.email == email)
+    if not user:
+        return False
+    
+    otp = generate_otp()
+    # SMTP is blocking; keep it off the event loop
+    success = await asyncio.to_thread(send_otp_email, email, otp)
+    return success
 
-def verify_password_reset_otp(email: str, otp_code: str) -> dict:
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            return {"success": False, "message": "Email not found"}
-        
-        if verify_otp(email, otp_code):
-            return {
-                "success": True, 
-                "message": "OTP verified successfully",
-                "user_id": user.user_id
-            }
-        else:
-            return {"success": False, "message": "Invalid or expired OTP"}
-    finally:
-        db.close()
+@with_async_session
+async def verify_password_reset_otp(email: str, otp_code: str, db=None) -> dict:
+    user = await _first_user(db, User.email == email)
+    if not user:
+        return {"success": False, "message": "Email not found"}
+    
+    if verify_otp(email, otp_code):
+        return {
+            "success": True, 
+            "message": "OTP verified successfully",
+            "user_id": user.user_id
+        }
+    else:
+        return {"success": False, "message": "Invalid or expired OTP"}
 
-def reset_password(email: str, new_password: str) -> dict:
+@with_async_session
+async def reset_password(email: str, new_password: str, db=None) -> dict:
     """Reset password menggunakan email (setelah verifikasi OTP)"""
-    db = SessionLocal()
     try:
-        user = db.query(User).filter(User.email == email).first()
+        user = await _first_user(db, User.email == email)
         if not user:
             return {"success": False, "message": "Email not found"}
         
         user.password = new_password
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         return {
             "success": True,
@@ -146,20 +131,18 @@ def reset_password(email: str, new_password: str) -> dict:
             "user_id": user.user_id
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return {"success": False, "message": f"Error updating password: {str(e)}"}
-    finally:
-        db.close()
 
-async def update_user_service(user_id: int, data: dict):
+@with_async_session
+async def update_user_service(user_id: int, data: dict, db=None):
     """Update user service with comprehensive validation"""
-    db = SessionLocal()
     try:
         print(f"DEBUG: Service updating user {user_id}")
         print(f"DEBUG: Received data: {data}")
         
         # Check if user exists
-        user = db.query(User).filter(User.user_id == user_id).first()
+        user = await _first_user(db, User.user_id == user_id)
         if not user:
             return {"success": False, "message": "User not found"}
         
@@ -196,8 +179,8 @@ async def update_user_service(user_id: int, data: dict):
             return {"success": False, "message": "No valid fields to update"}
         
         # Commit changes
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         print(f"DEBUG: Successfully updated fields: {updated_fields}")
         print(f"DEBUG: User birthday after update: '{user.birthday}'")
@@ -227,18 +210,16 @@ async def update_user_service(user_id: int, data: dict):
         
     except Exception as e:
         print(f"DEBUG: Database error in update_user_service: {e}")
-        db.rollback()
+        await db.rollback()
         import traceback
         traceback.print_exc()
         return {"success": False, "message": f"Database error: {str(e)}"}
-    finally:
-        db.close()
 
-def get_user_by_id(user_id: int):
+@with_async_session
+async def get_user_by_id(user_id: int, db=None):
     """Get user by ID with safe field access"""
-    db = SessionLocal()
     try:
-        user = db.query(User).filter(User.user_id == user_id).first()
+        user = await _first_user(db, User.user_id == user_id)
         if not user:
             return None
         
@@ -247,53 +228,51 @@ def get_user_by_id(user_id: int):
     except Exception as e:
         print(f"DEBUG: Database error in get_user_by_id: {e}")
         return None
-    finally:
-        db.close()
 
 class UserService:
     """Service class for user operations - wrapper around existing functions"""
     
     @staticmethod
-    def authenticate_user(email: str, password: str):
+    async def authenticate_user(email: str, password: str, db=None):
         """Authenticate user wrapper"""
-        return authenticate_user(email, password)
+        return await authenticate_user(email, password, db=db)
     
     @staticmethod
-    def create_user(data: dict):
+    async def create_user(data: dict, db=None):
         """Create user wrapper"""
-        return create_user(data)
+        return await create_user(data, db=db)
     
     @staticmethod
-    def update_user(user_id: int, data: dict):
+    async def update_user(user_id: int, data: dict, db=None):
         """Update user wrapper"""
-        return update_user(user_id, data)
+        return await update_user(user_id, data, db=db)
     
     @staticmethod
-    def delete_user(user_id: int):
+    async def delete_user(user_id: int, db=None):
         """Delete user wrapper"""
-        return delete_user(user_id)
+        return await delete_user(user_id, db=db)
     
     @staticmethod
-    def get_user_by_id(user_id: int):
+    async def get_user_by_id(user_id: int, db=None):
         """Get user by ID wrapper"""
-        return get_user_by_id(user_id)
+        return await get_user_by_id(user_id, db=db)
     
     @staticmethod
-    def find_user_by_email(email: str):
+    async def find_user_by_email(email: str, db=None):
         """Find user by email wrapper"""
-        return find_user_by_email(email)
+        return await find_user_by_email(email, db=db)
     
     @staticmethod
-    def request_password_reset(email: str):
+    async def request_password_reset(email: str, db=None):
         """Request password reset wrapper"""
-        return request_password_reset(email)
+        return await request_password_reset(email, db=db)
     
     @staticmethod
-    def verify_password_reset_otp(email: str, otp_code: str):
+    async def verify_password_reset_otp(email: str, otp_code: str, db=None):
         """Verify password reset OTP wrapper"""
-        return verify_password_reset_otp(email, otp_code)
+        return await verify_password_reset_otp(email, otp_code, db=db)
     
     @staticmethod
-    def reset_password(email: str, new_password: str):
+    async def reset_password(email: str, new_password: str, db=None):
         """Reset password wrapper"""
-        return reset_password(email, new_password)
\ No newline at end of file
+        return await reset_password(email, new_password, db=db)
\ No newline at end of file
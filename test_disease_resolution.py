@@ -0,0 +1,75 @@
+import csv
+import os
+import tempfile
+from types import SimpleNamespace
+
+# Runs without a database: python test_disease_resolution.py (or pytest)
+os.environ.setdefault("DB_DRIVER", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "test_iphc.db"))
+
+from services.disease_catalog import DISEASE_ALIASES, DiseaseCatalog, catalog_key
+from services.disease_service import _format_disease
+
+TRAINING_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "Training.csv")
+
+# Every disease name in the seed data and SQL files
+CATALOG_NAMES = [
+    "Acute Minor Illness", "Allergic Reaction", "Allergic Rhinitis", "Arthralgia", "Bacterial Infection",
+    "Chronic Fatigue", "Common Cold", "Contact Dermatitis", "Eczema", "Food Intolerance", "Food Poisoning",
+    "Functional Dyspepsia", "Gastroenteritis", "General Malaise", "General Viral Illness", "Inflammatory Pain",
+    "Influenza", "Inner Ear Disorder", "Irritable Bowel Syndrome", "Migraine", "Mild Infection",
+    "Mild Viral Infection", "Minor Acute Illness", "Muscle Strain", "Sleep Disorder", "Stress Headache",
+    "Stress Response", "Stress-Related Symptoms", "Tension Headache", "Throat Irritation",
+    "Upper Respiratory Infection", "Vertigo", "Vestibular Dysfunction", "Viral Gastritis", "Viral Infection",
+    "Viral Pharyngitis"
+]
+
+def _catalog():
+    catalog = DiseaseCatalog(_format_disease)
+    catalog._build([
+        SimpleNamespace(disease_id=i, name=name, overview="", causes="", symptoms="", when_to_see_doctor="",
+                        treatments="", prevention="", how_common=name, urgency_level=None)
+        for i, name in enumerate(CATALOG_NAMES, start=1)
+    ])
+    return catalog
+
+def _prognosis_classes():
+    with open(TRAINING_CSV, newline="") as f:
+        return sorted({row["prognosis"].strip() for row in csv.DictReader(f)})
+
+def _resolved_name(catalog, name):
+    disease, _ = catalog.resolve(name)
+    return disease["name"] if disease else None
+
+def test_model_classes_resolve_to_their_own_disease():
+    """A prognosis class is its own catalog disease, its alias target, or not found"""
+    catalog = _catalog()
+    for name in _prognosis_classes():
+        expected = DISEASE_ALIASES.get(catalog_key(name), name)
+        resolved = _resolved_name(catalog, name)
+        assert resolved is None or catalog_key(resolved) == catalog_key(expected), (name, resolved)
+
+def test_generic_words_do_not_match_on_their_own():
+    catalog = _catalog()
+    for name in ("Fungal infection", "Urinary tract infection", "Sinus Infection", "Hypertension",
+                 "Drug Reaction", "Allergy", "Hepatitis B", "Skin infection", "Chronic pain"):
+        assert _resolved_name(catalog, name) is None, name
+    assert _resolved_name(catalog, "Bacterial Infection") == "Bacterial Infection"
+
+def test_typos_and_aliases_still_resolve():
+    catalog = _catalog()
+    for name, expected in (("migrane", "Migraine"), ("tension headach", "Tension Headache"),
+                           ("Gastroenteritis", "Gastroenteritis"), ("flu", "Influenza"),
+                           ("(vertigo) Paroymsal  Positional Vertigo", "Vertigo"),
+                           ("Eczema (atopic)", "Eczema")):
+        assert _resolved_name(catalog, name) == expected, name
+    _, score = catalog.resolve("migrane")
+    assert 0 < score < 1
+    assert catalog.resolve("Migraine")[1] == 1.0
+    assert catalog.document("migrane", "api") is None
+
+if __name__ == "__main__":
+    test_model_classes_resolve_to_their_own_disease()
+    test_generic_words_do_not_match_on_their_own()
+    test_typos_and_aliases_still_resolve()
+    print("✅ Disease names resolve to their own disease or not at all")
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+# python test_flat_forest.py (or pytest). FlatForest must give sklearn's
+# predict_proba, in memory and from a memory-mapped bundle.
+from services.forest_bundle import FlatForest, ROW_CHUNK, export_forest_bundle
+
+TRAINING_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "Training.csv")
+
+def _symptom_forest():
+    """Forest on the 0/1 symptom columns, like the served model (binary-split path)"""
+    df = pd.read_csv(TRAINING_CSV).dropna(axis=1, how="all")
+    X = df.drop(columns=["prognosis"]).to_numpy(dtype=np.float32)
+    model = RandomForestClassifier(n_estimators=30, random_state=42).fit(X, df["prognosis"])
+    return model, X
+
+def _continuous_forest():
+    """Forest with real-valued thresholds (threshold-compare path)"""
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(600, 12)).astype(np.float32)
+    y = (X[:, 0] + X[:, 3] * X[:, 5] > 0).astype(int) + (X[:, 7] > 1)
+    model = RandomForestClassifier(n_estimators=25, max_depth=12, random_state=7).fit(X, y)
+    return model, X
+
+def _inputs(model, X, rng):
+    """Single rows, small and multi-chunk batches, training rows and unseen random rows"""
+    if set(np.unique(X)) <= {0.0, 1.0}:
+        unseen = (rng.random((ROW_CHUNK + 300, model.n_features_in_)) > 0.93).astype(np.float32)
+    else:
+        unseen = rng.normal(size=(ROW_CHUNK + 300, model.n_features_in_)).astype(np.float32)
+    return [X[:1], X[:5], X[:200], unseen[:1], unseen[:8], unseen]
+
+def _check(model, X):
+    rng = np.random.default_rng(0)
+    flat = FlatForest.from_model(model)
+    assert list(flat.classes_) == [str(c) for c in model.classes_]
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_dir = os.path.join(directory, "model_bundle")
+        export_forest_bundle(model, bundle_dir)
+        mapped = FlatForest.load(bundle_dir)
+        for rows in _inputs(model, X, rng):
+            expected = model.predict_proba(rows)
+            np.testing.assert_allclose(flat.predict_proba(rows), expected, rtol=0, atol=1e-12)
+            np.testing.assert_allclose(mapped.predict_proba(rows), expected, rtol=0, atol=1e-12)
+
+def test_flat_forest_matches_sklearn_on_symptom_columns():
+    model, X = _symptom_forest()
+    assert FlatForest.from_model(model).binary_splits
+    _check(model, X)
+
+def test_flat_forest_matches_sklearn_on_continuous_features():
+    model, X = _continuous_forest()
+    assert not FlatForest.from_model(model).binary_splits
+    _check(model, X)
+
+if __name__ == "__main__":
+    test_flat_forest_matches_sklearn_on_symptom_columns()
+    test_flat_forest_matches_sklearn_on_continuous_features()
+    print("✅ FlatForest matches sklearn predict_proba")
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+
+# Runs against a throwaway SQLite file: python test_history_sync.py (or pytest)
+os.environ.setdefault("DB_DRIVER", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "test_iphc.db"))
+
+from config.database import Base, SessionLocal, engine
+from models import user_model, prediction_model, document_model
+from models.prediction_model import Prediction
+import services.predict_service as predict_service
+from services.predict_service import get_prediction_changes, delete_prediction_by_id
+from services.prediction_writer import PredictionWriter
+from run_add_prediction_changes import add_prediction_changes
+
+def setup_module(module=None):
+    Base.metadata.create_all(bind=engine)
+
+def _new_user():
+    db = SessionLocal()
+    try:
+        user = user_model.User(name="Sync", email=f"sync-{datetime.now().timestamp()}@example.com")
+        db.add(user)
+        db.commit()
+        return user.user_id
+    finally:
+        db.close()
+
+def _row(user_id, predict_id):
+    return {
+        "predict_id": predict_id, "user_id": user_id, "main_symptom": "fever", "other_symptoms": "",
+        "duration": "1-3 days", "severity": "Mild", "top_results": [], "dynamic_answers": [],
+        "user_journey": {}, "assessment_summary": "", "total_symptoms_count": 1,
+        "assessment_timestamp": datetime.now()
+    }
+
+def _sync(user_id, since=None, limit=None):
+    return asyncio.run(get_prediction_changes(user_id, since=since, limit=limit))
+
+def _writer():
+    directory = tempfile.mkdtemp()
+    return PredictionWriter(journal_path=os.path.join(directory, "journal.jsonl"),
+                            dead_letter_path=os.path.join(directory, "rejected.jsonl"))
+
+def test_rows_written_out_of_predict_id_order_reach_the_client():
+    """Two writers with their own id blocks: id 101 lands before id 1"""
+    setup_module()
+    predict_service.HISTORY_SYNC_SETTLE_SECONDS = 0
+    user_id = _new_user()
+    base = 1_000_000 + user_id * 1000
+    worker_a, worker_b = _writer(), _writer()
+
+    worker_b._insert([_row(user_id, base + 101)])
+    first = _sync(user_id)
+    assert [p["predict_id"] for p in first["created"]] == [base + 101]
+
+    worker_a._insert([_row(user_id, base + 1)])
+    second = _sync(user_id, since=first["next_cursor"])
+    assert [p["predict_id"] for p in second["created"]] == [base + 1]
+
+    asyncio.run(delete_prediction_by_id(base + 101))
+    third = _sync(user_id, since=second["next_cursor"])
+    assert third["created"] == [] and third["deleted"] == [base + 101]
+    assert _sync(user_id, since=third["next_cursor"]) == {**third, "created": [], "deleted": []}
+
+def test_recent_changes_are_sent_again_until_settled():
+    """A change younger than the settle window may have an uncommitted predecessor"""
+    setup_module()
+    predict_service.HISTORY_SYNC_SETTLE_SECONDS = 3600
+    try:
+        user_id = _new_user()
+        _writer()._insert([_row(user_id, 2_000_000 + user_id)])
+        first = _sync(user_id)
+        assert [p["predict_id"] for p in first["created"]] == [2_000_000 + user_id]
+        assert first["next_cursor"] == "0" and not first["has_more"]
+        assert _sync(user_id, since=first["next_cursor"])["created"] == first["created"]
+    finally:
+        predict_service.HISTORY_SYNC_SETTLE_SECONDS = 0
+
+def test_backfill_logs_existing_rows():
+    setup_module()
+    predict_service.HISTORY_SYNC_SETTLE_SECONDS = 0
+    user_id = _new_user()
+    db = SessionLocal()
+    try:
+        # A row saved before prediction_changes existed
+        db.add(Prediction(**_row(user_id, 3_000_000 + user_id)))
+        db.commit()
+    finally:
+        db.close()
+    assert _sync(user_id)["created"] == []
+    add_prediction_changes()
+    add_prediction_changes()
+    assert [p["predict_id"] for p in _sync(user_id)["created"]] == [3_000_000 + user_id]
+
+def test_old_cursor_format_is_rejected():
+    setup_module()
+    try:
+        _sync(_new_user(), since="10-2")
+    except ValueError as e:
+        assert str(e) == "Cursor tidak valid"
+    else:
+        raise AssertionError("a '<predict_id>-<deletion_id>' cursor was accepted")
+
+if __name__ == "__main__":
+    test_rows_written_out_of_predict_id_order_reach_the_client()
+    test_recent_changes_are_sent_again_until_settled()
+    test_backfill_logs_existing_rows()
+    test_old_cursor_format_is_rejected()
+    print("✅ History sync sees every change once settled")
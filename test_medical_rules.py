@@ -0,0 +1,225 @@
+import contextlib
+import csv
+import io
+import os
+import pickle
+import random
+import tempfile
+import numpy as np
+
+# python test_medical_rules.py (or pytest). The reference functions below are the
+# if/elif medical logic the rule tables in services/medical_rules.py replaced and
+# the sort-everything ML filtering that MedicalRuleEngine.top_results replaced;
+# the engine must keep giving the same answers.
+os.environ.setdefault("DB_DRIVER", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "test_iphc.db"))
+
+from services.medical_rules import rule_engine
+from services.predict_service import apply_enhanced_medical_logic, get_emergency_fallbacks, is_duplicate_disease
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset")
+SYMPTOM_COLUMNS = os.path.join(DATASET_DIR, "symptom_columns.pkl")
+TRAINING_CSV = os.path.join(DATASET_DIR, "Training.csv")
+SEVERITIES = ["Mild", "Moderate", "Severe", None]
+
+def _reference_logical_diseases(symptoms, severity):
+    if not symptoms:
+        return [
+            {'disease': 'General Health Assessment Needed', 'probability': 75.0},
+            {'disease': 'Wellness Check Required', 'probability': 65.0},
+            {'disease': 'Preventive Care Consultation', 'probability': 55.0}
+        ]
+    symptom_text = ' '.join(str(s).lower() for s in symptoms)
+    if any(gi in symptom_text for gi in ['diarrhea', 'diarrhoea', 'nausea', 'vomiting', 'stomach', 'abdominal']):
+        if 'fever' in symptom_text or severity in ['Moderate', 'Severe']:
+            return [
+                {'disease': 'Gastroenteritis', 'probability': 88.0},
+                {'disease': 'Food Poisoning', 'probability': 78.0},
+                {'disease': 'Viral Gastritis', 'probability': 68.0}
+            ]
+        return [
+            {'disease': 'Irritable Bowel Syndrome', 'probability': 75.0},
+            {'disease': 'Food Intolerance', 'probability': 65.0},
+            {'disease': 'Functional Dyspepsia', 'probability': 55.0}
+        ]
+    elif any(resp in symptom_text for resp in ['cough', 'throat', 'breathing', 'chest', 'runny', 'congestion']):
+        if 'fever' in symptom_text:
+            return [
+                {'disease': 'Upper Respiratory Infection', 'probability': 85.0},
+                {'disease': 'Viral Pharyngitis', 'probability': 75.0},
+                {'disease': 'Common Cold', 'probability': 65.0}
+            ]
+        return [
+            {'disease': 'Common Cold', 'probability': 80.0},
+            {'disease': 'Allergic Rhinitis', 'probability': 70.0},
+            {'disease': 'Throat Irritation', 'probability': 60.0}
+        ]
+    elif any(fever in symptom_text for fever in ['fever', 'chills', 'sweating']):
+        if severity == 'Severe':
+            return [
+                {'disease': 'Viral Infection', 'probability': 85.0},
+                {'disease': 'Influenza', 'probability': 75.0},
+                {'disease': 'Bacterial Infection', 'probability': 65.0}
+            ]
+        return [
+            {'disease': 'Viral Infection', 'probability': 80.0},
+            {'disease': 'Common Cold', 'probability': 70.0},
+            {'disease': 'Mild Viral Infection', 'probability': 60.0}
+        ]
+    elif any(pain in symptom_text for pain in ['headache', 'pain', 'ache', 'joint', 'muscle']):
+        if 'headache' in symptom_text:
+            return [
+                {'disease': 'Tension Headache', 'probability': 80.0},
+                {'disease': 'Migraine', 'probability': 70.0},
+                {'disease': 'Stress Headache', 'probability': 60.0}
+            ]
+        return [
+            {'disease': 'Muscle Strain', 'probability': 75.0},
+            {'disease': 'Arthralgia', 'probability': 65.0},
+            {'disease': 'Inflammatory Pain', 'probability': 55.0}
+        ]
+    elif any(skin in symptom_text for skin in ['rash', 'itching', 'skin', 'redness']):
+        return [
+            {'disease': 'Contact Dermatitis', 'probability': 80.0},
+            {'disease': 'Allergic Reaction', 'probability': 70.0},
+            {'disease': 'Eczema', 'probability': 60.0}
+        ]
+    elif any(neuro in symptom_text for neuro in ['dizziness', 'blurred', 'vision', 'balance']):
+        return [
+            {'disease': 'Vertigo', 'probability': 75.0},
+            {'disease': 'Inner Ear Disorder', 'probability': 65.0},
+            {'disease': 'Vestibular Dysfunction', 'probability': 55.0}
+        ]
+    elif any(general in symptom_text for general in ['fatigue', 'tired', 'weakness', 'malaise']):
+        return [
+            {'disease': 'Viral Infection', 'probability': 75.0},
+            {'disease': 'Chronic Fatigue', 'probability': 65.0},
+            {'disease': 'Sleep Disorder', 'probability': 55.0}
+        ]
+    return [
+        {'disease': 'General Viral Illness', 'probability': 70.0},
+        {'disease': 'Stress-Related Symptoms', 'probability': 60.0},
+        {'disease': 'Minor Acute Illness', 'probability': 50.0}
+    ]
+
+def _reference_is_inappropriate(symptoms, disease_name, probability):
+    symptom_text = ' '.join(symptoms).lower()
+    severe_diseases = ['heart attack', 'aids', 'tuberculosis', 'cancer', 'paralysis']
+    if any(severe in disease_name for severe in severe_diseases):
+        if probability < 50.0:
+            return True
+    if any(digestive in symptom_text for digestive in ['diarrhea', 'nausea', 'vomiting']):
+        inappropriate = ['vertigo', 'impetigo', 'acne', 'arthritis', 'cervical']
+        if any(inappropriate_disease in disease_name for inappropriate_disease in inappropriate):
+            return True
+    return False
+
+def _reference_apply(symptoms, raw_predictions, severity):
+    """apply_enhanced_medical_logic before top_results: sort every class, filter, dedup, merge"""
+    logical_diseases = _reference_logical_diseases(symptoms, severity)
+    good_ml_predictions = []
+    if raw_predictions:
+        raw_predictions.sort(key=lambda x: x['probability'], reverse=True)
+        for pred in raw_predictions:
+            if _reference_is_inappropriate(symptoms, pred['disease'].lower(), pred['probability']):
+                continue
+            good_ml_predictions.append(pred)
+    all_candidates = logical_diseases[:]
+    for ml_pred in good_ml_predictions[:7]:
+        if not is_duplicate_disease(ml_pred, all_candidates):
+            all_candidates.append(ml_pred)
+    all_candidates.sort(key=lambda x: x['probability'], reverse=True)
+    if len(all_candidates) < 3:
+        for fallback in get_emergency_fallbacks(symptoms):
+            if not is_duplicate_disease(fallback, all_candidates):
+                all_candidates.append(fallback)
+            if len(all_candidates) >= 3:
+                break
+    return all_candidates[:3]
+
+def _model_classes():
+    # sklearn orders classes_ by sorted label, as the served model does
+    with open(TRAINING_CSV, newline="") as f:
+        return np.array(sorted({row["prognosis"] for row in csv.DictReader(f)}))
+
+def random_percentages(rng, n_classes):
+    """Percentage vectors like _to_percentages output, with many ties and values near the cut-offs"""
+    kind = rng.random()
+    if kind < 0.3:
+        # Few distinct values: ties at and around the 7th candidate
+        values = [rng.choice([0.0, 0.0, 1.5, 2.44, 5.0, 10.0, 49.99, 50.0, 70.0, 88.0]) for _ in range(n_classes)]
+    elif kind < 0.6:
+        # A forest vote: multiples of 1/n_trees
+        votes = np.bincount([rng.randrange(n_classes) for _ in range(rng.choice([10, 30, 100]))], minlength=n_classes)
+        values = list(np.round(votes / votes.sum() * 100, 2))
+    else:
+        weights = [rng.random() ** 4 for _ in range(n_classes)]
+        values = list(np.round(np.array(weights) / sum(weights) * 100, 2))
+    return np.array(values, dtype=np.float64)
+
+def _vocabulary():
+    with open(SYMPTOM_COLUMNS, "rb") as f:
+        columns = [str(c) for c in pickle.load(f)]
+    # Free-text spellings and keyword fragments the API accepts besides the model columns
+    return columns + [
+        "Stomach Pain", "runny nose", "sore throat", "mild fever", "Headache", "joint ache", "blurred vision",
+        "loss of balance", "tired all day", "diarrhoea", "skin redness", "night sweating", "chest tightness",
+        "toothache", "back pain", "feeling unwell", ""
+    ]
+
+def random_symptoms(rng, vocabulary):
+    return rng.sample(vocabulary, rng.randint(0, 5))
+
+def test_rule_engine_matches_reference_rules():
+    rng = random.Random(9)
+    vocabulary = _vocabulary()
+    for _ in range(3000):
+        symptoms = random_symptoms(rng, vocabulary)
+        severity = rng.choice(SEVERITIES)
+        assert rule_engine.logical_diseases(symptoms, severity) == _reference_logical_diseases(symptoms, severity), (symptoms, severity)
+
+def test_inappropriate_filter_matches_reference():
+    rng = random.Random(10)
+    vocabulary = _vocabulary()
+    names = ["heart attack", "aids", "tuberculosis", "paralysis (brain hemorrhage)", "vertigo", "impetigo",
+             "acne", "osteoarthristis", "arthritis", "cervical spondylosis", "common cold", "migraine"]
+    for _ in range(3000):
+        symptoms = random_symptoms(rng, vocabulary)
+        mask = rule_engine.symptom_mask(symptoms)
+        name = rng.choice(names)
+        probability = rng.choice([0.0, 12.5, 49.99, 50.0, 50.01, 80.0])
+        assert rule_engine.is_inappropriate(mask, name, probability) == _reference_is_inappropriate(symptoms, name, probability), (symptoms, name, probability)
+
+def test_top_results_match_reference_ranking():
+    rng = random.Random(11)
+    vocabulary = _vocabulary()
+    classes = _model_classes()
+    for _ in range(3000):
+        symptoms = random_symptoms(rng, vocabulary)
+        severity = rng.choice(SEVERITIES)
+        percentages = random_percentages(rng, len(classes))
+        raw_predictions = [{'disease': str(c), 'probability': float(p)} for c, p in zip(classes, percentages)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = apply_enhanced_medical_logic(symptoms, percentages, None, severity, classes)
+        assert results == _reference_apply(symptoms, raw_predictions, severity), (symptoms, severity, list(percentages))
+
+def test_top_results_with_dict_predictions():
+    """The list-of-dicts input form ranks the same way"""
+    rng = random.Random(12)
+    vocabulary = _vocabulary()
+    classes = _model_classes()
+    for _ in range(500):
+        symptoms = random_symptoms(rng, vocabulary)
+        severity = rng.choice(SEVERITIES)
+        percentages = random_percentages(rng, len(classes))
+        raw_predictions = [{'disease': str(c), 'probability': float(p)} for c, p in zip(classes, percentages)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = apply_enhanced_medical_logic(symptoms, [dict(r) for r in raw_predictions], None, severity)
+        assert results == _reference_apply(symptoms, raw_predictions, severity), (symptoms, severity)
+
+if __name__ == "__main__":
+    test_rule_engine_matches_reference_rules()
+    test_inappropriate_filter_matches_reference()
+    test_top_results_match_reference_ranking()
+    test_top_results_with_dict_predictions()
+    print("✅ Rule engine and top-k ranking match the reference medical logic")
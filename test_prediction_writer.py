@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+# Runs against a throwaway SQLite file: python test_prediction_writer.py (or pytest)
+os.environ.setdefault("DB_DRIVER", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "test_iphc.db"))
+
+from config.database import Base, engine
+from models import user_model, prediction_model, document_model
+from services.prediction_writer import PredictionWriter
+
+def setup_module(module=None):
+    Base.metadata.create_all(bind=engine)
+
+def _writer(owner, lease_seconds=1):
+    directory = tempfile.mkdtemp()
+    writer = PredictionWriter(
+        journal_path=os.path.join(directory, "journal.jsonl"),
+        dead_letter_path=os.path.join(directory, "rejected.jsonl"),
+        lease_seconds=lease_seconds, enabled=True
+    )
+    # Two writers in one test process stand for two API workers
+    writer.owner = owner
+    return writer
+
+def test_second_write_behind_process_refuses_to_start():
+    """Id blocks held by two processes would hand out predict_ids out of creation order"""
+    setup_module()
+    first, second = _writer("worker-a", lease_seconds=30), _writer("worker-b")
+    first.start()
+    try:
+        try:
+            second.start()
+        except RuntimeError as e:
+            assert "worker-a" in str(e)
+        else:
+            raise AssertionError("a second write-behind process was started")
+        try:
+            second._reserve_block(10)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("a process without the lease reserved predict_ids")
+    finally:
+        first.stop()
+    # A stopped writer hands the lease over right away
+    second.start()
+    try:
+        assert len(second._reserve_block(10)) == 10
+    finally:
+        second.stop()
+
+if __name__ == "__main__":
+    test_second_write_behind_process_refuses_to_start()
+    print("✅ Write-behind runs in a single process")
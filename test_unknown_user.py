@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+# Runs against a throwaway SQLite file: python test_unknown_user.py (or pytest)
+os.environ.setdefault("DB_DRIVER", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "test_iphc.db"))
+
+from config.database import Base, SessionLocal, engine
+from models import user_model, prediction_model, document_model
+from models.prediction_model import Prediction
+from services.predict_service import predict_result
+
+def setup_module(module=None):
+    Base.metadata.create_all(bind=engine)
+
+def test_unknown_user_is_rejected():
+    """The predictions.user_id foreign key is the only user check on the inline write path"""
+    setup_module()
+    db = SessionLocal()
+    try:
+        rows_before = db.query(Prediction).count()
+        try:
+            predict_result({"symptoms": ["fever", "cough"], "user_id": 999999}, db=db)
+        except ValueError as e:
+            assert str(e) == "User tidak ditemukan"
+        else:
+            raise AssertionError("prediction for an unknown user was accepted")
+        assert db.query(Prediction).count() == rows_before
+    finally:
+        db.close()
+
+def test_known_user_is_saved():
+    setup_module()
+    db = SessionLocal()
+    try:
+        user = user_model.User(name="Test", email=f"test-{os.getpid()}@example.com")
+        db.add(user)
+        db.commit()
+        result = predict_result({"symptoms": ["fever", "cough"], "user_id": user.user_id}, db=db)
+        assert db.get(Prediction, result["predict_id"]) is not None
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_unknown_user_is_rejected()
+    test_known_user_is_saved()
+    print("✅ Unknown users are rejected, known users are saved")
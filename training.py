@@ -2,6 +2,7 @@ import pandas as pd
 import joblib
 import os
 import sklearn
+from services.forest_bundle import export_forest_bundle, BUNDLE_DIR
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
 from sklearn.metrics import accuracy_score, classification_report
@@ -132,4 +133,8 @@ print(classification_report(y_test, test_preds))
 joblib.dump(best_model, model_output_path)
 joblib.dump(final_feature_columns, feature_output_path)
 
+# Flattened .npy bundle that API workers can memory-map (MODEL_FORMAT=bundle)
+bundle_meta = export_forest_bundle(best_model, BUNDLE_DIR)
+print(f"Model bundle written to {BUNDLE_DIR}: {bundle_meta['n_trees']} trees, {bundle_meta['n_nodes']} nodes")
+
 print("✅ Model and features with dynamic fever handling saved successfully.")
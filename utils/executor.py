@@ -0,0 +1,34 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Bounded pool for CPU-bound inference and the blocking DB work around it.
+# Sized separately from the event loop so /health, /info etc. stay responsive.
+PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", min(4, os.cpu_count() or 1)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_predict_executor():
+    """Return the shared prediction thread pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PREDICT_WORKERS, thread_name_prefix="predict")
+    return _executor
+
+async def run_in_predict_pool(func, *args, **kwargs):
+    """Run a blocking function on the prediction pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_predict_executor(), partial(func, *args, **kwargs))
+
+def shutdown_predict_executor():
+    """Wait for in-flight predictions and release the pool (called on app shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from fastapi import Response
+from utils.json_response import dumps
+
+# Browsers, CDNs and the app may reuse reference data (disease info, symptom
+# and allergy lists) for this long without asking; after that they revalidate
+# with If-None-Match and get a bodyless 304 while the content is unchanged.
+STATIC_CACHE_MAX_AGE = int(os.getenv("STATIC_CACHE_MAX_AGE", 3600))
+STATIC_CACHE_MAX_ENTRIES = int(os.getenv("STATIC_CACHE_MAX_ENTRIES", 2048))
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check; weak validators compare equal to their strong form"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def public_cache_control(max_age=STATIC_CACHE_MAX_AGE):
+    return f"public, max-age={max_age}"
+
+def conditional_response(request, body, etag, cache_control):
+    """Serialized JSON body with ETag/Cache-Control, or a 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    # Only safe methods revalidate; a POST keeps its body (RFC 9110 answers it with 412, not 304)
+    if request.method in ("GET", "HEAD") and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+class StaticContentCache:
+    """Serialized bodies and ETags of reference-data responses, per content version.
+
+    ``version`` is whatever changes with the underlying data (the disease
+    catalog version, the model version, a constant for data fixed at import),
+    so a body is encoded and hashed once per version rather than per request.
+    """
+
+    def __init__(self, max_entries=STATIC_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, body, etag)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """(body, etag) stored for this key and version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, version, content):
+        """Serialize content, remember it for this version and return (body, etag)"""
+        body = dumps(content)
+        etag = make_etag(body)
+        with self._lock:
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def respond(self, request, key, version, build, max_age=STATIC_CACHE_MAX_AGE):
+        """Conditional response for content produced by ``build()`` (called only on a miss)"""
+        cached = self.get(key, version)
+        body, etag = cached if cached is not None else self.put(key, version, build())
+        return conditional_response(request, body, etag, public_cache_control(max_age))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_age": STATIC_CACHE_MAX_AGE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None
+        }
+
+static_content = StaticContentCache()
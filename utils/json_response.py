@@ -0,0 +1,16 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+def dumps(content) -> bytes:
+    """orjson encoding shared by OrjsonResponse and pre-serialized (cached) bodies"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the app's default response class.
+
+    Routes that already hold canonical payloads return it directly, which
+    also skips FastAPI's jsonable_encoder pass over the content.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,74 @@
+import re
+from collections import defaultdict
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def trigrams(text):
+    """pg_trgm-style trigram set: each lower-cased word padded with two leading and one trailing space"""
+    grams = set()
+    for word in _WORD.findall(str(text).lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(a, b):
+    """Jaccard similarity of the trigram sets of two strings (0..1)"""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+class TrigramIndex:
+    """Inverted trigram index over a fixed set of strings.
+
+    A search only visits entries that share at least one trigram with the
+    query, counting the shared trigrams per entry, so similarity against every
+    indexed string costs one dict update per (query trigram, posting).
+    """
+
+    def __init__(self, items):
+        """``items``: iterable of (text, value); texts without trigrams are skipped"""
+        self._texts = []
+        self._values = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+        for text, value in items:
+            grams = trigrams(text)
+            if not grams:
+                continue
+            entry = len(self._texts)
+            self._texts.append(text)
+            self._values.append(value)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(entry)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def search(self, text, threshold=0.0, limit=5):
+        """[(score, text, value)] best first; ties keep index order"""
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared = defaultdict(int)
+        for gram in grams:
+            for entry in self._postings.get(gram, ()):
+                shared[entry] += 1
+        n = len(grams)
+        scored = []
+        for entry, count in shared.items():
+            score = count / (n + self._sizes[entry] - count)
+            if score >= threshold:
+                scored.append((score, entry))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [(score, self._texts[entry], self._values[entry]) for score, entry in scored[:limit]]
+
+    def best(self, text, threshold=0.0):
+        """(value, score) of the most similar entry, or (None, 0.0) below the threshold"""
+        results = self.search(text, threshold, limit=1)
+        if not results:
+            return None, 0.0
+        score, _, value = results[0]
+        return value, score